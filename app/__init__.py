@@ -1,5 +1,4 @@
 from flask import Flask, jsonify, render_template, redirect, url_for, g
-from flask_session import Session  # Session-Management
 from .constants import Routes
 from flask_login import LoginManager, login_required
 import os
@@ -10,6 +9,8 @@ from app.models.database import Database
 from app.utils.error_handler import handle_errors
 from app.utils.db_schema import SchemaManager
 from app.utils.color_settings import get_color_settings
+from app.utils import settings_cache
+from app.utils import sqlite_session
 
 def create_app(test_config=None):
     app = Flask(__name__)
@@ -27,11 +28,13 @@ def create_app(test_config=None):
 
     # Konfiguration
     app.config['SECRET_KEY'] = 'dev'  # In Produktion durch sichere Variable ersetzen
-    app.config['SESSION_TYPE'] = 'filesystem'  # Session-Typ festlegen
-    
-    # Session initialisieren
-    Session(app)
-    
+
+    # Session-Backend (SQLite, signiertes Cookie oder Dateisystem), siehe SESSION_BACKEND
+    sqlite_session.init_app(app)
+
+    # Datenbankverbindung nach jeder Anfrage an den Pool zurückgeben
+    app.teardown_appcontext(Database.close_db)
+
     # Datetime-Filter für Jinja2 Templates
     @app.template_filter('format_datetime')
     def format_datetime(value):
@@ -44,23 +47,22 @@ def create_app(test_config=None):
                 return value
         return value.strftime('%d.%m.%Y %H:%M')
     
-    # Globale Template-Variablen
+    def count_trash():
+        return Database.get_db().execute("""
+            SELECT 
+                (SELECT COUNT(*) FROM tools WHERE deleted = 1) +
+                (SELECT COUNT(*) FROM consumables WHERE deleted = 1) +
+                (SELECT COUNT(*) FROM workers WHERE deleted = 1) as total
+        """).fetchone()['total']
+
+    # Globale Template-Variablen (aus dem Cache, siehe app/utils/settings_cache.py)
     @app.context_processor
     def inject_globals():
         try:
-            with Database.get_db() as conn:
-                # Papierkorb-Zähler
-                trash_count = conn.execute("""
-                    SELECT 
-                        (SELECT COUNT(*) FROM tools WHERE deleted = 1) +
-                        (SELECT COUNT(*) FROM consumables WHERE deleted = 1) +
-                        (SELECT COUNT(*) FROM workers WHERE deleted = 1) as total
-                """).fetchone()['total']
-
-                return {
-                    'routes': Routes(),
-                    'trash_count': trash_count
-                }
+            return {
+                'routes': Routes(),
+                'trash_count': settings_cache.get('trash_count', count_trash)
+            }
         except Exception as e:
             print(f"Fehler beim Laden der globalen Variablen: {str(e)}")
             return {
@@ -113,7 +115,7 @@ def create_app(test_config=None):
         return None
 
     # Blueprints registrieren
-    from app.routes import auth, admin, tools, workers, consumables, api, inventory, quick_scan, history, lending, index
+    from app.routes import auth, admin, tools, workers, consumables, api, inventory, quick_scan, history, lending, index, labels, metrics
     
     # Zuerst die Basis-Blueprints
     app.register_blueprint(auth.bp)
@@ -131,6 +133,10 @@ def create_app(test_config=None):
     app.register_blueprint(history.bp)
     app.register_blueprint(lending.bp)
     app.register_blueprint(inventory.bp)
+    app.register_blueprint(labels.bp)
+
+    # Prometheus-Metriken (/metrics) und Messung aller Anfragen
+    metrics.init_app(app)
 
     @app.route('/')
     def index():
@@ -139,8 +145,9 @@ def create_app(test_config=None):
     # CLI-Befehle nur lokal laden
     try:
         if os.environ.get('RENDER') != 'true':
-            from app.cli import init_db_command
-            app.cli.add_command(init_db_command)
+            from app.cli import commands
+            for command in commands:
+                app.cli.add_command(command)
     except ImportError:
         pass  # CLI-Modul ist optional
 
@@ -164,7 +171,8 @@ def create_app(test_config=None):
 
     # Logging konfigurieren
     if not app.debug:
-        file_handler = logging.FileHandler('app.log')
+        # Datei erst beim ersten Eintrag öffnen
+        file_handler = logging.FileHandler('app.log', delay=True)
         file_handler.setLevel(logging.WARNING)
         app.logger.addHandler(file_handler)
 
@@ -172,7 +180,7 @@ def create_app(test_config=None):
     @app.context_processor
     def inject_colors():
         try:
-            colors = get_color_settings()
+            colors = settings_cache.get('colors', get_color_settings)
             return {'colors': colors}
         except Exception as e:
             print(f"Fehler beim Laden der Farbeinstellungen: {str(e)}")
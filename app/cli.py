@@ -0,0 +1,381 @@
+import os
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from app.models.database import Database
+from app.models.indexes import ensure_indexes, INDEX_VERSION
+from app.models import current_lending
+from app.models import search_index
+from app.models import stats_counters
+from app.models import change_log
+from app.models import due_dates
+from app.models import usage_rollups
+from app.models import archive
+from app.utils import exports
+from app.utils import bulk_import
+from app.utils import labels
+from app.utils import sqlite_session
+from app.utils.query_advisor import analyze_queries, get_query_modules
+
+@click.command('init-db')
+@click.confirmation_option(prompt='Die bestehende Datenbank wird gelöscht. Fortfahren?')
+@with_appcontext
+def init_db_command():
+    """Legt die Datenbank neu an"""
+    Database.init_db()
+    click.echo('Datenbank initialisiert.')
+
+@click.command('update-indexes')
+@click.option('--force', is_flag=True, help='Auch bei aktueller Version neu anlegen')
+@with_appcontext
+def update_indexes_command(force):
+    """Legt fehlende Indizes an (Migration bestehender Datenbanken)"""
+    conn = Database.get_db_connection()
+    try:
+        if ensure_indexes(conn, force=force):
+            click.echo(f'Indizes auf Version {INDEX_VERSION} aktualisiert.')
+        else:
+            click.echo(f'Indizes sind bereits auf Version {INDEX_VERSION}.')
+    finally:
+        conn.close()
+
+@click.command('explain-queries')
+@click.option('--all', 'show_all', is_flag=True, help='Auch unauffällige Abfragen ausgeben')
+@with_appcontext
+def explain_queries_command(show_all):
+    """Prüft die Abfragepläne aller SQL-Strings der Blueprints auf Scans"""
+    conn = Database.get_db_connection()
+    try:
+        results = analyze_queries(conn, get_query_modules(current_app))
+    finally:
+        conn.close()
+
+    flagged = 0
+    for result in results:
+        if result['error']:
+            click.secho(f"FEHLER {result['location']}: {result['error']}", fg='yellow')
+            continue
+        if result['findings']:
+            flagged += 1
+            click.secho(f"SCAN   {result['location']}", fg='red')
+        elif show_all:
+            click.secho(f"OK     {result['location']}", fg='green')
+        else:
+            continue
+        first_line = result['sql'].splitlines()[0]
+        click.echo(f"       {first_line[:80]}")
+        for detail in result['plan']:
+            click.echo(f"         {detail}")
+
+    click.echo(f"\n{len(results)} Abfragen geprüft, {flagged} mit Scans oder Temp-Sortierung.")
+
+@click.command('rebuild-current-lending')
+@with_appcontext
+def rebuild_current_lending_command():
+    """Baut die Projektion tool_current_lending aus lendings neu auf"""
+    conn = Database.get_db_connection()
+    try:
+        conn.execute(current_lending.CREATE_TABLE_SQL)
+        count = current_lending.rebuild(conn)
+        click.echo(f'Projektion neu aufgebaut: {count} Werkzeuge.')
+    finally:
+        conn.close()
+
+@click.command('check-current-lending')
+@with_appcontext
+def check_current_lending_command():
+    """Vergleicht tool_current_lending mit lendings"""
+    conn = Database.get_db_connection()
+    try:
+        differences = current_lending.check(conn)
+    finally:
+        conn.close()
+
+    for difference in differences:
+        click.secho(f"{difference['tool_barcode']}: {difference['problem']}", fg='red')
+    if differences:
+        click.echo(f'{len(differences)} Abweichungen gefunden. '
+                   f'Reparatur mit "flask rebuild-current-lending".')
+        raise SystemExit(1)
+    click.echo('Projektion ist konsistent.')
+
+@click.command('rebuild-search-index')
+@click.option('--optimize-only', is_flag=True, help='Nur die Index-Segmente zusammenfassen')
+@with_appcontext
+def rebuild_search_index_command(optimize_only):
+    """Baut den Volltextindex neu auf oder optimiert ihn"""
+    conn = Database.get_db_connection()
+    try:
+        if optimize_only:
+            search_index.optimize(conn)
+            click.echo('Suchindex optimiert.')
+        else:
+            count = search_index.rebuild(conn)
+            click.echo(f'Suchindex neu aufgebaut: {count} Einträge.')
+    finally:
+        conn.close()
+
+@click.command('reconcile-stats')
+@click.option('--check', 'check_only', is_flag=True, help='Nur vergleichen, nichts korrigieren')
+@with_appcontext
+def reconcile_stats_command(check_only):
+    """Gleicht die Dashboard-Zähler mit den Tabellen ab (regelmäßig ausführen)"""
+    conn = Database.get_db_connection()
+    try:
+        if check_only:
+            differences = stats_counters.check(conn)
+        else:
+            stats_counters.create(conn)
+            differences = stats_counters.reconcile(conn)
+    finally:
+        conn.close()
+
+    for difference in differences:
+        click.secho(f"{difference['name']}: gespeichert {difference['stored']}, "
+                    f"tatsächlich {difference['actual']}", fg='red')
+    if not differences:
+        click.echo('Zähler sind konsistent.')
+    elif check_only:
+        click.echo(f'{len(differences)} Abweichungen gefunden. '
+                   f'Korrektur mit "flask reconcile-stats".')
+        raise SystemExit(1)
+    else:
+        click.echo(f'{len(differences)} Zähler korrigiert.')
+
+@click.command('rollup-usage')
+@click.option('--rebuild', is_flag=True, help='Alle Rollups verwerfen und neu berechnen')
+@with_appcontext
+def rollup_usage_command(rebuild):
+    """Verdichtet neue Materialentnahmen in die Verbrauchs-Rollups (z.B. alle 5 Minuten per Cron)"""
+    conn = Database.get_db_connection()
+    try:
+        if rebuild:
+            # Archivierte Entnahmen gehören mit in die Rollups
+            archived = f'{archive.SCHEMA}.consumable_usages' if archive.attach(conn) else None
+            count = usage_rollups.rebuild(conn, archived)
+        else:
+            usage_rollups.create(conn)
+            count = usage_rollups.refresh(conn)
+        watermark = usage_rollups.get_watermark(conn)
+    finally:
+        conn.close()
+    click.echo(f'{count} Entnahmen verdichtet (Stand: ID {watermark}).')
+
+@click.command('export')
+@click.argument('dataset', type=click.Choice(list(exports.DATASETS)))
+@click.option('--format', 'fmt', type=click.Choice(exports.FORMATS), default='csv')
+@click.option('--start', help='Ab Datum (JJJJ-MM-TT)')
+@click.option('--end', help='Bis einschließlich Datum (JJJJ-MM-TT)')
+@click.option('--output', type=click.Path(dir_okay=False), help='Zieldatei (Standard: exports/<datensatz>_<zeit>.<format>)')
+@with_appcontext
+def export_command(dataset, fmt, start, end, output):
+    """Exportiert Bestände oder Historie als CSV/XLSX"""
+    try:
+        body = exports.export(dataset, fmt, start=start, end=end)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    if not output:
+        export_dir = Database.get_setting('EXPORT_DIR')
+        os.makedirs(export_dir, exist_ok=True)
+        output = os.path.join(export_dir, exports.filename(dataset, fmt))
+    size = 0
+    with open(output, 'wb') as f:
+        for chunk in body:
+            f.write(chunk)
+            size += len(chunk)
+    click.echo(f'{output} geschrieben ({size} Bytes).')
+
+@click.command('import')
+@click.argument('entity', type=click.Choice(list(bulk_import.ENTITIES)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--apply', is_flag=True, help='Änderungen schreiben (ohne: nur Probelauf)')
+@with_appcontext
+def import_command(entity, path, apply):
+    """Importiert Werkzeuge, Verbrauchsmaterial oder Mitarbeiter aus CSV/XLSX"""
+    fmt = path.rsplit('.', 1)[-1].lower()
+    conn = Database.get_db_connection()
+    try:
+        with open(path, 'rb') as f:
+            result = bulk_import.run(conn, entity, bulk_import.read_rows(f, fmt), apply=apply)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    finally:
+        conn.close()
+
+    for change in result['changes']:
+        if change['action'] == 'create':
+            click.secho(f"+ Zeile {change['row']}: {change['barcode']}", fg='green')
+        else:
+            fields = ', '.join(f'{k}: {old!r} -> {new!r}' for k, (old, new) in change['fields'].items())
+            click.secho(f"~ Zeile {change['row']}: {change['barcode']} ({fields})", fg='yellow')
+    for error in result['errors']:
+        click.secho(f"! Zeile {error['row']}: {error['message']}", fg='red')
+    if result['stock_changed']:
+        click.secho(f"Bestand wird ohne Entnahmebuchung geändert ({result['stock_changed']}):", fg='magenta')
+        for change in result['stock_changes']:
+            click.secho(f"  Zeile {change['row']}: {change['barcode']} {change['old']} -> {change['new']}",
+                        fg='magenta')
+
+    mode = 'Importiert' if apply else 'Probelauf'
+    click.echo(f"{mode}: {result['rows']} Zeilen, {result['created']} neu, "
+               f"{result['updated']} geändert, {result['unchanged']} unverändert, "
+               f"{len(result['errors'])} Fehler.")
+    if not apply and (result['created'] or result['updated']):
+        click.echo('Mit --apply übernehmen.')
+
+@click.command('labels')
+@click.option('--type', 'entity_types', multiple=True, type=click.Choice(list(labels.LABEL_SOURCES)),
+              help='Nur diese Typen (mehrfach möglich, Standard: alle)')
+@click.option('--barcode', 'barcodes', multiple=True, help='Nur diese Barcodes (mehrfach möglich)')
+@click.option('--since', help='Nur Einträge, die ab diesem Datum angelegt wurden (JJJJ-MM-TT)')
+@click.option('--layout', 'layout_name', type=click.Choice(list(labels.LAYOUTS)), default=labels.DEFAULT_LAYOUT)
+@click.option('--workers', type=int, help='Anzahl Render-Prozesse (Standard: LABEL_WORKERS)')
+@click.option('--output', type=click.Path(dir_okay=False), help='Ziel-PDF (Standard: barcodes/etiketten_<zeit>.pdf)')
+@with_appcontext
+def labels_command(entity_types, barcodes, since, layout_name, workers, output):
+    """Erzeugt einen mehrseitigen Etikettenbogen (PDF) aus inventory.db"""
+    conn = Database.get_db_connection()
+    try:
+        items = labels.load_items(conn, entity_types or None, list(barcodes) or None, since)
+    finally:
+        conn.close()
+    if not items:
+        click.echo('Keine passenden Einträge gefunden.')
+        return
+
+    if not output:
+        os.makedirs('barcodes', exist_ok=True)
+        output = os.path.join('barcodes', f"etiketten_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf")
+    started = time.perf_counter()
+    pdf = labels.render_pdf(items, layout_name, title='Scandy Etiketten', workers=workers)
+    with open(output, 'wb') as f:
+        f.write(pdf)
+    click.echo(f'{len(items)} Etiketten in {output} geschrieben '
+               f'({time.perf_counter() - started:.1f} s).')
+
+@click.command('sweep-sessions')
+@with_appcontext
+def sweep_sessions_command():
+    """Löscht abgelaufene Sessions aus der Session-Datenbank"""
+    store = sqlite_session.SqliteSessionStore(sqlite_session.sessions_path(current_app))
+    click.echo(f'{store.sweep()} abgelaufene Sessions gelöscht.')
+
+@click.command('compact-change-log')
+@click.option('--retention-days', type=int, help='Überholte Einträge älter als so viele Tage entfernen')
+@click.option('--tombstone-days', type=int, help='Löschungen älter als so viele Tage entfernen')
+@with_appcontext
+def compact_change_log_command(retention_days, tombstone_days):
+    """Kompaktiert das Änderungsjournal (regelmäßig ausführen)"""
+    if retention_days is None:
+        retention_days = Database.get_setting('CHANGE_LOG_RETENTION_DAYS')
+    if tombstone_days is None:
+        tombstone_days = Database.get_setting('CHANGE_LOG_TOMBSTONE_DAYS')
+    conn = Database.get_db_connection()
+    try:
+        change_log.ensure_table(conn)
+        removed = change_log.compact(conn, retention_days, tombstone_days)
+        latest = change_log.latest_seq(conn)
+    finally:
+        conn.close()
+    click.echo(f"{removed['superseded']} überholte Einträge und {removed['tombstones']} "
+               f"Löschungen/Archivierungen entfernt (Stand: seq {latest}).")
+
+@click.command('overdue-digest')
+@click.option('--output', type=click.Path(dir_okay=False), help='Zieldatei (Standard: OVERDUE_DIGEST_DIR/overdue_<datum>.csv)')
+@with_appcontext
+def overdue_digest_command(output):
+    """Schreibt die Tagesübersicht überfälliger Ausleihen als CSV (täglich per Cron)"""
+    conn = Database.get_db_connection()
+    try:
+        rows = due_dates.overdue(conn)
+    finally:
+        conn.close()
+    if not output:
+        digest_dir = Database.get_setting('OVERDUE_DIGEST_DIR')
+        os.makedirs(digest_dir, exist_ok=True)
+        output = os.path.join(digest_dir, due_dates.digest_filename())
+    headers = [label for _key, label in due_dates.DIGEST_COLUMNS]
+    body = exports.stream_csv(headers, ([row[key] for key, _label in due_dates.DIGEST_COLUMNS]
+                                        for row in rows))
+    with open(output, 'wb') as f:
+        for chunk in body:
+            f.write(chunk)
+    click.echo(f'{len(rows)} überfällige Ausleihen nach {output} geschrieben.')
+
+@click.command('loan-periods')
+@click.option('--default', 'default_days', type=click.IntRange(min=1), help='Standard-Leihfrist in Tagen')
+@click.option('--set', 'assignments', multiple=True, metavar='KATEGORIE=TAGE',
+              help='Leihfrist einer Werkzeugkategorie (mehrfach möglich)')
+@click.option('--remove', multiple=True, metavar='KATEGORIE', help='Kategorie auf den Standard zurücksetzen')
+@click.option('--recompute', is_flag=True, help='Fälligkeit offener Ausleihen neu berechnen')
+@with_appcontext
+def loan_periods_command(default_days, assignments, remove, recompute):
+    """Zeigt oder ändert die Leihfristen pro Werkzeugkategorie"""
+    periods = {}
+    for assignment in assignments:
+        category, _, days = assignment.rpartition('=')
+        if not category or not days.isdigit() or int(days) < 1:
+            raise click.BadParameter(f'Erwartet KATEGORIE=TAGE: {assignment}', param_hint='--set')
+        periods[category] = int(days)
+
+    conn = Database.get_db_connection()
+    try:
+        due_dates.ensure_table(conn, Database.get_setting('LOAN_PERIOD_DAYS'),
+                               Database.get_setting('LOAN_PERIODS'))
+        due_dates.set_periods(conn, default_days, periods)
+        conn.executemany("DELETE FROM loan_periods WHERE category = ? AND category != ''",
+                         [(category,) for category in remove])
+        if recompute:
+            click.echo(f'Fälligkeit von {due_dates.recompute_open(conn)} offenen Ausleihen neu berechnet.')
+        conn.commit()
+        current = due_dates.get_periods(conn)
+    finally:
+        conn.close()
+
+    for category, days in current.items():
+        click.echo(f"{category or '(Standard)'}: {days} Tage")
+
+@click.command('archive-history')
+@click.option('--days', type=click.IntRange(min=1), help='Einträge älter als so viele Tage archivieren (Standard: ARCHIVE_AFTER_DAYS)')
+@click.option('--stats', 'stats_only', is_flag=True, help='Nur Zeilenzahlen heiß/Archiv ausgeben')
+@with_appcontext
+def archive_history_command(days, stats_only):
+    """Verschiebt alte Ausleihen und Entnahmen ins Archiv (z.B. nächtlich per Cron)"""
+    if days is None:
+        days = Database.get_setting('ARCHIVE_AFTER_DAYS')
+    conn = Database.get_db_connection()
+    try:
+        if not stats_only:
+            # Nur verdichtete Entnahmen dürfen ins Archiv
+            usage_rollups.create(conn)
+            usage_rollups.refresh(conn)
+            moved = archive.archive(conn, days, Database.get_setting('ARCHIVE_BATCH_SIZE'))
+            click.echo(f"{moved['lendings']} Ausleihen und {moved['consumable_usages']} "
+                       f"Entnahmen nach {archive.archive_path()} verschoben.")
+        table_counts = archive.counts(conn)
+    finally:
+        conn.close()
+    for table, count in table_counts.items():
+        click.echo(f"{table}: {count['hot']} heiß, {count['archive']} im Archiv")
+
+commands = [
+    init_db_command,
+    update_indexes_command,
+    explain_queries_command,
+    rebuild_current_lending_command,
+    check_current_lending_command,
+    rebuild_search_index_command,
+    reconcile_stats_command,
+    rollup_usage_command,
+    export_command,
+    import_command,
+    labels_command,
+    sweep_sessions_command,
+    compact_change_log_command,
+    overdue_digest_command,
+    loan_periods_command,
+    archive_history_command,
+]
@@ -0,0 +1,133 @@
+# app/config.py
+# Wird von create_app() über app.config.from_pyfile('config.py') geladen.
+# Nur Namen in Großbuchstaben landen in app.config.
+import os
+
+# Datenbank-Verbindungspool (pro Gunicorn-Worker-Prozess)
+# 0 = kein Pool, jede Anfrage öffnet eine eigene Verbindung
+DB_POOL_SIZE = int(os.environ.get('SCANDY_DB_POOL_SIZE', 4))
+
+# Wartezeit in Sekunden, bis eine gesperrte Datenbank als Fehler gilt
+DB_TIMEOUT = 5.0
+
+# Anzahl der vorkompilierten Statements pro Verbindung
+DB_CACHED_STATEMENTS = 256
+
+# Aktives PRAGMA-Profil (Schlüssel aus DB_PRAGMA_PROFILES)
+DB_PRAGMA_PROFILE = os.environ.get('SCANDY_DB_PRAGMA_PROFILE', 'wal')
+
+DB_PRAGMA_PROFILES = {
+    # Verhalten vor Einführung des Pools (Rollback-Journal, keine Anpassungen)
+    'legacy': {},
+    # Standard für den Mehrbenutzerbetrieb unter Gunicorn
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -16000,  # ca. 16 MB
+        'temp_store': 'MEMORY',
+    },
+}
+
+# Abfragestatistik (app/utils/query_stats.py, /admin/metrics/queries)
+QUERY_STATS_ENABLED = os.environ.get('SCANDY_QUERY_STATS', '1') == '1'
+# Ab dieser Laufzeit (ms) landet eine Abfrage samt Parametern in logs/slow_queries.log, 0 = aus
+SLOW_QUERY_MS = float(os.environ.get('SCANDY_SLOW_QUERY_MS', 100))
+# Anzahl der letzten Laufzeiten pro Abfrage, aus denen das p95 berechnet wird
+QUERY_STATS_SAMPLES = 1000
+
+# Prometheus-Metriken (/metrics, app/utils/metrics.py): Messung an/aus,
+# Verzeichnis für die Momentaufnahmen der Worker (wird beim Gunicorn-Start geleert),
+# Sekunden zwischen zwei Momentaufnahmen und optionales Bearer-Token für den Abruf
+METRICS_ENABLED = os.environ.get('SCANDY_METRICS', '1') == '1'
+METRICS_DIR = os.environ.get('SCANDY_METRICS_DIR', os.path.join('cache', 'metrics'))
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get('SCANDY_METRICS_TOKEN')
+
+# Live-Ereignisse (/api/events, app/models/live_events.py): Sekunden zwischen zwei
+# Abfragen neuer Ereignisse, Abstand der Keepalive-Kommentare, Höchstdauer eines
+# Streams (danach verbindet der Browser neu), gleichzeitige Streams pro Worker
+# (jeder belegt einen Gunicorn-Thread) und Wartezeit des Browsers vor dem Neuverbinden
+SSE_POLL_INTERVAL = 1.0
+SSE_HEARTBEAT_INTERVAL = 15
+SSE_STREAM_SECONDS = 300
+SSE_MAX_STREAMS = 4
+SSE_RETRY_MS = 3000
+
+# Änderungsjournal (app/models/change_log.py, /api/changes): überholte Einträge
+# werden nach so vielen Tagen kompaktiert, Löschungen (Tombstones) nach so vielen
+# Tagen entfernt ("flask compact-change-log", z.B. nächtlich per Cron).
+# Verbraucher, die länger nicht gelesen haben, müssen danach neu ab 0 lesen.
+CHANGE_LOG_RETENTION_DAYS = 7
+CHANGE_LOG_TOMBSTONE_DAYS = 90
+# Bearer-Token, mit dem Scan-Stationen ohne Admin-Login /api/sync abrufen
+# (scripts/sync_client.py --token), leer = nur mit Admin-Session
+SYNC_TOKEN = os.environ.get('SCANDY_SYNC_TOKEN')
+# Einträge pro Abruf von /api/changes bzw. /api/sync und Obergrenze für ?limit=
+CHANGE_LOG_PAGE_SIZE = 500
+CHANGE_LOG_MAX_PAGE_SIZE = 5000
+
+# Leihfristen (app/models/due_dates.py): Standard in Tagen und abweichende Fristen
+# pro Werkzeugkategorie, z.B. {'Messgeräte': 7}. Nur Startwerte beim Anlegen der
+# Tabelle loan_periods, danach "flask loan-periods".
+LOAN_PERIOD_DAYS = 14
+LOAN_PERIODS = {}
+# Zielordner der täglichen Übersicht überfälliger Ausleihen ("flask overdue-digest",
+# per Cron, z.B. "0 6 * * * cd /srv/scandy && flask overdue-digest")
+OVERDUE_DIGEST_DIR = os.path.join('reports', 'overdue')
+# Einträge im Dashboard-Panel "Überfällig"
+OVERDUE_PANEL_SIZE = 10
+
+# Archiv (app/models/archive.py): abgeschlossene Ausleihen und verdichtete
+# Materialentnahmen wandern nach so vielen Tagen in eine eigene Datenbank
+# ("flask archive-history", z.B. nächtlich per Cron). Leerer Pfad = neben inventory.db.
+ARCHIVE_DB_PATH = os.environ.get('SCANDY_ARCHIVE_DB_PATH')
+ARCHIVE_AFTER_DAYS = 365
+# Zeilen pro Schreibtransaktion des Archivlaufs
+ARCHIVE_BATCH_SIZE = 500
+# Einträge pro Seite in den Verläufen der Detailseiten
+HISTORY_PAGE_SIZE = 50
+
+# Cache für Template-Einstellungen und Zähler (app/utils/settings_cache.py):
+# Sekunden zwischen zwei Prüfungen des Versionsstempels anderer Worker
+CACHE_VERSION_CHECK_INTERVAL = 2.0
+
+# Listenansichten (app/utils/pagination.py): Zeilen pro Seite und Obergrenze für ?limit=
+LIST_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 200
+
+# Request-Tracing der API (app/utils/tracing.py), standardmäßig aus
+TRACING_ENABLED = os.environ.get('SCANDY_TRACING', '0') == '1'
+# Anteil der aufgezeichneten Requests (0.0 - 1.0), pro Endpoint überschreibbar,
+# z.B. {'api.resolve_barcode': 0.01}
+TRACING_SAMPLE_RATE = float(os.environ.get('SCANDY_TRACING_SAMPLE_RATE', 1.0))
+TRACING_ENDPOINT_SAMPLE_RATES = {}
+# Größere Request-/Response-Bodies werden nur mit ihrer Länge vermerkt
+TRACING_MAX_BODY_BYTES = 4096
+# Maximal wartende Einträge, darüber wird verworfen statt den Request zu bremsen
+TRACING_QUEUE_SIZE = 1000
+TRACING_LOG_FILE = os.path.join('logs', 'api_trace.log')
+
+# Maximale Positionen pro Sammelausleihe (/admin/process_batch)
+BATCH_MAX_ITEMS = 100
+
+# Exporte (app/utils/exports.py): Zeilen pro fetchmany()-Block und Zielordner der CLI
+EXPORT_BATCH_SIZE = 1000
+EXPORT_DIR = 'exports'
+
+# Massenimport (app/utils/bulk_import.py): Zeilen pro Prüf- und Schreibblock (eine Transaktion)
+IMPORT_CHUNK_SIZE = 500
+
+# Barcode-Etiketten (app/utils/labels.py): Cache der gerenderten Etiketten,
+# Prozesse für große Mengen und ab wie vielen fehlenden Etiketten parallel gerendert wird
+LABEL_CACHE_DIR = os.path.join('cache', 'labels')
+LABEL_WORKERS = os.cpu_count() or 1
+LABEL_PARALLEL_THRESHOLD = 50
+
+# Session-Backend (app/utils/sqlite_session.py):
+# 'sqlite' = Server-Sessions in database/sessions.db, 'cookie' = signiertes Cookie,
+# 'filesystem' = Flask-Session mit einer Datei pro Session (früheres Verhalten)
+SESSION_BACKEND = os.environ.get('SCANDY_SESSION_BACKEND', 'sqlite')
+# Sekunden zwischen zwei Läufen des Aufräum-Threads für abgelaufene Sessions
+SESSION_SWEEP_INTERVAL = 300
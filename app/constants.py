@@ -6,8 +6,8 @@ class Routes:
     
     # Inventory Routes
     TOOLS_INDEX = 'inventory.tools'
-    CONSUMABLES_INDEX = 'inventory.consumables'
-    WORKERS_INDEX = 'inventory.workers'
+    CONSUMABLES_INDEX = 'consumables.index'
+    WORKERS_INDEX = 'workers.index'
     
     # Add Routes
     ADD_TOOL = 'inventory.add_tool'
@@ -33,12 +33,12 @@ class URLs:
     TOOL_DETAILS = 'inventory.tool_details'
     
     # Consumables
-    CONSUMABLES_INDEX = 'inventory.consumables'
+    CONSUMABLES_INDEX = 'consumables.index'
     ADD_CONSUMABLE = 'consumables.add'
     CONSUMABLE_DETAILS = 'consumables.details'
     
     # Workers
-    WORKERS_INDEX = 'inventory.workers'
+    WORKERS_INDEX = 'workers.index'
     ADD_WORKER = 'inventory.add_worker'
     WORKER_DETAILS = 'inventory.worker_details'
     
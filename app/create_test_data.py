@@ -9,6 +9,7 @@ project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
 from app.models.database import Database
+from app.models import current_lending
 
 def create_test_data():
     try:
@@ -146,6 +147,9 @@ def create_test_data():
             ))
 
         conn.commit()
+
+        # Projektion der letzten Ausleihe aus den Testdaten aufbauen
+        current_lending.rebuild(conn)
         print("Testdaten erfolgreich erstellt!")
 
     except sqlite3.Error as e:
@@ -134,7 +134,121 @@ def add_image_columns():
     except Exception as e:
         print(f"Unerwarteter Fehler: {str(e)}")
 
+def add_current_lending():
+    """Legt die Projektion der letzten Ausleihe pro Werkzeug an (siehe app/models/current_lending.py)"""
+    from app.models import current_lending
+    try:
+        conn = get_db_connection()
+        if current_lending.ensure_table(conn):
+            print("Projektion der letzten Ausleihe angelegt und gefüllt!")
+        else:
+            print("Projektion der letzten Ausleihe existiert bereits.")
+        conn.close()
+    except Exception as e:
+        print(f"Fehler beim Anlegen der Projektion der letzten Ausleihe: {str(e)}")
+
+def add_indexes():
+    """Legt die versionierten Indizes an (siehe app/models/indexes.py)"""
+    from app.models.indexes import ensure_indexes, INDEX_VERSION
+    try:
+        conn = get_db_connection()
+        if ensure_indexes(conn):
+            print(f"Indizes auf Version {INDEX_VERSION} aktualisiert!")
+        else:
+            print(f"Indizes sind bereits auf Version {INDEX_VERSION}.")
+        conn.close()
+    except Exception as e:
+        print(f"Fehler beim Anlegen der Indizes: {str(e)}")
+
+def add_search_index():
+    """Legt den Volltextindex samt Triggern an (siehe app/models/search_index.py)"""
+    from app.models import search_index
+    try:
+        conn = get_db_connection()
+        if search_index.ensure_table(conn):
+            print("Suchindex angelegt und gefüllt!")
+        else:
+            print("Suchindex existiert bereits.")
+        conn.close()
+    except Exception as e:
+        print(f"Fehler beim Anlegen des Suchindex: {str(e)}")
+
+def add_stats_counters():
+    """Legt die Dashboard-Zähler samt Triggern an (siehe app/models/stats_counters.py)"""
+    from app.models import stats_counters
+    try:
+        conn = get_db_connection()
+        if stats_counters.ensure_table(conn):
+            print("Statistik-Zähler angelegt und gefüllt!")
+        else:
+            print("Statistik-Zähler existieren bereits.")
+        conn.close()
+    except Exception as e:
+        print(f"Fehler beim Anlegen der Statistik-Zähler: {str(e)}")
+
+def add_usage_rollups():
+    """Legt die Verbrauchs-Rollups an (siehe app/models/usage_rollups.py)"""
+    from app.models import usage_rollups
+    try:
+        conn = get_db_connection()
+        if usage_rollups.ensure_table(conn):
+            print("Verbrauchs-Rollups angelegt und gefüllt!")
+        else:
+            print("Verbrauchs-Rollups existieren bereits.")
+        conn.close()
+    except Exception as e:
+        print(f"Fehler beim Anlegen der Verbrauchs-Rollups: {str(e)}")
+
+def add_live_events():
+    """Legt die Ereignistabelle der Live-Ansichten an (siehe app/models/live_events.py)"""
+    from app.models import live_events
+    try:
+        conn = get_db_connection()
+        if live_events.ensure_table(conn):
+            print("Live-Ereignisse angelegt!")
+        else:
+            print("Live-Ereignisse existieren bereits.")
+        conn.close()
+    except Exception as e:
+        print(f"Fehler beim Anlegen der Live-Ereignisse: {str(e)}")
+
+def add_change_log():
+    """Legt das Änderungsjournal samt Triggern an (siehe app/models/change_log.py)"""
+    from app.models import change_log
+    try:
+        conn = get_db_connection()
+        if change_log.ensure_table(conn):
+            print("Änderungsjournal angelegt bzw. aktualisiert!")
+        else:
+            print("Änderungsjournal existiert bereits.")
+        conn.close()
+    except Exception as e:
+        print(f"Fehler beim Anlegen des Änderungsjournals: {str(e)}")
+
+def add_due_dates():
+    """Ergänzt Fälligkeiten und Leihfristen der Ausleihen (siehe app/models/due_dates.py)"""
+    from app.models import due_dates
+    from app.models.database import Database
+    try:
+        conn = get_db_connection()
+        if due_dates.ensure_table(conn, Database.get_setting('LOAN_PERIOD_DAYS'),
+                                  Database.get_setting('LOAN_PERIODS')):
+            print("Fälligkeiten angelegt und nachgetragen!")
+        else:
+            print("Fälligkeiten existieren bereits.")
+        conn.close()
+    except Exception as e:
+        print(f"Fehler beim Anlegen der Fälligkeiten: {str(e)}")
+
 if __name__ == "__main__":
     print("Starting migration script...")
     migrate_database()
+    add_current_lending()
+    add_indexes()
+    add_search_index()
+    add_stats_counters()
+    add_usage_rollups()
+    add_live_events()
+    add_change_log()
+    add_due_dates()
     print("Migration script completed!")
\ No newline at end of file
@@ -0,0 +1,220 @@
+import os
+import logging
+from app.models.database import Database
+from app.models import usage_rollups
+from app.models import change_log
+from app.utils.pagination import ListSpec, paginate, decode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Kaltes Archiv für die Bewegungstabellen. archive() verschiebt abgeschlossene
+# Ausleihen und bereits verdichtete Materialentnahmen, die älter als
+# ARCHIVE_AFTER_DAYS sind, in eine eigene Datenbankdatei, die per ATTACH als
+# Schema "archive" eingebunden wird. lendings und consumable_usages bleiben
+# dadurch klein und im Cache.
+#
+# Die Verläufe der Detailseiten lesen zuerst nur die heißen Tabellen. Erst
+# wenn eine Seite über den jüngsten archivierten Zeitpunkt (settings,
+# archive_boundary) hinausreicht, wird das Archiv angehängt und die Seite aus
+# heißen und kalten Zeilen zusammen gelesen. Der Cursor ist für beide gleich.
+#
+# Die jüngste Ausleihe jedes Werkzeugs bleibt immer heiß
+# (tool_current_lending verweist darauf), Entnahmen erst nach ihrer
+# Verdichtung in die Rollups. Im Änderungsjournal erscheinen verschobene
+# Zeilen mit op 'archive', nicht als Löschung.
+
+SCHEMA = 'archive'
+
+BOUNDARY_KEY = 'archive_boundary'
+
+# Tabelle -> (Spalten, Bedingung für "archivierbar", Zeitspalte des Verlaufs)
+# Die Bedingung bekommt den Stichtag und den Wasserstand der Rollups
+TABLES = {
+    'lendings': ({
+        'id': 'INTEGER PRIMARY KEY',
+        'tool_barcode': 'TEXT',
+        'worker_barcode': 'TEXT',
+        'lent_at': 'TIMESTAMP',
+        'returned_at': 'TIMESTAMP',
+        'due_at': 'TIMESTAMP',
+    }, '''returned_at IS NOT NULL AND returned_at < :cutoff
+          AND id NOT IN (SELECT lending_id FROM tool_current_lending)''', 'lent_at'),
+    'consumable_usages': ({
+        'id': 'INTEGER PRIMARY KEY',
+        'consumable_barcode': 'TEXT NOT NULL',
+        'worker_barcode': 'TEXT NOT NULL',
+        'quantity': 'INTEGER NOT NULL',
+        'used_at': 'TIMESTAMP',
+    }, 'used_at < :cutoff AND id <= :rollup_watermark', 'used_at'),
+}
+
+# Indizes der Archivtabellen (dieselben Zugriffe wie die Verläufe)
+INDEXES = [
+    ('idx_lendings_tool_lent_at', 'lendings', '(tool_barcode, lent_at)'),
+    ('idx_lendings_worker_lent_at', 'lendings', '(worker_barcode, lent_at)'),
+    ('idx_usages_consumable_used_at', 'consumable_usages', '(consumable_barcode, used_at)'),
+    ('idx_usages_worker_used_at', 'consumable_usages', '(worker_barcode, used_at)'),
+]
+
+def _columns(table):
+    return ', '.join(TABLES[table][0])
+
+# Platzhalter {lendings}/{consumable_usages} in den Verläufen: nur heiß bzw. heiß und kalt
+HOT_SOURCES = {table: f'main.{table}' for table in TABLES}
+UNION_SOURCES = {
+    table: f'''(SELECT {_columns(table)} FROM main.{table}
+                UNION ALL SELECT {_columns(table)} FROM {SCHEMA}.{table})'''
+    for table in TABLES
+}
+
+def archive_path():
+    """Pfad der Archivdatenbank (Standard: neben inventory.db)"""
+    return Database.get_setting('ARCHIVE_DB_PATH') or os.path.join(
+        os.path.dirname(Database.get_database_path()), 'inventory_archive.db'
+    )
+
+def is_attached(conn):
+    return any(row[1] == SCHEMA for row in conn.execute("PRAGMA database_list"))
+
+def create(conn):
+    """Legt Tabellen und Indizes im angehängten Archiv an (ohne Commit)"""
+    for table, (columns, _condition, _time_column) in TABLES.items():
+        definition = ', '.join(f'{name} {kind}' for name, kind in columns.items())
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {SCHEMA}.{table} ({definition})')
+    for name, table, definition in INDEXES:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {SCHEMA}.{name} ON {table} {definition}')
+
+def attach(conn, path=None, create_missing=False):
+    """Hängt das Archiv an die Verbindung an, liefert False wenn es keins gibt
+
+    Gepoolte Verbindungen behalten das Archiv für spätere Anfragen.
+    ATTACH ist innerhalb einer Transaktion nicht erlaubt.
+    """
+    if is_attached(conn):
+        return True
+    path = path or archive_path()
+    if not create_missing and not os.path.exists(path):
+        return False
+    conn.execute(f"ATTACH DATABASE ? AS {SCHEMA}", (path,))
+    if create_missing:
+        conn.execute(f"PRAGMA {SCHEMA}.journal_mode = WAL")
+        create(conn)
+        conn.commit()
+    return True
+
+def get_boundary(conn):
+    """Jüngster archivierter Zeitpunkt (None, solange nichts archiviert ist)"""
+    row = conn.execute("SELECT value FROM settings WHERE key = ?", (BOUNDARY_KEY,)).fetchone()
+    return row[0] if row and row[0] else None
+
+def _set_boundary(conn, value):
+    conn.execute("""
+        INSERT INTO settings (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)
+    """, (BOUNDARY_KEY, value))
+
+def archive(conn, days, batch_size=500, path=None):
+    """Verschiebt alte abgeschlossene Einträge ins Archiv, liefert die Anzahl pro Tabelle
+
+    Läuft in Blöcken zu je einer kurzen Schreibtransaktion. Zeilen werden
+    mit INSERT OR IGNORE kopiert, ein abgebrochener Lauf kann also einfach
+    wiederholt werden.
+    """
+    attach(conn, path, create_missing=True)
+    cutoff = conn.execute("SELECT datetime('now', ?)", (f'-{days} days',)).fetchone()[0]
+    moved = {}
+    for table, (columns, condition, time_column) in TABLES.items():
+        moved[table] = 0
+        names = ', '.join(columns)
+        while True:
+            conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [row[0] for row in conn.execute(f"""
+                    SELECT id FROM main.{table}
+                    WHERE {condition}
+                    ORDER BY id LIMIT :limit
+                """, {
+                    'cutoff': cutoff,
+                    'rollup_watermark': usage_rollups.get_watermark(conn),
+                    'limit': batch_size,
+                })]
+                if not ids:
+                    conn.rollback()
+                    break
+                placeholders = ', '.join('?' * len(ids))
+                conn.execute(f"""
+                    INSERT OR IGNORE INTO {SCHEMA}.{table} ({names})
+                    SELECT {names} FROM main.{table} WHERE id IN ({placeholders})
+                """, ids)
+                latest = conn.execute(f"""
+                    SELECT MAX({time_column}) FROM main.{table} WHERE id IN ({placeholders})
+                """, ids).fetchone()[0]
+                change_log.set_archiving(conn, True)
+                conn.execute(f"DELETE FROM main.{table} WHERE id IN ({placeholders})", ids)
+                change_log.set_archiving(conn, False)
+                if latest:
+                    _set_boundary(conn, latest)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            moved[table] += len(ids)
+        if moved[table]:
+            logger.info(f"Archiv: {moved[table]} Einträge aus {table} verschoben")
+    return moved
+
+def counts(conn):
+    """Zeilen pro Tabelle, heiß und (falls vorhanden) im Archiv"""
+    archived = attach(conn)
+    result = {}
+    for table in TABLES:
+        result[table] = {
+            'hot': conn.execute(f"SELECT COUNT(*) FROM main.{table}").fetchone()[0],
+            'archive': conn.execute(f"SELECT COUNT(*) FROM {SCHEMA}.{table}").fetchone()[0]
+            if archived else 0,
+        }
+    return result
+
+class HistorySpec:
+    """Verlauf einer Detailseite (neueste zuerst) über heiße und archivierte Zeilen
+
+    source enthält {lendings} bzw. {consumable_usages} an Stelle der Tabellen,
+    sort den Zeitausdruck (darf nicht NULL sein), key einen eindeutigen Schlüssel.
+    """
+
+    def __init__(self, name, columns, source, where, sort, key):
+        self.hot = ListSpec(columns, source.format(**HOT_SOURCES), where, key,
+                            {'time': (sort,)}, 'time', name=name)
+        self.full = ListSpec(columns, source.format(**UNION_SOURCES), where, key,
+                             {'time': (sort,)}, 'time', name=f'{name}.archive')
+
+def history_page(conn, spec, args, params=()):
+    """Eine Seite des Verlaufs im Format von paginate(), zusätzlich mit 'archive'
+
+    Liest nur die heißen Tabellen, solange die Seite vollständig jünger als
+    der jüngste archivierte Eintrag ist; sonst heiß und Archiv zusammen.
+    Wirft ValueError bei ungültigem Cursor.
+    """
+    args = {
+        'cursor': args.get('cursor'),
+        'limit': args.get('limit') or Database.get_setting('HISTORY_PAGE_SIZE'),
+        'sort': 'time',
+        'dir': 'desc',
+    }
+    page = paginate(conn, spec.hot, args, params)
+    page['archive'] = False
+
+    boundary = get_boundary(conn)
+    if boundary is None:
+        return page
+    if page['next_cursor']:
+        last_time = decode_cursor(page['next_cursor'], 'time', 'desc', 2)[0]
+        if last_time > boundary:
+            return page
+    if not attach(conn):
+        return page
+
+    page = paginate(conn, spec.full, args, params)
+    page['archive'] = True
+    return page
@@ -0,0 +1,184 @@
+import logging
+from app.models import current_lending
+from app.models.consumable import withdraw
+
+logger = logging.getLogger(__name__)
+
+# Sammelausleihe und -rückgabe: alle Positionen werden mit je einer Abfrage
+# pro Tabelle geprüft und in einer einzigen Transaktion gebucht. Die
+# Transaktion startet mit BEGIN IMMEDIATE, damit sich zwischen Prüfung und
+# Buchung in keinem anderen Worker etwas ändern kann.
+
+ACTIONS = ('lend', 'return')
+
+def _placeholders(values):
+    return ', '.join('?' * len(values))
+
+def _load_tools(conn, barcodes):
+    if not barcodes:
+        return {}
+    return {row['barcode']: row for row in conn.execute(f"""
+        SELECT t.barcode, t.name, t.status, l.lending_id, l.worker_barcode
+        FROM tools t
+        LEFT JOIN tool_current_lending l ON l.tool_barcode = t.barcode
+            AND l.returned_at IS NULL
+        WHERE t.deleted = 0 AND t.barcode IN ({_placeholders(barcodes)})
+    """, barcodes)}
+
+def _load_consumables(conn, barcodes):
+    if not barcodes:
+        return {}
+    return {row['barcode']: row for row in conn.execute(f"""
+        SELECT id, barcode, name, quantity
+        FROM consumables
+        WHERE deleted = 0 AND barcode IN ({_placeholders(barcodes)})
+    """, barcodes)}
+
+def _parse_amount(value):
+    try:
+        amount = int(value if value is not None else 1)
+    except (TypeError, ValueError):
+        return None
+    return amount if amount > 0 else None
+
+def validate(conn, action, worker_barcode, items):
+    """Prüft alle Positionen und liefert (Ergebnisliste, gültige Werkzeuge, gültige Materialien)"""
+    barcodes = [str(item.get('barcode') or '').strip() for item in items]
+    tools = _load_tools(conn, barcodes)
+    consumables = _load_consumables(conn, [b for b in barcodes if b not in tools])
+
+    results = []
+    valid_tools = []
+    valid_consumables = []
+    seen = set()
+    # Bereits in dieser Anfrage verplante Menge je Material
+    reserved = {}
+
+    for item, barcode in zip(items, barcodes):
+        result = {'barcode': barcode, 'success': False}
+        results.append(result)
+
+        if not barcode:
+            result['message'] = 'Kein Barcode angegeben'
+            continue
+
+        if barcode in tools:
+            tool = tools[barcode]
+            result.update(type='tool', name=tool['name'])
+            if barcode in seen:
+                result['message'] = 'Werkzeug ist mehrfach aufgeführt'
+            elif action == 'lend' and tool['lending_id'] is not None:
+                result['message'] = 'Werkzeug ist bereits ausgeliehen'
+            elif action == 'lend' and tool['status'] == 'Defekt':
+                result['message'] = 'Werkzeug ist defekt'
+            elif action == 'return' and tool['lending_id'] is None:
+                result['message'] = 'Keine aktive Ausleihe gefunden'
+            elif action == 'return' and tool['worker_barcode'] != worker_barcode:
+                result['message'] = 'Werkzeug ist an einen anderen Mitarbeiter ausgeliehen'
+            else:
+                result['success'] = True
+                if action == 'return':
+                    result['worker_barcode'] = tool['worker_barcode']
+                valid_tools.append(barcode)
+            seen.add(barcode)
+
+        elif barcode in consumables:
+            consumable = consumables[barcode]
+            amount = _parse_amount(item.get('amount'))
+            result.update(type='consumable', name=consumable['name'])
+            if action == 'return':
+                result['message'] = 'Verbrauchsmaterial kann nicht zurückgegeben werden'
+            elif amount is None:
+                result['message'] = 'Ungültige Menge'
+            elif reserved.get(barcode, 0) + amount > consumable['quantity']:
+                result['message'] = 'Nicht genügend Material verfügbar'
+            else:
+                reserved[barcode] = reserved.get(barcode, 0) + amount
+                result.update(success=True, amount=amount)
+                valid_consumables.append((consumable['id'], barcode, amount))
+
+        else:
+            result['message'] = 'Barcode nicht gefunden'
+
+    return results, valid_tools, valid_consumables
+
+def _book(conn, action, worker_barcode, tools, consumables):
+    """Schreibt die geprüften Positionen (ohne Commit)"""
+    if action == 'lend':
+        conn.executemany("""
+            INSERT INTO lendings (tool_barcode, worker_barcode, lent_at)
+            VALUES (?, ?, datetime('now'))
+        """, [(barcode, worker_barcode) for barcode in tools])
+        conn.executemany("""
+            UPDATE tools SET status = 'Ausgeliehen' WHERE barcode = ?
+        """, [(barcode,) for barcode in tools])
+
+        for _, barcode, amount in consumables:
+            # Bestand wurde oben geprüft, withdraw() sichert zusätzlich atomar ab
+            result = withdraw(conn, barcode, worker_barcode, amount)
+            if not result['success']:
+                raise RuntimeError(f"{barcode}: {result['message']}")
+    else:
+        conn.executemany("""
+            UPDATE lendings SET returned_at = datetime('now')
+            WHERE tool_barcode = ? AND returned_at IS NULL
+        """, [(barcode,) for barcode in tools])
+        conn.executemany("""
+            UPDATE tools SET status = 'Verfügbar'
+            WHERE barcode = ? AND status != 'Defekt'
+        """, [(barcode,) for barcode in tools])
+
+    for barcode in tools:
+        current_lending.refresh_tool(conn, barcode)
+
+def process_batch(conn, action, worker_barcode, items, allow_partial=False):
+    """Bucht eine Sammelausleihe oder -rückgabe in einer Transaktion
+
+    Zurückgegeben werden nur Werkzeuge, die an worker_barcode ausgeliehen sind.
+    Ohne allow_partial wird nichts gebucht, sobald eine Position ungültig ist.
+    """
+    if action not in ACTIONS:
+        return {'success': False, 'message': f'Unbekannte Aktion: {action}', 'results': []}
+    if not items:
+        return {'success': False, 'message': 'Keine Positionen übermittelt', 'results': []}
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Rückgaben auch für gelöschte Mitarbeiter, die noch Werkzeuge haben
+        worker = conn.execute("""
+            SELECT barcode, deleted FROM workers WHERE barcode = ?
+        """, (worker_barcode,)).fetchone()
+        if not worker or (action == 'lend' and worker['deleted']):
+            conn.rollback()
+            return {'success': False, 'message': 'Mitarbeiter nicht gefunden', 'results': []}
+
+        results, tools, consumables = validate(conn, action, worker_barcode, items)
+        failed = [result for result in results if not result['success']]
+
+        if failed and not allow_partial:
+            conn.rollback()
+            for result in results:
+                if result['success']:
+                    result.update(success=False, message='Nicht gebucht (andere Positionen fehlerhaft)')
+            return {
+                'success': False,
+                'message': f'{len(failed)} von {len(results)} Positionen fehlerhaft, nichts gebucht',
+                'results': results
+            }
+
+        _book(conn, action, worker_barcode, tools, consumables)
+        conn.commit()
+        for result in results:
+            if result['success']:
+                result['message'] = 'Gebucht'
+    except Exception:
+        conn.rollback()
+        raise
+
+    booked = len(results) - len(failed)
+    logger.info(f"Sammel-{action}: {booked} von {len(results)} Positionen gebucht")
+    return {
+        'success': not failed,
+        'message': f'{booked} von {len(results)} Positionen gebucht',
+        'results': results
+    }
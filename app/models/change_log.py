@@ -0,0 +1,304 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Änderungsjournal (Outbox) für inkrementelle Verbraucher: Trigger auf den
+# Stammdaten- und Bewegungstabellen hängen pro eingefügter, geänderter oder
+# gelöschter Zeile einen Eintrag an change_log an, in derselben Transaktion
+# wie die Änderung. seq (AUTOINCREMENT) steigt streng monoton; da SQLite
+# Schreibtransaktionen nacheinander ausführt, entspricht die Reihenfolge der
+# Commit-Reihenfolge. Verbraucher merken sich die zuletzt gelesene seq und
+# holen mit read() nur, was danach kam; den aktuellen Stand der Zeile liefert
+# read(..., with_rows=True) aus der Tabelle selbst.
+#
+# ensure_table() trägt den Bestand als "insert" ein, und compact() löscht nur
+# Einträge, zu denen es einen neueren Eintrag desselben Datensatzes gibt. Ab
+# seq 0 gelesen ergibt das Journal damit immer den vollständigen Stand. Nur
+# Löschungen (Tombstones) verschwinden nach CHANGE_LOG_TOMBSTONE_DAYS; wer
+# mit einer älteren seq kommt, muss neu ab 0 lesen (reset).
+#
+# Zeilen, die app/models/archive.py ins Archiv verschiebt, erscheinen mit
+# op 'archive' statt 'delete': sie sind aus der Tabelle verschwunden, aber
+# nicht gelöscht (Exporte und Verläufe liefern sie weiter). Für die
+# Kompaktierung zählen sie wie Löschungen.
+
+TOMBSTONE_WATERMARK_KEY = 'change_log_tombstone_watermark'
+
+# Gesetzt, solange Löschungen Verschiebungen ins Archiv sind
+# (nur innerhalb der Transaktion des Archivlaufs, siehe set_archiving())
+ARCHIVING_KEY = 'change_log_archiving'
+
+# Einträge ohne aktuelle Zeile in der Tabelle
+TOMBSTONE_OPS = ('delete', 'archive')
+
+# Tabelle -> (Entitätstyp, Schlüsselspalte)
+SOURCES = {
+    'tools': ('tool', 'barcode'),
+    'consumables': ('consumable', 'barcode'),
+    'workers': ('worker', 'barcode'),
+    'lendings': ('lending', 'id'),
+    'consumable_usages': ('consumable_usage', 'id'),
+}
+
+# Entitätstyp -> (Tabelle, Schlüsselspalte)
+ENTITY_TYPES = {entity_type: (table, key) for table, (entity_type, key) in SOURCES.items()}
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        entity_type TEXT NOT NULL,
+        entity_key TEXT NOT NULL,
+        op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete', 'archive')),
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Für die Kompaktierung (neuerer Eintrag desselben Datensatzes)
+CREATE_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_change_log_entity
+    ON change_log (entity_type, entity_key, seq)
+'''
+
+def _key(row, column):
+    # Schlüssel immer als Text, damit id-Schlüssel beim Gruppieren übereinstimmen
+    return f'CAST({row}.{column} AS TEXT)'
+
+# op eines Lösch-Triggers: 'archive' während des Archivlaufs, sonst 'delete'
+DELETE_OP_SQL = f'''CASE WHEN EXISTS (SELECT 1 FROM settings WHERE key = '{ARCHIVING_KEY}')
+                 THEN 'archive' ELSE 'delete' END'''
+
+def _append(entity_type, key, op, condition=None):
+    # op ist ein SQL-Ausdruck, z.B. "'insert'"
+    where = f' WHERE {condition}' if condition else ''
+    return f'''
+            INSERT INTO change_log (entity_type, entity_key, op)
+            SELECT '{entity_type}', {key}, {op}{where};'''
+
+def trigger_sql(table):
+    """Liefert die CREATE TRIGGER-Statements für eine Tabelle"""
+    entity_type, column = SOURCES[table]
+    old_key, new_key = _key('old', column), _key('new', column)
+    return [
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_changes_ai AFTER INSERT ON {table}
+        BEGIN{_append(entity_type, new_key, "'insert'")}
+        END''',
+        # Geänderter Schlüssel: alter Datensatz ist für Verbraucher gelöscht
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_changes_au AFTER UPDATE ON {table}
+        BEGIN{_append(entity_type, old_key, "'delete'", f'{old_key} IS NOT {new_key}')}{_append(entity_type, new_key, "'update'")}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_changes_ad AFTER DELETE ON {table}
+        BEGIN{_append(entity_type, old_key, DELETE_OP_SQL)}
+        END''',
+    ]
+
+def create(conn):
+    """Legt Tabelle, Index und Trigger an (ohne Befüllung, ohne Commit)"""
+    conn.execute(CREATE_TABLE_SQL)
+    conn.execute(CREATE_INDEX_SQL)
+    for table in SOURCES:
+        for sql in trigger_sql(table):
+            conn.execute(sql)
+
+def set_archiving(conn, active):
+    """Markiert Löschungen der laufenden Transaktion als Verschiebung ins Archiv"""
+    if active:
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, '1')",
+                     (ARCHIVING_KEY,))
+    else:
+        conn.execute("DELETE FROM settings WHERE key = ?", (ARCHIVING_KEY,))
+
+def _upgrade(conn, table_sql):
+    """Ältere Journale kennen op 'archive' noch nicht: Tabelle und Trigger neu anlegen"""
+    if "'archive'" in table_sql:
+        return False
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        latest = latest_seq(conn)
+        for table in SOURCES:
+            for suffix in ('ai', 'au', 'ad'):
+                conn.execute(f"DROP TRIGGER IF EXISTS {table}_changes_{suffix}")
+        conn.execute("DROP INDEX IF EXISTS idx_change_log_entity")
+        conn.execute("ALTER TABLE change_log RENAME TO change_log_old")
+        create(conn)
+        conn.execute("""
+            INSERT INTO change_log (seq, entity_type, entity_key, op, changed_at)
+            SELECT seq, entity_type, entity_key, op, changed_at FROM change_log_old
+        """)
+        conn.execute("DROP TABLE change_log_old")
+        # seq darf nicht zurückspringen, auch wenn die jüngsten Einträge kompaktiert sind
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'change_log'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('change_log', ?)", (latest,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info("Änderungsjournal um op 'archive' erweitert")
+    return True
+
+def ensure_table(conn):
+    """Legt das Journal an und trägt den vorhandenen Bestand ein, falls es noch nicht existiert
+
+    Ein vorhandenes Journal wird bei Bedarf auf das aktuelle Schema gebracht.
+    Liefert True, wenn angelegt oder umgebaut wurde.
+    """
+    exists = conn.execute("""
+        SELECT sql FROM sqlite_master
+        WHERE type = 'table' AND name = 'change_log'
+    """).fetchone()
+    if exists:
+        return _upgrade(conn, exists[0])
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        create(conn)
+        for table, (entity_type, column) in SOURCES.items():
+            conn.execute(f"""
+                INSERT INTO change_log (entity_type, entity_key, op)
+                SELECT ?, {_key('src', column)}, 'insert' FROM {table} src ORDER BY src.id
+            """, (entity_type,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+def latest_seq(conn):
+    """Höchste vergebene seq (0 bei leerem Journal)"""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    return row[0] if row else 0
+
+def get_tombstone_watermark(conn):
+    """Höchste seq, bis zu der Löschungen bereits entfernt wurden"""
+    row = conn.execute("SELECT value FROM settings WHERE key = ?",
+                       (TOMBSTONE_WATERMARK_KEY,)).fetchone()
+    return int(row[0]) if row and row[0] else 0
+
+def _set_tombstone_watermark(conn, value):
+    conn.execute("""
+        INSERT INTO settings (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """, (TOMBSTONE_WATERMARK_KEY, str(value)))
+
+def rows(conn, entity_type, keys):
+    """Aktueller Stand der Datensätze als {Schlüssel: dict} (fehlende = endgültig gelöscht)"""
+    table, column = ENTITY_TYPES[entity_type]
+    keys = [int(key) if column == 'id' else key for key in keys]
+    result = {}
+    # In Blöcken, SQLite begrenzt die Anzahl der Parameter
+    for start in range(0, len(keys), 500):
+        chunk = keys[start:start + 500]
+        placeholders = ', '.join('?' * len(chunk))
+        for row in conn.execute(f"SELECT * FROM {table} WHERE {column} IN ({placeholders})", chunk):
+            result[str(row[column])] = dict(row)
+    return result
+
+def read(conn, after=0, limit=500, entity_types=None, with_rows=False):
+    """Einträge nach der seq after (aufsteigend)
+
+    Liefert ein Dict mit changes, next (seq für den nächsten Aufruf),
+    has_more und reset. op ist insert, update, delete oder archive (Zeile
+    ins Archiv verschoben, kein Löschen). reset ist True, wenn seit after Löschungen bereits
+    kompaktiert wurden oder after nicht zu dieser Datenbank passt; der
+    Verbraucher muss dann seinen Stand verwerfen und ab 0 neu lesen.
+    """
+    latest = latest_seq(conn)
+    if after > latest or (after and after < get_tombstone_watermark(conn)):
+        return {'changes': [], 'next': 0, 'has_more': False, 'reset': True}
+
+    unknown = set(entity_types or ()) - set(ENTITY_TYPES)
+    if unknown:
+        raise ValueError(f"Unbekannter Entitätstyp: {', '.join(sorted(unknown))}")
+
+    sql = "SELECT seq, entity_type, entity_key, op, changed_at FROM change_log WHERE seq > ?"
+    params = [after]
+    if entity_types:
+        sql += f" AND entity_type IN ({', '.join('?' * len(entity_types))})"
+        params.extend(entity_types)
+    sql += " ORDER BY seq LIMIT ?"
+    params.append(limit + 1)
+
+    changes = [dict(row) for row in conn.execute(sql, params)]
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    if with_rows:
+        keys = {}
+        for change in changes:
+            if change['op'] not in TOMBSTONE_OPS:
+                keys.setdefault(change['entity_type'], set()).add(change['entity_key'])
+        current = {entity_type: rows(conn, entity_type, entity_keys)
+                   for entity_type, entity_keys in keys.items()}
+        for change in changes:
+            change['row'] = current.get(change['entity_type'], {}).get(change['entity_key'])
+
+    if has_more:
+        next_seq = changes[-1]['seq']
+    else:
+        # Alles gelesen: auch über herausgefilterte Einträge hinweg vorrücken
+        next_seq = max([after, latest] + [change['seq'] for change in changes[-1:]])
+    return {'changes': changes, 'next': next_seq, 'has_more': has_more, 'reset': False}
+
+def _horizon(conn, days):
+    """Höchste seq, die älter als days Tage ist (0 wenn keine)"""
+    row = conn.execute("""
+        SELECT seq FROM change_log
+        WHERE changed_at < datetime('now', ?)
+        ORDER BY seq DESC LIMIT 1
+    """, (f'-{days} days',)).fetchone()
+    return row[0] if row else 0
+
+def compact(conn, retention_days, tombstone_days, batch_size=10000):
+    """Kompaktiert das Journal und liefert die Anzahl entfernter Einträge
+
+    Entfernt Einträge älter als retention_days, die durch einen neueren
+    Eintrag desselben Datensatzes überholt sind, sowie Löschungen und
+    Archivierungen älter als tombstone_days. Läuft in Blöcken zu je einer kurzen Schreibtransaktion.
+    """
+    horizon = _horizon(conn, retention_days)
+    tombstone_horizon = _horizon(conn, tombstone_days)
+    removed = {'superseded': 0, 'tombstones': 0}
+
+    lower = 0
+    while lower < horizon:
+        upper = min(lower + batch_size, horizon)
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            removed['superseded'] += conn.execute("""
+                DELETE FROM change_log
+                WHERE seq > ? AND seq <= ?
+                AND EXISTS (
+                    SELECT 1 FROM change_log newer
+                    WHERE newer.entity_type = change_log.entity_type
+                    AND newer.entity_key = change_log.entity_key
+                    AND newer.seq > change_log.seq
+                )
+            """, (lower, upper)).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        lower = upper
+
+    if tombstone_horizon:
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            purged = conn.execute("""
+                SELECT MAX(seq) FROM change_log WHERE op IN ('delete', 'archive') AND seq <= ?
+            """, (tombstone_horizon,)).fetchone()[0]
+            if purged:
+                removed['tombstones'] = conn.execute("""
+                    DELETE FROM change_log WHERE op IN ('delete', 'archive') AND seq <= ?
+                """, (purged,)).rowcount
+                _set_tombstone_watermark(conn, max(purged, get_tombstone_watermark(conn)))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    if removed['superseded'] or removed['tombstones']:
+        logger.info(f"Änderungsjournal kompaktiert: {removed['superseded']} überholte Einträge, "
+                    f"{removed['tombstones']} Löschungen entfernt")
+    return removed
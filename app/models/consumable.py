@@ -1,6 +1,15 @@
 from .database import BaseModel, Database
+from app.utils.pagination import ListSpec
+from app.models.archive import HistorySpec
 from datetime import datetime
 
+STOCK_STATUS_SQL = '''CASE
+                WHEN c.quantity = 0 THEN 'Leer'
+                WHEN c.quantity <= c.min_quantity * 0.5 THEN 'Kritisch'
+                WHEN c.quantity <= c.min_quantity THEN 'Nachbestellen'
+                ELSE 'Verfügbar'
+            END'''
+
 def get_consumables():
     """Holt alle aktiven Verbrauchsmaterialien aus der Datenbank"""
     results = Database.query('''
@@ -18,9 +27,83 @@ def get_consumables():
     ''')
     return [dict(row) for row in results] if results else []
 
+def withdraw(conn, consumable_barcode, worker_barcode, amount):
+    """Bucht eine Materialentnahme atomar (ohne Commit)
+
+    Prüfung und Abzug passieren in einem einzigen bedingten UPDATE, parallele
+    Entnahmen können den Bestand dadurch nie unter 0 drücken. Der Eintrag in
+    consumable_usages folgt in derselben Transaktion.
+    """
+    cursor = conn.execute("""
+        UPDATE consumables
+        SET quantity = quantity - ?
+        WHERE barcode = ? AND deleted = 0 AND quantity >= ?
+    """, (amount, consumable_barcode, amount))
+
+    if cursor.rowcount == 0:
+        row = conn.execute("""
+            SELECT quantity FROM consumables WHERE barcode = ? AND deleted = 0
+        """, (consumable_barcode,)).fetchone()
+        if not row:
+            return {'success': False, 'message': 'Verbrauchsmaterial nicht gefunden'}
+        return {
+            'success': False,
+            'message': 'Nicht genügend Material verfügbar',
+            'quantity': row[0]
+        }
+
+    conn.execute("""
+        INSERT INTO consumable_usages (consumable_barcode, worker_barcode, quantity, used_at)
+        VALUES (?, ?, ?, datetime('now'))
+    """, (consumable_barcode, worker_barcode, amount))
+    return {'success': True, 'message': 'Entnahme gebucht'}
+
 class Consumable(BaseModel):
     TABLE_NAME = 'consumables'
 
+    # Verbrauchsmaterialliste (/inventory/consumables/)
+    LIST = ListSpec(
+        columns=f'''
+            c.*,
+            c.quantity as current_stock,
+            {STOCK_STATUS_SQL} as stock_status''',
+        source='consumables c',
+        where='c.deleted = 0',
+        key='c.barcode',
+        sorts={
+            'name': ('c.name',),
+            'category': ("COALESCE(c.category, '')", 'c.name'),
+            'location': ("COALESCE(c.location, '')", 'c.name'),
+            'status': (STOCK_STATUS_SQL, 'c.name'),
+            'quantity': ('COALESCE(c.quantity, 0)', 'c.name'),
+            'min_quantity': ('COALESCE(c.min_quantity, 0)', 'c.name'),
+        },
+        default_sort='name',
+        filters={
+            'location': 'c.location = ?',
+            'category': 'c.category = ?',
+            'status': f'LOWER({STOCK_STATUS_SQL}) = LOWER(?)',
+        },
+        search=['c.name', 'c.barcode', 'c.location'],
+        name='consumables.list'
+    )
+
+    # Entnahmeverlauf der Detailseite, ältere Seiten auch aus dem Archiv
+    HISTORY = HistorySpec(
+        name='consumables.usage_history',
+        columns='''
+            cu.id,
+            w.firstname || ' ' || w.lastname as worker_name,
+            strftime('%d.%m.%Y %H:%M', cu.used_at) as timestamp,
+            cu.quantity as amount,
+            'Ausgabe' as action''',
+        source='''{consumable_usages} cu
+            JOIN workers w ON cu.worker_barcode = w.barcode''',
+        where='cu.consumable_barcode = ?',
+        sort="COALESCE(cu.used_at, '')",
+        key='cu.id'
+    )
+
     @staticmethod
     def get_all():
         sql = '''
@@ -0,0 +1,98 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Projektion "letzte Ausleihe pro Werkzeug": eine Zeile je Werkzeug mit der
+# jüngsten Ausleihe. Alle Schreibpfade auf lendings rufen refresh_tool() in
+# ihrer eigenen Transaktion auf.
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS tool_current_lending (
+        tool_barcode TEXT PRIMARY KEY,
+        lending_id INTEGER NOT NULL,
+        worker_barcode TEXT,
+        lent_at TIMESTAMP,
+        returned_at TIMESTAMP
+    )
+'''
+
+# Jüngste Ausleihe je Werkzeug (bei gleichem lent_at gewinnt die höhere ID)
+LATEST_LENDINGS_SQL = '''
+    SELECT tool_barcode, id AS lending_id, worker_barcode, lent_at, returned_at
+    FROM (
+        SELECT l.*,
+               ROW_NUMBER() OVER (
+                   PARTITION BY l.tool_barcode
+                   ORDER BY l.lent_at DESC, l.id DESC
+               ) AS rn
+        FROM lendings l
+        WHERE l.tool_barcode IS NOT NULL
+    )
+    WHERE rn = 1
+'''
+
+COLUMNS = ('lending_id', 'worker_barcode', 'lent_at', 'returned_at')
+
+def ensure_table(conn):
+    """Legt die Projektion an und füllt sie, falls sie noch nicht existiert"""
+    exists = conn.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'tool_current_lending'
+    """).fetchone()
+    if exists:
+        return False
+    conn.execute(CREATE_TABLE_SQL)
+    rebuild(conn)
+    return True
+
+def refresh_tool(conn, tool_barcode):
+    """Aktualisiert die Projektion für ein Werkzeug (ohne Commit)"""
+    conn.execute("DELETE FROM tool_current_lending WHERE tool_barcode = ?", (tool_barcode,))
+    conn.execute("""
+        INSERT INTO tool_current_lending
+            (tool_barcode, lending_id, worker_barcode, lent_at, returned_at)
+        SELECT tool_barcode, id, worker_barcode, lent_at, returned_at
+        FROM lendings
+        WHERE tool_barcode = ?
+        ORDER BY lent_at DESC, id DESC
+        LIMIT 1
+    """, (tool_barcode,))
+
+def rebuild(conn):
+    """Baut die Projektion komplett aus lendings neu auf"""
+    conn.execute("DELETE FROM tool_current_lending")
+    conn.execute(f"""
+        INSERT INTO tool_current_lending
+            (tool_barcode, lending_id, worker_barcode, lent_at, returned_at)
+        {LATEST_LENDINGS_SQL}
+    """)
+    count = conn.execute("SELECT COUNT(*) FROM tool_current_lending").fetchone()[0]
+    conn.commit()
+    logger.info(f"Projektion tool_current_lending neu aufgebaut ({count} Werkzeuge)")
+    return count
+
+def check(conn):
+    """Vergleicht die Projektion mit lendings
+
+    Gibt eine Liste von Abweichungen zurück (leer = konsistent).
+    """
+    expected = {row['tool_barcode']: row for row in conn.execute(LATEST_LENDINGS_SQL)}
+    actual = {row['tool_barcode']: row for row in conn.execute(
+        "SELECT * FROM tool_current_lending"
+    )}
+
+    differences = []
+    for barcode in sorted(expected.keys() | actual.keys()):
+        if barcode not in actual:
+            differences.append({'tool_barcode': barcode, 'problem': 'fehlt'})
+        elif barcode not in expected:
+            differences.append({'tool_barcode': barcode, 'problem': 'überzählig'})
+        else:
+            changed = [column for column in COLUMNS
+                       if expected[barcode][column] != actual[barcode][column]]
+            if changed:
+                differences.append({
+                    'tool_barcode': barcode,
+                    'problem': 'abweichend: ' + ', '.join(changed)
+                })
+    return differences
@@ -1,8 +1,19 @@
-from flask import g, current_app
+from flask import g, current_app, has_app_context
 import sqlite3
 from datetime import datetime
 import os
 import logging
+from app import config as default_config
+from app.models.db_pool import get_pool, reset_pool
+from app.utils import query_stats
+from app.models.indexes import ensure_indexes
+from app.models import current_lending
+from app.models import search_index
+from app.models import stats_counters
+from app.models import live_events
+from app.models import change_log
+from app.models import due_dates
+from app.models import usage_rollups
 
 logger = logging.getLogger(__name__)
 
@@ -14,25 +25,52 @@ class Database:
         # Basis-Pfad: Entweder PythonAnywhere oder lokales Verzeichnis
         base_path = '/home/aklann' if 'PYTHONANYWHERE_SITE' in os.environ else os.path.dirname(os.path.dirname(__file__))
         
+        # Expliziter Pfad (z.B. für Benchmarks mit einer Wegwerf-Datenbank)
+        if os.environ.get('SCANDY_DB_PATH'):
+            return os.environ['SCANDY_DB_PATH']
+
         # Datenbank-Pfad ist immer im übergeordneten Verzeichnis
         return os.path.join(base_path, 'database', 'inventory.db')
+
+    @staticmethod
+    def get_setting(key):
+        """Liest eine Einstellung aus der App-Konfiguration, sonst aus app/config.py"""
+        if has_app_context() and key in current_app.config:
+            return current_app.config[key]
+        return getattr(default_config, key)
+
+    @staticmethod
+    def get_pool():
+        """Liefert den Verbindungspool des aktuellen Prozesses"""
+        db_path = Database.get_database_path()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        profile = Database.get_setting('DB_PRAGMA_PROFILE')
+        factory = sqlite3.Connection
+        if Database.get_setting('QUERY_STATS_ENABLED'):
+            factory = query_stats.connection_factory(
+                Database.get_setting('SLOW_QUERY_MS'),
+                Database.get_setting('QUERY_STATS_SAMPLES')
+            )
+        return get_pool(
+            db_path,
+            size=Database.get_setting('DB_POOL_SIZE'),
+            pragmas=Database.get_setting('DB_PRAGMA_PROFILES')[profile],
+            cached_statements=Database.get_setting('DB_CACHED_STATEMENTS'),
+            timeout=Database.get_setting('DB_TIMEOUT'),
+            factory=factory
+        )
     
     @staticmethod
     def get_db():
         if 'db' not in g:
-            db_path = Database.get_database_path()
-            os.makedirs(os.path.dirname(db_path), exist_ok=True)
-            g.db = sqlite3.connect(db_path)
-            g.db.row_factory = sqlite3.Row
+            g.db = Database.get_pool().acquire()
         return g.db
 
     @staticmethod
     def get_db_connection():
         """Direkter Datenbankzugriff für Verwaltungsaufgaben"""
-        db_path = Database.get_database_path()
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        # Eigene Verbindung (der Aufrufer schließt sie), aber mit demselben Profil
+        return Database.get_pool().connect()
 
     @staticmethod
     def init_db():
@@ -43,9 +81,13 @@ class Database:
         if not os.path.exists(db_dir):
             os.makedirs(db_dir)
             
-        # Alte Datenbank löschen falls vorhanden
-        if os.path.exists(db_path):
-            os.remove(db_path)
+        # Gepoolte Verbindungen zeigen sonst noch auf die alte Datei
+        reset_pool()
+
+        # Alte Datenbank löschen falls vorhanden (inkl. WAL-Dateien)
+        for path in (db_path, db_path + '-wal', db_path + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
             
         conn = Database.get_db_connection()
         cursor = conn.cursor()
@@ -106,6 +148,7 @@ class Database:
                 worker_barcode TEXT,
                 lent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 returned_at TIMESTAMP,
+                due_at TIMESTAMP,
                 FOREIGN KEY (tool_barcode) REFERENCES tools (barcode),
                 FOREIGN KEY (worker_barcode) REFERENCES workers (barcode)
             )
@@ -143,14 +186,41 @@ class Database:
             )
         ''')
 
+        # Projektion der letzten Ausleihe pro Werkzeug
+        cursor.execute(current_lending.CREATE_TABLE_SQL)
+
+        # Volltextindex inkl. Trigger
+        search_index.create(conn)
+
+        # Dashboard-Zähler inkl. Trigger
+        stats_counters.create(conn)
+
+        # Verdichteter Materialverbrauch für Trendauswertungen
+        usage_rollups.create(conn)
+
+        # Ereignisse für die Live-Ansichten inkl. Trigger
+        live_events.create(conn)
+
+        # Änderungsjournal für inkrementelle Verbraucher inkl. Trigger
+        change_log.create(conn)
+
+        # Leihfristen, Fälligkeits-Trigger und Teilindex der offenen Ausleihen
+        due_dates.create(conn)
+        due_dates.set_periods(conn, Database.get_setting('LOAN_PERIOD_DAYS'),
+                              Database.get_setting('LOAN_PERIODS'))
+
         conn.commit()
+
+        # Indizes für die häufigen Abfragen
+        ensure_indexes(conn, force=True)
         conn.close()
 
     @staticmethod
-    def close_db():
+    def close_db(e=None):
+        """Gibt die Verbindung der Anfrage an den Pool zurück"""
         db = g.pop('db', None)
         if db is not None:
-            db.close()
+            Database.get_pool().release(db)
 
     @staticmethod
     def query(sql, params=(), one=False):
@@ -192,6 +262,7 @@ class Database:
                 """, (tool_barcode, worker_barcode))
                 
                 lending_id = cursor.lastrowid
+                current_lending.refresh_tool(conn, tool_barcode)
                 conn.commit()
                 
                 return {
@@ -302,10 +373,15 @@ class Database:
         try:
             with self.get_db() as conn:
                 cursor = conn.cursor()
+                row = cursor.execute(
+                    "SELECT tool_barcode FROM lendings WHERE id = ?", (lending_id,)
+                ).fetchone()
                 cursor.execute("""
                     DELETE FROM lendings 
                     WHERE id = ?
                 """, (lending_id,))
+                if row and row[0]:
+                    current_lending.refresh_tool(conn, row[0])
                 conn.commit()
                 return True
         except Exception as e:
@@ -364,7 +440,8 @@ class Database:
                         'success': False,
                         'message': 'Keine aktive Ausleihe gefunden'
                     }
-                    
+
+                current_lending.refresh_tool(conn, tool_barcode)
                 conn.commit()
                 return {
                     'success': True,
@@ -403,8 +480,12 @@ class Database:
                         deleted_at = datetime('now')
                     WHERE barcode = ?
                 """, (barcode,))
-                
+
+                # Papierkorb-Zähler in allen Workern neu laden
+                from app.utils import settings_cache
+                settings_cache.invalidate(conn)
                 conn.commit()
+                settings_cache.clear()
                 
                 return {
                     'success': True,
@@ -454,7 +535,12 @@ class Database:
                         deleted_at = datetime('now')
                     WHERE barcode = ?
                 """, [barcode])
+
+                # Papierkorb-Zähler in allen Workern neu laden
+                from app.utils import settings_cache
+                settings_cache.invalidate(conn)
                 conn.commit()
+                settings_cache.clear()
                 return {
                     'success': True,
                     'message': 'In Papierkorb verschoben'
@@ -490,7 +576,12 @@ class Database:
                         deleted_at = NULL
                     WHERE barcode = ?
                 """, [barcode])
+
+                # Papierkorb-Zähler in allen Workern neu laden
+                from app.utils import settings_cache
+                settings_cache.invalidate(conn)
                 conn.commit()
+                settings_cache.clear()
                 return {
                     'success': True,
                     'message': 'Erfolgreich wiederhergestellt'
@@ -524,7 +615,12 @@ class Database:
                     DELETE FROM {table}
                     WHERE barcode = ?
                 """, [barcode])
+
+                # Papierkorb-Zähler in allen Workern neu laden
+                from app.utils import settings_cache
+                settings_cache.invalidate(conn)
                 conn.commit()
+                settings_cache.clear()
                 return {
                     'success': True,
                     'message': 'Endgültig gelöscht'
@@ -565,6 +661,32 @@ def init_db():
 
         conn.commit()
 
+        # Indizes nachziehen (erst nach den Spalten, da sie category/location nutzen)
+        ensure_indexes(conn)
+
+        # Projektion der letzten Ausleihe anlegen und aus lendings füllen
+        current_lending.ensure_table(conn)
+
+        # Volltextindex anlegen und aus den Tabellen füllen
+        search_index.ensure_table(conn)
+
+        # Dashboard-Zähler anlegen und aus den Tabellen füllen
+        stats_counters.ensure_table(conn)
+
+        # Verbrauchs-Rollups anlegen und aus consumable_usages füllen
+        usage_rollups.ensure_table(conn)
+
+        # Ereignistabelle der Live-Ansichten samt Triggern anlegen
+        live_events.ensure_table(conn)
+
+        # Änderungsjournal anlegen und mit dem Bestand füllen
+        change_log.ensure_table(conn)
+
+        # Fälligkeit offener Ausleihen ergänzen und nachtragen
+        due_dates.ensure_table(conn, Database.get_setting('LOAN_PERIOD_DAYS'),
+                               Database.get_setting('LOAN_PERIODS'))
+        conn.commit()
+
 class BaseModel:
     TABLE_NAME = None
     
@@ -594,11 +716,8 @@ def init_database():
         os.makedirs('database')
 
 def close_db(e=None):
-    """Schließt die Datenbankverbindung"""
-    db = g.pop('db', None)
-    
-    if db is not None:
-        db.close()
+    """Gibt die Datenbankverbindung an den Pool zurück"""
+    Database.close_db(e)
 
 def show_db_structure():
     """Zeigt die Struktur der Datenbank an"""
@@ -0,0 +1,122 @@
+import os
+import queue
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Zähler für /metrics (pro Prozess, über reset_pool() hinweg)
+_counts_lock = threading.Lock()
+_counts = {'opened': 0, 'reused': 0}
+
+def _count(name):
+    with _counts_lock:
+        _counts[name] += 1
+
+def apply_pragmas(conn, pragmas):
+    """Setzt die PRAGMAs eines Profils auf einer Verbindung"""
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+class ConnectionPool:
+    """Prozesslokaler Pool vorkonfigurierter SQLite-Verbindungen"""
+
+    def __init__(self, db_path, size=4, pragmas=None, cached_statements=128, timeout=5.0,
+                 factory=sqlite3.Connection):
+        self.db_path = db_path
+        self.size = size
+        self.pragmas = dict(pragmas or {})
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self.factory = factory
+        self.pid = os.getpid()
+        # LIFO: die zuletzt benutzte Verbindung hat den wärmsten Cache
+        self._idle = queue.LifoQueue(maxsize=max(size, 1))
+
+    def connect(self):
+        """Öffnet eine neue Verbindung mit dem konfigurierten Profil"""
+        _count('opened')
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            cached_statements=self.cached_statements,
+            factory=self.factory,
+            check_same_thread=False  # Gunicorn-Threads teilen sich den Pool
+        )
+        conn.row_factory = sqlite3.Row
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def acquire(self):
+        """Gibt eine freie Verbindung aus dem Pool oder eine neue zurück"""
+        if self.size > 0:
+            try:
+                conn = self._idle.get_nowait()
+                _count('reused')
+                return conn
+            except queue.Empty:
+                pass
+        return self.connect()
+
+    def release(self, conn):
+        """Gibt eine Verbindung an den Pool zurück"""
+        try:
+            # Offene Transaktionen dürfen nicht in die nächste Anfrage wandern
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error as e:
+            logger.warning(f"Verbindung wird verworfen: {e}")
+            conn.close()
+            return
+
+        if self.size <= 0 or os.getpid() != self.pid:
+            conn.close()
+            return
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        """Schließt alle freien Verbindungen"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool = None
+
+def get_pool(db_path, size, pragmas, cached_statements, timeout, factory=sqlite3.Connection):
+    """Liefert den Pool des aktuellen Prozesses und legt ihn bei Bedarf an"""
+    global _pool
+    settings = (db_path, size, pragmas, cached_statements, timeout, factory)
+    if (_pool is None
+            or _pool.pid != os.getpid()
+            or (_pool.db_path, _pool.size, _pool.pragmas,
+                _pool.cached_statements, _pool.timeout, _pool.factory) != settings):
+        # Nach einem Fork gehören die alten Verbindungen dem Elternprozess
+        if _pool is not None and _pool.pid == os.getpid():
+            _pool.close_all()
+        _pool = ConnectionPool(db_path, size, pragmas, cached_statements, timeout, factory)
+    return _pool
+
+def reset_pool():
+    """Schließt alle Verbindungen des Pools (z.B. vor dem Neuanlegen der Datenbank)"""
+    global _pool
+    if _pool is not None and _pool.pid == os.getpid():
+        _pool.close_all()
+    _pool = None
+
+def pool_stats():
+    """Geöffnete und wiederverwendete Verbindungen sowie freie Verbindungen im Pool"""
+    with _counts_lock:
+        stats = dict(_counts)
+    pool = _pool
+    if pool is not None and pool.pid != os.getpid():
+        pool = None
+    stats['idle'] = pool._idle.qsize() if pool is not None else 0
+    return stats
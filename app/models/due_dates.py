@@ -0,0 +1,162 @@
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Fälligkeit von Ausleihen. Ein Trigger setzt due_at beim Eintragen einer
+# Ausleihe aus lent_at plus der Leihfrist der Werkzeugkategorie (Tabelle
+# loan_periods, Kategorie '' = Standard), egal über welchen Schreibpfad sie
+# kommt. Der Teilindex idx_lendings_open_due enthält nur offene Ausleihen,
+# sortiert nach Fälligkeit: überfällige Ausleihen sind sein Anfang, die
+# Abfrage liest also nur die überfälligen Einträge statt der ganzen Historie.
+# Geänderte Leihfristen gelten für neue Ausleihen; bestehende offene
+# Ausleihen passt recompute_open() an.
+
+# Standard-Leihfrist in der Tabelle
+DEFAULT_CATEGORY = ''
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS loan_periods (
+        category TEXT PRIMARY KEY,
+        days INTEGER NOT NULL CHECK (days > 0)
+    ) WITHOUT ROWID
+'''
+
+CREATE_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_lendings_open_due
+    ON lendings (due_at) WHERE returned_at IS NULL
+'''
+
+# Leihfrist in Tagen für die Ausleihe {p} (Kategorie des Werkzeugs, sonst Standard)
+PERIOD_SQL = '''COALESCE(
+            (SELECT lp.days FROM loan_periods lp
+             JOIN tools t ON t.category = lp.category
+             WHERE t.barcode = {p}.tool_barcode),
+            (SELECT days FROM loan_periods WHERE category = ''),
+            14)'''
+
+DUE_AT_SQL = "datetime(COALESCE({p}.lent_at, CURRENT_TIMESTAMP), '+' || " + PERIOD_SQL + " || ' days')"
+
+TRIGGER_SQL = f'''
+    CREATE TRIGGER IF NOT EXISTS lendings_due_at AFTER INSERT ON lendings
+    WHEN new.due_at IS NULL
+    BEGIN
+        UPDATE lendings SET due_at = {DUE_AT_SQL.format(p='new')}
+        WHERE id = new.id;
+    END
+'''
+
+OVERDUE_SQL = '''
+    SELECT
+        l.id,
+        l.tool_barcode,
+        t.name AS tool_name,
+        t.category,
+        l.worker_barcode,
+        w.firstname || ' ' || w.lastname AS worker_name,
+        w.department,
+        l.lent_at,
+        l.due_at,
+        CAST(julianday(?) - julianday(l.due_at) AS INTEGER) AS days_overdue
+    FROM lendings l INDEXED BY idx_lendings_open_due
+    LEFT JOIN tools t ON t.barcode = l.tool_barcode
+    LEFT JOIN workers w ON w.barcode = l.worker_barcode
+    WHERE l.returned_at IS NULL
+    AND l.due_at < ?
+    ORDER BY l.due_at
+'''
+
+def _now(now=None):
+    return (now or datetime.utcnow()).strftime('%Y-%m-%d %H:%M:%S')
+
+def create(conn):
+    """Legt Leihfristen, Teilindex und Trigger an (lendings.due_at muss existieren, ohne Commit)"""
+    conn.execute(CREATE_TABLE_SQL)
+    conn.execute(CREATE_INDEX_SQL)
+    conn.execute(TRIGGER_SQL)
+
+def set_periods(conn, default_days=None, periods=None):
+    """Setzt die Standard-Leihfrist und/oder Leihfristen pro Kategorie (ohne Commit)"""
+    values = dict(periods or {})
+    if default_days is not None:
+        values[DEFAULT_CATEGORY] = default_days
+    conn.executemany("""
+        INSERT INTO loan_periods (category, days) VALUES (?, ?)
+        ON CONFLICT(category) DO UPDATE SET days = excluded.days
+    """, [(category, int(days)) for category, days in values.items()])
+
+def get_periods(conn):
+    """Leihfristen als {Kategorie: Tage}, '' ist der Standard"""
+    return {row['category']: row['days'] for row in conn.execute(
+        "SELECT category, days FROM loan_periods ORDER BY category"
+    )}
+
+def recompute_open(conn, only_missing=False):
+    """Berechnet due_at offener Ausleihen neu, liefert die Anzahl (ohne Commit)"""
+    condition = ' AND due_at IS NULL' if only_missing else ''
+    return conn.execute(f"""
+        UPDATE lendings SET due_at = {DUE_AT_SQL.format(p='lendings')}
+        WHERE returned_at IS NULL{condition}
+    """).rowcount
+
+def ensure_table(conn, default_days=14, periods=None):
+    """Ergänzt lendings.due_at samt Leihfristen, Index und Trigger, falls sie fehlen
+
+    Die Leihfristen werden nur beim ersten Anlegen aus den übergebenen
+    Werten (LOAN_PERIOD_DAYS/LOAN_PERIODS) befüllt, danach gilt die Tabelle.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(lendings)")}
+    exists = conn.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'loan_periods'
+    """).fetchone()
+    if 'due_at' in columns and exists:
+        return False
+
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if 'due_at' not in columns:
+            conn.execute("ALTER TABLE lendings ADD COLUMN due_at TIMESTAMP")
+        create(conn)
+        if not exists:
+            set_periods(conn, default_days, periods)
+        count = recompute_open(conn, only_missing=True)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info(f"Fälligkeiten für {count} offene Ausleihen nachgetragen")
+    return True
+
+def overdue(conn, limit=None, now=None):
+    """Überfällige offene Ausleihen, die am längsten überfälligen zuerst"""
+    sql = OVERDUE_SQL
+    params = [_now(now), _now(now)]
+    if limit:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return [dict(row) for row in conn.execute(sql, params)]
+
+def count_overdue(conn, now=None):
+    """Anzahl überfälliger Ausleihen (zählt nur den Anfang des Teilindex)"""
+    return conn.execute("""
+        SELECT COUNT(*) FROM lendings INDEXED BY idx_lendings_open_due
+        WHERE returned_at IS NULL AND due_at < ?
+    """, (_now(now),)).fetchone()[0]
+
+# Spalten der Tagesübersicht (Schlüssel aus overdue())
+DIGEST_COLUMNS = [
+    ('tool_barcode', 'Werkzeug'),
+    ('tool_name', 'Werkzeugname'),
+    ('category', 'Kategorie'),
+    ('worker_barcode', 'Mitarbeiter'),
+    ('worker_name', 'Mitarbeitername'),
+    ('department', 'Abteilung'),
+    ('lent_at', 'Ausgeliehen'),
+    ('due_at', 'Fällig'),
+    ('days_overdue', 'Tage überfällig'),
+]
+
+def digest_filename(day=None):
+    return f"overdue_{(day or datetime.now()).strftime('%Y-%m-%d')}.csv"
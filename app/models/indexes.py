@@ -0,0 +1,71 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bei jeder Änderung an INDEXES erhöhen, damit bestehende Datenbanken nachziehen
+INDEX_VERSION = 1
+
+# (Name, Tabelle, Definition) – Definition ohne "CREATE INDEX name ON"
+INDEXES = [
+    # Offene Ausleihen (Teilindizes, bleiben klein egal wie lang die Historie ist)
+    ('idx_lendings_open_tool', 'lendings', '(tool_barcode) WHERE returned_at IS NULL'),
+    ('idx_lendings_open_worker', 'lendings', '(worker_barcode) WHERE returned_at IS NULL'),
+    ('idx_lendings_open_lent_at', 'lendings', '(lent_at) WHERE returned_at IS NULL'),
+
+    # Ausleihhistorie pro Werkzeug / Mitarbeiter
+    ('idx_lendings_tool_lent_at', 'lendings', '(tool_barcode, lent_at)'),
+    ('idx_lendings_worker_lent_at', 'lendings', '(worker_barcode, lent_at)'),
+
+    # Verbrauchsmaterial-Nutzungen
+    ('idx_usages_consumable_used_at', 'consumable_usages', '(consumable_barcode, used_at)'),
+    ('idx_usages_worker_used_at', 'consumable_usages', '(worker_barcode, used_at)'),
+    ('idx_usages_used_at', 'consumable_usages', '(used_at)'),
+
+    # Listenansichten (abdeckend: Sortierung und Spalten ohne Tabellenzugriff)
+    ('idx_tools_deleted_name', 'tools', '(deleted, name, barcode, location, status, category)'),
+    ('idx_consumables_deleted_name', 'consumables',
+     '(deleted, name, barcode, location, category, quantity, min_quantity)'),
+    ('idx_workers_deleted_name', 'workers', '(deleted, lastname, firstname, barcode, department)'),
+]
+
+# Indizes früherer Versionen, die nicht mehr gebraucht werden
+OBSOLETE_INDEXES = []
+
+def get_index_version(conn):
+    """Liest die installierte Index-Version aus den Einstellungen"""
+    row = conn.execute(
+        "SELECT value FROM settings WHERE key = 'index_version'"
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+def ensure_indexes(conn, force=False):
+    """Legt fehlende Indizes an und aktualisiert die Index-Version
+
+    Gibt True zurück, wenn Indizes angelegt oder entfernt wurden.
+    """
+    if not force and get_index_version(conn) >= INDEX_VERSION:
+        return False
+
+    existing_tables = {row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    )}
+
+    for name in OBSOLETE_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    for name, table, definition in INDEXES:
+        if table not in existing_tables:
+            logger.warning(f"Index {name} übersprungen: Tabelle {table} fehlt")
+            continue
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}")
+
+    conn.execute("""
+        INSERT OR REPLACE INTO settings (key, value)
+        VALUES ('index_version', ?)
+    """, (str(INDEX_VERSION),))
+
+    # Statistiken für den Query-Planer aktualisieren
+    conn.execute("ANALYZE")
+    conn.commit()
+    logger.info(f"Indizes auf Version {INDEX_VERSION} gebracht")
+    return True
@@ -0,0 +1,170 @@
+import json
+
+# Ereignisse für die Live-Ansichten (/api/events, Server-Sent Events).
+# Trigger auf lendings, consumable_usages, tools, consumables und workers
+# schreiben jede Ausleihe, Rückgabe, Entnahme, Bestands-, Status- und
+# Papierkorbänderung in derselben Transaktion nach live_events, egal über
+# welchen Schreibpfad sie kommt. Die fortlaufende id ist die Event-ID des
+# Streams (Last-Event-ID); ein Insert-Trigger hält nur die letzten KEEP
+# Ereignisse. Wer weiter zurückliegt, bekommt ein "reset" und lädt neu.
+
+# Anzahl aufbewahrter Ereignisse
+KEEP = 5000
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS live_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event TEXT NOT NULL,
+        entity_type TEXT NOT NULL,
+        barcode TEXT,
+        data TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+WORKER_NAME_SQL = "(SELECT firstname || ' ' || lastname FROM workers WHERE barcode = {p}.worker_barcode)"
+
+# Triggername -> (Tabelle, Ereignis, Zeitpunkt, Bedingung, Entitätstyp, Barcode, JSON-Nutzlast)
+TRIGGERS = {
+    'lendings_live_ai': ('lendings', 'lending', 'AFTER INSERT', None, "'tool'", 'new.tool_barcode', f'''
+        json_object(
+            'tool_barcode', new.tool_barcode,
+            'tool_name', (SELECT name FROM tools WHERE barcode = new.tool_barcode),
+            'worker_barcode', new.worker_barcode,
+            'worker_name', {WORKER_NAME_SQL.format(p='new')},
+            'lent_at', new.lent_at
+        )'''),
+    'lendings_live_au': ('lendings', 'return', 'AFTER UPDATE OF returned_at',
+                         'old.returned_at IS NULL AND new.returned_at IS NOT NULL',
+                         "'tool'", 'new.tool_barcode', '''
+        json_object(
+            'tool_barcode', new.tool_barcode,
+            'worker_barcode', new.worker_barcode,
+            'returned_at', new.returned_at
+        )'''),
+    'consumable_usages_live_ai': ('consumable_usages', 'usage', 'AFTER INSERT', None,
+                                  "'consumable'", 'new.consumable_barcode', f'''
+        json_object(
+            'consumable_barcode', new.consumable_barcode,
+            'consumable_name', (SELECT name FROM consumables WHERE barcode = new.consumable_barcode),
+            'worker_barcode', new.worker_barcode,
+            'worker_name', {WORKER_NAME_SQL.format(p='new')},
+            'quantity', new.quantity,
+            'used_at', new.used_at
+        )'''),
+    'consumables_live_stock': ('consumables', 'stock', 'AFTER UPDATE OF quantity',
+                               'old.quantity IS NOT new.quantity',
+                               "'consumable'", 'new.barcode', '''
+        json_object(
+            'id', new.id,
+            'name', new.name,
+            'quantity', new.quantity,
+            'min_quantity', new.min_quantity
+        )'''),
+    'tools_live_status': ('tools', 'status', 'AFTER UPDATE OF status',
+                          'old.status IS NOT new.status',
+                          "'tool'", 'new.barcode', '''
+        json_object(
+            'id', new.id,
+            'name', new.name,
+            'status', new.status
+        )'''),
+}
+
+# Papierkorb: Löschen/Wiederherstellen (deleted) und endgültiges Löschen
+TRASH_NAMES = {
+    'tools': ('tool', '{p}.name'),
+    'consumables': ('consumable', '{p}.name'),
+    'workers': ('worker', "{p}.firstname || ' ' || {p}.lastname"),
+}
+
+for _table, (_entity, _name) in TRASH_NAMES.items():
+    TRIGGERS[f'{_table}_live_trash'] = (
+        _table, 'trash', 'AFTER UPDATE OF deleted',
+        'COALESCE(old.deleted, 0) != COALESCE(new.deleted, 0)',
+        f"'{_entity}'", 'new.barcode', f'''
+        json_object(
+            'action', CASE WHEN new.deleted = 1 THEN 'deleted' ELSE 'restored' END,
+            'name', {_name.format(p='new')},
+            'deleted_at', new.deleted_at
+        )''')
+    TRIGGERS[f'{_table}_live_purge'] = (
+        _table, 'trash', 'AFTER DELETE', None, f"'{_entity}'", 'old.barcode', f'''
+        json_object(
+            'action', 'purged',
+            'name', {_name.format(p='old')}
+        )''')
+
+def trigger_sql(name):
+    """Liefert das CREATE TRIGGER-Statement eines Ereignis-Triggers"""
+    table, event, timing, condition, entity_type, barcode, data = TRIGGERS[name]
+    when = f'\n        WHEN {condition}' if condition else ''
+    return f'''CREATE TRIGGER IF NOT EXISTS {name} {timing} ON {table}{when}
+        BEGIN
+            INSERT INTO live_events (event, entity_type, barcode, data)
+            VALUES ('{event}', {entity_type}, {barcode}, {data});
+        END'''
+
+TRIM_TRIGGER_SQL = f'''
+    CREATE TRIGGER IF NOT EXISTS live_events_trim AFTER INSERT ON live_events
+    BEGIN
+        DELETE FROM live_events WHERE id <= new.id - {KEEP};
+    END
+'''
+
+def create(conn):
+    """Legt Tabelle und Trigger an (ohne Commit)"""
+    conn.execute(CREATE_TABLE_SQL)
+    conn.execute(TRIM_TRIGGER_SQL)
+    for name in TRIGGERS:
+        conn.execute(trigger_sql(name))
+
+def ensure_table(conn):
+    """Legt die Ereignistabelle an, falls sie noch nicht existiert"""
+    exists = conn.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'live_events'
+    """).fetchone()
+    if exists:
+        return False
+    create(conn)
+    conn.commit()
+    return True
+
+def latest_id(conn):
+    """ID des neuesten Ereignisses (0 ohne Ereignisse)"""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'live_events'").fetchone()
+    return row[0] if row else 0
+
+def since(conn, last_id, limit=100):
+    """Ereignisse nach last_id als (Liste, reset)
+
+    reset ist True, wenn Ereignisse nach last_id bereits gelöscht wurden
+    oder last_id nicht zu dieser Datenbank passt; der Client muss dann neu laden.
+    """
+    latest = latest_id(conn)
+    if last_id > latest:
+        return [], True
+    if last_id == latest:
+        return [], False
+    rows = conn.execute("""
+        SELECT id, event, entity_type, barcode, data, created_at
+        FROM live_events
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+    """, (last_id, limit)).fetchall()
+    # AUTOINCREMENT vergibt lückenlos, eine Lücke heißt: bereits gelöscht
+    if not rows or rows[0]['id'] > last_id + 1:
+        return [], True
+    return [
+        {
+            'id': row['id'],
+            'event': row['event'],
+            'entity_type': row['entity_type'],
+            'barcode': row['barcode'],
+            'data': json.loads(row['data']) if row['data'] else {},
+            'created_at': row['created_at'],
+        }
+        for row in rows
+    ], False
@@ -0,0 +1,68 @@
+# Benannte Abfragen der Listen- und Detailseiten. register() stellt dem SQL
+# den Namen als Kommentar voran (/* tools.details */ SELECT ...); darüber
+# ordnet app/utils/query_stats.py die Laufzeiten zu, auch im Slow-Log.
+# Nicht registriertes SQL wird nach seiner Aufrufstelle benannt.
+
+# Name -> SQL
+QUERIES = {}
+
+def register(name, sql):
+    """Registriert eine Abfrage und liefert das SQL mit Namenskommentar"""
+    if name in QUERIES:
+        raise ValueError(f'Abfrage bereits registriert: {name}')
+    QUERIES[name] = f'/* {name} */ {sql.strip()}'
+    return QUERIES[name]
+
+def named(name, sql):
+    """SQL mit Namenskommentar ohne Registrierung (dynamisch zusammengesetzte Abfragen)"""
+    return f'/* {name} */ {sql.strip()}'
+
+# Werkzeuge
+
+TOOL_LOCATIONS = register('tools.locations', '''
+    SELECT DISTINCT location FROM tools WHERE location IS NOT NULL AND deleted = 0 ORDER BY location
+''')
+
+TOOL_DETAILS = register('tools.details', '''
+    SELECT * FROM tools
+    WHERE barcode = ? AND deleted = 0
+''')
+
+# Mitarbeiter
+
+WORKER_DETAILS = register('workers.details', '''
+    SELECT * FROM workers WHERE barcode = ? AND deleted = 0
+''')
+
+WORKER_CURRENT_LENDINGS = register('workers.current_lendings', '''
+    SELECT
+        t.name as tool_name,
+        t.barcode as tool_barcode,
+        strftime('%d.%m.%Y %H:%M', l.lent_at) as lent_at,
+        'Werkzeug' as item_type,
+        1 as amount_display
+    FROM lendings l
+    JOIN tools t ON l.tool_barcode = t.barcode
+    WHERE l.worker_barcode = ?
+    AND l.returned_at IS NULL
+    ORDER BY l.lent_at DESC
+''')
+
+WORKER_SEARCH = register('workers.search', '''
+    SELECT w.* FROM search_index s
+    JOIN workers w ON w.barcode = s.barcode
+    WHERE search_index MATCH ?
+    AND s.entity_type = 'worker'
+    AND w.deleted = 0
+    ORDER BY s.rank
+''')
+
+# Verbrauchsmaterial
+
+CONSUMABLE_LOCATIONS = register('consumables.locations', '''
+    SELECT DISTINCT location FROM consumables WHERE location IS NOT NULL AND deleted = 0 ORDER BY location
+''')
+
+CONSUMABLE_CATEGORIES = register('consumables.categories', '''
+    SELECT DISTINCT category FROM consumables WHERE category IS NOT NULL AND deleted = 0 ORDER BY category
+''')
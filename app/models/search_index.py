@@ -0,0 +1,139 @@
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Volltextindex (FTS5) über Werkzeuge, Verbrauchsmaterial und Mitarbeiter.
+# Trigger auf den Quelltabellen halten ihn aktuell; gelöschte Einträge
+# (deleted = 1) stehen nicht im Index. Die rowid ergibt sich aus der ID der
+# Quellzeile (id * 3 + Offset des Typs), damit Trigger per rowid löschen
+# können statt den Index zu durchsuchen.
+
+# Typ -> (Tabelle, rowid-Offset, Ausdrücke für barcode/title/description/category/location)
+# {p} steht für die Quellzeile (new im Trigger, src beim Neuaufbau)
+SOURCES = {
+    'tool': ('tools', 0, '{p}.barcode, {p}.name, {p}.description, {p}.category, {p}.location'),
+    'consumable': ('consumables', 1, '{p}.barcode, {p}.name, {p}.description, {p}.category, {p}.location'),
+    'worker': ('workers', 2, "{p}.barcode, {p}.firstname || ' ' || {p}.lastname, {p}.email, {p}.department, NULL"),
+}
+
+# Spalten, deren Änderung den Index betrifft (für AFTER UPDATE OF ...)
+WATCHED_COLUMNS = {
+    'tool': 'barcode, name, description, category, location, deleted',
+    'consumable': 'barcode, name, description, category, location, deleted',
+    'worker': 'barcode, firstname, lastname, email, department, deleted',
+}
+
+CREATE_TABLE_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        entity_type UNINDEXED,
+        barcode,
+        title,
+        description,
+        category,
+        location,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+'''
+
+# Gewichtung für bm25() in Spaltenreihenfolge: Treffer im Namen zählen am meisten
+RANK_WEIGHTS = (0.0, 5.0, 10.0, 1.0, 2.0, 2.0)
+
+def _row_values(entity_type, prefix):
+    _, offset, columns = SOURCES[entity_type]
+    return f"{prefix}.id * 3 + {offset}, '{entity_type}', " + columns.format(p=prefix)
+
+def trigger_sql(entity_type):
+    """Liefert die CREATE TRIGGER-Statements für einen Typ"""
+    table, offset, _ = SOURCES[entity_type]
+    insert = f'''
+        INSERT INTO search_index
+            (rowid, entity_type, barcode, title, description, category, location)
+        SELECT {_row_values(entity_type, 'new')}
+        WHERE COALESCE(new.deleted, 0) = 0;'''
+    delete = f'''
+        DELETE FROM search_index WHERE rowid = old.id * 3 + {offset};'''
+    return [
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_search_ai AFTER INSERT ON {table}
+        BEGIN{insert}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_search_au
+        AFTER UPDATE OF {WATCHED_COLUMNS[entity_type]} ON {table}
+        BEGIN{delete}{insert}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_search_ad AFTER DELETE ON {table}
+        BEGIN{delete}
+        END''',
+    ]
+
+def create(conn):
+    """Legt Index und Trigger an (ohne Befüllung, ohne Commit)"""
+    conn.execute(CREATE_TABLE_SQL)
+    for entity_type in SOURCES:
+        for sql in trigger_sql(entity_type):
+            conn.execute(sql)
+
+def ensure_table(conn):
+    """Legt den Index an und füllt ihn, falls er noch nicht existiert"""
+    exists = conn.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'search_index'
+    """).fetchone()
+    if exists:
+        return False
+    create(conn)
+    rebuild(conn)
+    return True
+
+def rebuild(conn):
+    """Füllt den Index komplett neu aus den Quelltabellen und optimiert ihn"""
+    create(conn)
+    conn.execute("DELETE FROM search_index")
+    for entity_type, (table, _, _) in SOURCES.items():
+        conn.execute(f'''
+            INSERT INTO search_index
+                (rowid, entity_type, barcode, title, description, category, location)
+            SELECT {_row_values(entity_type, 'src')}
+            FROM {table} src
+            WHERE COALESCE(src.deleted, 0) = 0
+        ''')
+    count = conn.execute("SELECT COUNT(*) FROM search_index").fetchone()[0]
+    optimize(conn)
+    logger.info(f"Suchindex neu aufgebaut ({count} Einträge)")
+    return count
+
+def optimize(conn):
+    """Fasst die Segmente des Index zusammen (nach vielen Änderungen sinnvoll)"""
+    conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    conn.commit()
+
+def build_match_query(text):
+    """Wandelt eine Benutzereingabe in eine FTS5-Abfrage mit Präfixsuche um
+
+    Jedes Wort muss als Wortanfang vorkommen ("bohr" findet "Bohrmaschine").
+    Sonderzeichen werden nicht als FTS5-Syntax ausgewertet.
+    """
+    terms = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search(conn, text, entity_types=None, limit=20):
+    """Sucht im Index und liefert die Treffer nach Relevanz sortiert"""
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    sql = f'''
+        SELECT entity_type, barcode, title, description, category, location,
+               bm25(search_index, {weights}) AS score
+        FROM search_index
+        WHERE search_index MATCH ?
+    '''
+    params = [match]
+    if entity_types:
+        sql += f" AND entity_type IN ({', '.join('?' * len(entity_types))})"
+        params.extend(entity_types)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(limit)
+    return [dict(row) for row in conn.execute(sql, params)]
@@ -0,0 +1,193 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Zähler für das Dashboard (Bestand nach Status, Lagerstand, Mitarbeiter pro
+# Abteilung, aktive Ausleihen). Trigger auf den Quelltabellen pflegen sie in
+# derselben Transaktion wie die Änderung, egal über welchen Schreibpfad sie
+# kommt. Das Dashboard liest dadurch nur ein paar Zeilen statt die Tabellen zu
+# aggregieren. reconcile() baut die Zähler aus den Tabellen neu auf und sollte
+# regelmäßig laufen ("flask reconcile-stats", z.B. per Cron).
+
+# Lagerstand eines Verbrauchsmaterials
+STOCK_BUCKET_SQL = '''CASE
+        WHEN {p}.quantity > {p}.min_quantity THEN 'sufficient'
+        WHEN {p}.quantity = 0 THEN 'empty'
+        WHEN {p}.quantity > 0 THEN 'low'
+        ELSE 'other'
+    END'''
+
+# Tabelle -> (Bedingung für "zählt", Liste von (Zählername, Zusatzbedingung))
+# {p} steht für die Zeile (new/old im Trigger, src beim Neuaufbau)
+SOURCES = {
+    'tools': ('COALESCE({p}.deleted, 0) = 0', [
+        ("'tools.total'", None),
+        ("'tools.status:' || {p}.status", '{p}.status IS NOT NULL'),
+    ]),
+    'consumables': ('COALESCE({p}.deleted, 0) = 0', [
+        ("'consumables.total'", None),
+        ("'consumables.stock:' || " + STOCK_BUCKET_SQL, None),
+    ]),
+    'workers': ('COALESCE({p}.deleted, 0) = 0', [
+        ("'workers.total'", None),
+        ("'workers.department:' || {p}.department", '{p}.department IS NOT NULL'),
+    ]),
+    'lendings': ('{p}.returned_at IS NULL', [
+        ("'lendings.active'", None),
+    ]),
+}
+
+# Spalten, deren Änderung die Zähler betrifft (für AFTER UPDATE OF ...)
+WATCHED_COLUMNS = {
+    'tools': 'status, deleted',
+    'consumables': 'quantity, min_quantity, deleted',
+    'workers': 'department, deleted',
+    'lendings': 'returned_at',
+}
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+'''
+
+def _bump(table, row, delta):
+    """Trigger-Statements, die alle Zähler einer Zeile um delta verändern"""
+    counted, counters = SOURCES[table]
+    statements = []
+    for name, condition in counters:
+        where = counted.format(p=row)
+        if condition:
+            where += ' AND ' + condition.format(p=row)
+        statements.append(f'''
+        INSERT INTO stats_counters (name, value)
+        SELECT {name.format(p=row)}, {delta}
+        WHERE {where}
+        ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;''')
+    return ''.join(statements)
+
+def trigger_sql(table):
+    """Liefert die CREATE TRIGGER-Statements für eine Tabelle"""
+    return [
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_stats_ai AFTER INSERT ON {table}
+        BEGIN{_bump(table, 'new', 1)}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_stats_au
+        AFTER UPDATE OF {WATCHED_COLUMNS[table]} ON {table}
+        BEGIN{_bump(table, 'old', -1)}{_bump(table, 'new', 1)}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_stats_ad AFTER DELETE ON {table}
+        BEGIN{_bump(table, 'old', -1)}
+        END''',
+    ]
+
+def create(conn):
+    """Legt Tabelle und Trigger an (ohne Befüllung, ohne Commit)"""
+    conn.execute(CREATE_TABLE_SQL)
+    for table in SOURCES:
+        for sql in trigger_sql(table):
+            conn.execute(sql)
+
+def ensure_table(conn):
+    """Legt die Zähler an und füllt sie, falls sie noch nicht existieren"""
+    exists = conn.execute("""
+        SELECT 1 FROM sqlite_master
+        WHERE type = 'table' AND name = 'stats_counters'
+    """).fetchone()
+    if exists:
+        return False
+    create(conn)
+    reconcile(conn)
+    return True
+
+def aggregate(conn):
+    """Zählt alles frisch aus den Quelltabellen (teuer, nur für Abgleich)"""
+    selects = []
+    for table, (counted, counters) in SOURCES.items():
+        for name, condition in counters:
+            where = counted.format(p='src')
+            if condition:
+                where += ' AND ' + condition.format(p='src')
+            selects.append(f'''
+                SELECT {name.format(p='src')} AS name, COUNT(*) AS value
+                FROM {table} src
+                WHERE {where}
+                GROUP BY 1''')
+    return {row['name']: row['value']
+            for row in conn.execute(' UNION ALL '.join(selects))}
+
+def read(conn):
+    """Liefert alle Zähler als Dictionary (ohne Nullwerte)"""
+    return {row['name']: row['value'] for row in conn.execute(
+        "SELECT name, value FROM stats_counters WHERE value != 0"
+    )}
+
+def check(conn):
+    """Vergleicht die Zähler mit einer frischen Zählung, liefert die Abweichungen"""
+    stored = read(conn)
+    fresh = aggregate(conn)
+    return [
+        {'name': name, 'stored': stored.get(name, 0), 'actual': fresh.get(name, 0)}
+        for name in sorted(set(stored) | set(fresh))
+        if stored.get(name, 0) != fresh.get(name, 0)
+    ]
+
+def reconcile(conn):
+    """Setzt alle Zähler auf eine frische Zählung und liefert die Abweichungen
+
+    Läuft als eine Schreibtransaktion, damit parallel laufende Trigger
+    nicht zwischen Zählen und Schreiben verloren gehen.
+    """
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        differences = check(conn)
+        conn.execute("DELETE FROM stats_counters")
+        conn.executemany(
+            "INSERT INTO stats_counters (name, value) VALUES (?, ?)",
+            aggregate(conn).items()
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if differences:
+        logger.warning(f"Statistik-Zähler korrigiert: {len(differences)} Abweichungen")
+    return differences
+
+def _value(counters, name):
+    return counters.get(name, 0)
+
+def dashboard_stats(conn):
+    """Kennzahlen für Dashboard und Inventarübersicht aus den Zählern"""
+    counters = read(conn)
+    departments = sorted(
+        (name.split(':', 1)[1], value)
+        for name, value in counters.items()
+        if name.startswith('workers.department:')
+    )
+    low = _value(counters, 'consumables.stock:low')
+    empty = _value(counters, 'consumables.stock:empty')
+    return {
+        'tools': {
+            'total': _value(counters, 'tools.total'),
+            'available': _value(counters, 'tools.status:Verfügbar'),
+            'lent': _value(counters, 'tools.status:Ausgeliehen'),
+            'defect': _value(counters, 'tools.status:Defekt'),
+        },
+        'consumables': {
+            'total': _value(counters, 'consumables.total'),
+            'sufficient': _value(counters, 'consumables.stock:sufficient'),
+            'low': low,
+            'empty': empty,
+            'low_stock': low + empty,
+        },
+        'workers': {
+            'total': _value(counters, 'workers.total'),
+            'departments': [{'name': name, 'count': count} for name, count in departments],
+        },
+        'lendings': {
+            'active': _value(counters, 'lendings.active'),
+        },
+    }
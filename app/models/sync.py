@@ -0,0 +1,91 @@
+from app.models import change_log
+
+# Delta-Sync für Scan-Stationen und den Desktop-Client (/api/sync,
+# scripts/sync_client.py). Die Version eines Clients ist eine seq des
+# Änderungsjournals (app/models/change_log.py). Version 0 liefert einen
+# vollständigen Abzug der aktiven Datensätze, danach nur die seitdem
+# geänderten. Gelöschte (auch in den Papierkorb oder ins Archiv
+# verschobene) Datensätze und zurückgegebene Ausleihen kommen als Tombstone
+# (nur der Schlüssel).
+
+# Entitätstyp -> (Tabelle, Schlüssel, übertragene Spalten, Bedingung für "aktiv")
+ENTITIES = {
+    'worker': ('workers', 'barcode', ('barcode', 'firstname', 'lastname', 'department'),
+               'COALESCE(deleted, 0) = 0'),
+    'tool': ('tools', 'barcode', ('barcode', 'name', 'status', 'category', 'location'),
+             'COALESCE(deleted, 0) = 0'),
+    'consumable': ('consumables', 'barcode',
+                   ('barcode', 'name', 'quantity', 'min_quantity', 'category', 'location'),
+                   'COALESCE(deleted, 0) = 0'),
+    # Nur offene Ausleihen, eine Rückgabe entfernt die Ausleihe beim Client
+    'lending': ('lendings', 'id', ('id', 'tool_barcode', 'worker_barcode', 'lent_at'),
+                'returned_at IS NULL'),
+}
+
+def _active(entity_type, row):
+    """Ist der Datensatz für Clients sichtbar (nicht gelöscht, nicht zurückgegeben)?"""
+    if row is None:
+        return False
+    if entity_type == 'lending':
+        return row['returned_at'] is None
+    return not row.get('deleted')
+
+def _payload(entity_type, row):
+    columns = ENTITIES[entity_type][2]
+    return {column: row[column] for column in columns}
+
+def _empty():
+    return {entity_type: [] for entity_type in ENTITIES}
+
+def snapshot(conn):
+    """Vollständiger Stand aller aktiven Datensätze samt passender Version
+
+    Läuft in einer Lesetransaktion, damit Version und Zeilen zusammenpassen.
+    """
+    conn.commit()
+    conn.execute("BEGIN")
+    try:
+        version = change_log.latest_seq(conn)
+        upserts = {}
+        for entity_type, (table, key, columns, active) in ENTITIES.items():
+            upserts[entity_type] = [dict(row) for row in conn.execute(f"""
+                SELECT {', '.join(columns)} FROM {table} WHERE {active} ORDER BY {key}
+            """)]
+    finally:
+        conn.rollback()
+    return {'version': version, 'full': True, 'has_more': False, 'reset': False,
+            'upserts': upserts, 'deletes': _empty()}
+
+def changes_since(conn, version, limit=1000):
+    """Änderungen seit version (Version 0 = vollständiger Abzug)
+
+    upserts enthält pro Entitätstyp den aktuellen Stand der geänderten
+    Datensätze, deletes deren Schlüssel. Mehrere Änderungen desselben
+    Datensatzes werden zu einer zusammengefasst. Bei reset muss der Client
+    seine Kopie verwerfen und mit Version 0 neu beginnen.
+    """
+    if not version:
+        return snapshot(conn)
+
+    page = change_log.read(conn, version, limit, list(ENTITIES))
+    if page['reset']:
+        return {'version': 0, 'full': False, 'has_more': False, 'reset': True,
+                'upserts': _empty(), 'deletes': _empty()}
+
+    keys = {}
+    for change in page['changes']:
+        keys.setdefault(change['entity_type'], {})[change['entity_key']] = None
+
+    upserts, deletes = _empty(), _empty()
+    for entity_type, entity_keys in keys.items():
+        current = change_log.rows(conn, entity_type, entity_keys)
+        numeric = ENTITIES[entity_type][1] == 'id'
+        for key in entity_keys:
+            row = current.get(key)
+            if _active(entity_type, row):
+                upserts[entity_type].append(_payload(entity_type, row))
+            else:
+                deletes[entity_type].append(int(key) if numeric else key)
+
+    return {'version': page['next'], 'full': False, 'has_more': page['has_more'],
+            'reset': False, 'upserts': upserts, 'deletes': deletes}
@@ -1,8 +1,67 @@
 from .database import BaseModel, Database
+from app.utils.pagination import ListSpec
+from app.models.archive import HistorySpec
+
+TOOL_STATUS_SQL = '''CASE
+                WHEN t.status = 'Defekt' THEN 'Defekt'
+                WHEN l.lending_id IS NOT NULL THEN 'Ausgeliehen'
+                ELSE 'Verfügbar'
+            END'''
 
 class Tool(BaseModel):
     TABLE_NAME = 'tools'
 
+    # Werkzeugliste (/tools/): die beiden ? schalten die Ausleiher-Spalten für Admins frei
+    LIST = ListSpec(
+        columns=f'''
+            t.barcode,
+            t.name,
+            t.location,
+            t.category,
+            {TOOL_STATUS_SQL} as status,
+            strftime('%d.%m.%Y %H:%M', l.lent_at) as status_since,
+            CASE WHEN ? THEN w.firstname || ' ' || w.lastname ELSE NULL END as current_borrower,
+            CASE WHEN ? THEN w.department ELSE NULL END as borrower_department''',
+        source='''tools t
+            LEFT JOIN tool_current_lending l ON l.tool_barcode = t.barcode
+                AND l.returned_at IS NULL
+            LEFT JOIN workers w ON l.worker_barcode = w.barcode''',
+        where='t.deleted = 0',
+        key='t.barcode',
+        sorts={
+            'name': ('t.name',),
+            'location': ("COALESCE(t.location, '')", 't.name'),
+            'status': (TOOL_STATUS_SQL, 't.name'),
+            'since': ("COALESCE(l.lent_at, '')", 't.name'),
+        },
+        default_sort='name',
+        filters={
+            'location': 't.location = ?',
+            'category': 't.category = ?',
+            'status': f'LOWER({TOOL_STATUS_SQL}) = LOWER(?)',
+        },
+        search=['t.name', 't.barcode', 't.description'],
+        name='tools.list'
+    )
+
+    # Ausleihverlauf der Detailseite, ältere Seiten auch aus dem Archiv
+    HISTORY = HistorySpec(
+        name='tools.lending_history',
+        columns='''
+            l.id,
+            w.firstname || ' ' || w.lastname as worker_name,
+            strftime('%d.%m.%Y %H:%M', l.lent_at) as timestamp,
+            CASE
+                WHEN l.returned_at IS NULL THEN 'Ausgeliehen'
+                ELSE 'Zurückgegeben'
+            END as action''',
+        source='''{lendings} l
+            LEFT JOIN workers w ON l.worker_barcode = w.barcode''',
+        where='l.tool_barcode = ?',
+        sort="COALESCE(l.lent_at, '')",
+        key='l.id'
+    )
+
     @staticmethod
     def get_all_with_status():
         sql = '''
@@ -14,15 +73,7 @@ class Tool(BaseModel):
                t.location,
                t.category
         FROM tools t
-        LEFT JOIN (
-            SELECT tool_barcode, worker_barcode, lent_at, returned_at
-            FROM lendings l1
-            WHERE NOT EXISTS (
-                SELECT 1 FROM lendings l2
-                WHERE l2.tool_barcode = l1.tool_barcode
-                AND l2.lent_at > l1.lent_at
-            )
-        ) l ON t.barcode = l.tool_barcode
+        LEFT JOIN tool_current_lending l ON t.barcode = l.tool_barcode
         LEFT JOIN workers w ON l.worker_barcode = w.barcode
         WHERE t.deleted = 0
         ORDER BY t.name
@@ -0,0 +1,297 @@
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Verdichteter Materialverbrauch pro Stunde und Tag. refresh() verarbeitet
+# nur die Einträge aus consumable_usages, die seit dem letzten Lauf
+# dazugekommen sind (Wasserstand = höchste verarbeitete ID in settings).
+# Trendabfragen lesen nur noch die Rollup-Zeilen des Zeitraums, nie das
+# ganze Protokoll. Verdichtet wird nur über "flask rollup-usage" (Cron),
+# Leseanfragen nehmen den Rückstand hin und geben den Stand mit status() an.
+#
+# consumable_usage_totals enthält die Summen pro Material und Abteilung,
+# consumable_usage_rollups zusätzlich pro Mitarbeiter. Die Mitarbeiterzeilen
+# werden nur für die Aufteilung bzw. den Filter nach Mitarbeiter gelesen,
+# alle anderen Auswertungen kommen mit den deutlich kleineren Summen aus.
+
+WATERMARK_KEY = 'usage_rollup_watermark'
+
+# Zeitraster -> Ausdruck für den Periodenbeginn aus used_at
+BUCKETS = {
+    'hour': "strftime('%Y-%m-%d %H:00:00', cu.used_at)",
+    'day': "date(cu.used_at)",
+}
+
+# Auswertungsraster -> (Rollup-Raster, Ausdruck für den Periodenbeginn)
+GRANULARITIES = {
+    'hour': ('hour', 'r.period_start'),
+    'day': ('day', 'r.period_start'),
+    'week': ('day', "date(r.period_start, '-6 days', 'weekday 1')"),
+    'month': ('day', "strftime('%Y-%m-01', r.period_start)"),
+}
+
+# Rollup-Tabelle -> Schlüsselspalten neben bucket und period_start
+TABLES = {
+    'consumable_usage_rollups': ('consumable_barcode', 'department', 'worker_barcode'),
+    'consumable_usage_totals': ('consumable_barcode', 'department'),
+}
+
+# Mögliche Aufteilungen einer Zeitreihe
+GROUPS = {
+    'consumable': 'r.consumable_barcode',
+    'department': 'r.department',
+    'worker': 'r.worker_barcode',
+}
+
+# Aufteilung -> (Join, Anzeigename) für Ranglisten
+LABELS = {
+    'consumable': ('LEFT JOIN consumables c ON c.barcode = r.consumable_barcode', 'c.name'),
+    'department': ('', 'r.department'),
+    'worker': ('LEFT JOIN workers w ON w.barcode = r.worker_barcode',
+               "w.firstname || ' ' || w.lastname"),
+}
+
+# Abteilung wie in der Mitarbeiterliste (leer -> 'Mitarbeiter')
+DEPARTMENT_SQL = "COALESCE(NULLIF(w.department, ''), 'Mitarbeiter')"
+
+# Schlüsselspalte -> Ausdruck aus consumable_usages (cu) und workers (w)
+KEY_SQL = {
+    'consumable_barcode': 'cu.consumable_barcode',
+    'department': DEPARTMENT_SQL,
+    'worker_barcode': 'cu.worker_barcode',
+}
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS consumable_usage_rollups (
+        bucket TEXT NOT NULL,
+        period_start TEXT NOT NULL,
+        consumable_barcode TEXT NOT NULL,
+        department TEXT NOT NULL,
+        worker_barcode TEXT NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        usages INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, period_start, consumable_barcode, department, worker_barcode)
+    ) WITHOUT ROWID
+'''
+
+CREATE_TOTALS_SQL = '''
+    CREATE TABLE IF NOT EXISTS consumable_usage_totals (
+        bucket TEXT NOT NULL,
+        period_start TEXT NOT NULL,
+        consumable_barcode TEXT NOT NULL,
+        department TEXT NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        usages INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, period_start, consumable_barcode, department)
+    ) WITHOUT ROWID
+'''
+
+def create(conn):
+    """Legt die Rollup-Tabellen an (ohne Befüllung, ohne Commit)"""
+    conn.execute(CREATE_TABLE_SQL)
+    conn.execute(CREATE_TOTALS_SQL)
+
+def _table(group=None, worker=None):
+    """Kleinste Rollup-Tabelle, die Aufteilung und Filter abdeckt"""
+    if group == 'worker' or worker:
+        return 'consumable_usage_rollups'
+    return 'consumable_usage_totals'
+
+def get_watermark(conn):
+    row = conn.execute("SELECT value FROM settings WHERE key = ?",
+                       (WATERMARK_KEY,)).fetchone()
+    return int(row[0]) if row and row[0] else 0
+
+def _set_watermark(conn, value):
+    conn.execute("""
+        INSERT INTO settings (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """, (WATERMARK_KEY, str(value)))
+
+def status(conn):
+    """Stand der Rollups: Wasserstand, Zeitpunkt der letzten verdichteten
+    Entnahme (None, falls schon archiviert) und Anzahl der noch offenen Einträge"""
+    watermark = get_watermark(conn)
+    row = conn.execute("SELECT used_at FROM consumable_usages WHERE id = ?",
+                       (watermark,)).fetchone()
+    pending = conn.execute("SELECT COUNT(*) FROM consumable_usages WHERE id > ?",
+                           (watermark,)).fetchone()[0]
+    return {'watermark': watermark, 'as_of': row[0] if row else None, 'pending': pending}
+
+def _aggregate(conn, table, condition, params):
+    """Addiert die Einträge aus table, die condition erfüllen, auf die Rollups (ohne Commit)"""
+    for rollup_table, keys in TABLES.items():
+        names = ', '.join(keys)
+        expressions = ', '.join(KEY_SQL[key] for key in keys)
+        groups = ', '.join(str(i) for i in range(2, len(keys) + 2))
+        for bucket, period_sql in BUCKETS.items():
+            conn.execute(f"""
+                INSERT INTO {rollup_table}
+                    (bucket, period_start, {names}, quantity, usages)
+                SELECT ?, {period_sql}, {expressions}, SUM(cu.quantity), COUNT(*)
+                FROM {table} cu
+                LEFT JOIN workers w ON w.barcode = cu.worker_barcode
+                WHERE {condition}
+                GROUP BY {groups}
+                ON CONFLICT (bucket, period_start, {names})
+                DO UPDATE SET quantity = quantity + excluded.quantity,
+                              usages = usages + excluded.usages
+            """, (bucket, *params))
+
+def refresh(conn, batch_size=50000):
+    """Verdichtet alle neuen Protokolleinträge und liefert deren Anzahl
+
+    Läuft unter BEGIN IMMEDIATE, damit zwei Worker dieselben Einträge nicht
+    doppelt zählen. Große Rückstände werden in Blöcken abgearbeitet.
+    """
+    # Schneller Weg ohne Schreibsperre, wenn nichts Neues da ist
+    latest = conn.execute("SELECT MAX(id) FROM consumable_usages").fetchone()[0]
+    if latest is None or latest <= get_watermark(conn):
+        return 0
+
+    processed = 0
+    while True:
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            watermark = get_watermark(conn)
+            upper = conn.execute("""
+                SELECT MAX(id) FROM (
+                    SELECT id FROM consumable_usages
+                    WHERE id > ? ORDER BY id LIMIT ?
+                )
+            """, (watermark, batch_size)).fetchone()[0]
+            if upper is None:
+                conn.rollback()
+                return processed
+
+            _aggregate(conn, 'consumable_usages', 'cu.id > ? AND cu.id <= ?', (watermark, upper))
+
+            count = conn.execute("""
+                SELECT COUNT(*) FROM consumable_usages WHERE id > ? AND id <= ?
+            """, (watermark, upper)).fetchone()[0]
+            _set_watermark(conn, upper)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        processed += count
+        logger.info(f"Verbrauchs-Rollups: {count} Einträge bis ID {upper} verdichtet")
+
+def rebuild(conn, archived=None):
+    """Verwirft alle Rollups und verdichtet das gesamte Protokoll neu
+
+    archived ist die Tabelle der archivierten Entnahmen
+    (archive.consumable_usages, siehe app/models/archive.py), falls angehängt.
+    """
+    create(conn)
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for rollup_table in TABLES:
+            conn.execute(f"DELETE FROM {rollup_table}")
+        if archived:
+            _aggregate(conn, archived, '1', ())
+        _set_watermark(conn, 0)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return refresh(conn)
+
+def _exists(conn, table):
+    return conn.execute("""
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?
+    """, (table,)).fetchone() is not None
+
+def ensure_table(conn):
+    """Legt die Rollups an und füllt sie, falls sie noch nicht existieren"""
+    if not _exists(conn, 'consumable_usage_rollups'):
+        rebuild(conn)
+        return True
+    if _exists(conn, 'consumable_usage_totals'):
+        return False
+    # Ältere Stände haben nur die Mitarbeiterzeilen: Summen daraus bilden,
+    # so bleiben auch bereits archivierte Entnahmen enthalten
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(CREATE_TOTALS_SQL)
+        conn.execute("""
+            INSERT INTO consumable_usage_totals
+                (bucket, period_start, consumable_barcode, department, quantity, usages)
+            SELECT bucket, period_start, consumable_barcode, department,
+                   SUM(quantity), SUM(usages)
+            FROM consumable_usage_rollups
+            GROUP BY 1, 2, 3, 4
+        """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+def _default_start(granularity, now):
+    """Standardzeitraum: 48 Stunden, 90 Tage, 26 Wochen oder 12 Monate"""
+    if granularity == 'hour':
+        return (now - timedelta(hours=48)).strftime('%Y-%m-%d %H:00:00')
+    days = {'day': 90, 'week': 26 * 7, 'month': 365}[granularity]
+    return (now - timedelta(days=days)).strftime('%Y-%m-%d')
+
+def trend(conn, granularity='day', start=None, end=None, group=None,
+          consumable=None, department=None, worker=None):
+    """Liefert den Verbrauch pro Periode (optional aufgeteilt nach group)
+
+    start/end sind Datumsangaben (YYYY-MM-DD), end ist exklusiv.
+    Wirft ValueError bei unbekanntem Raster oder unbekannter Aufteilung.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Unbekanntes Raster: {granularity}')
+    if group and group not in GROUPS:
+        raise ValueError(f'Unbekannte Aufteilung: {group}')
+
+    bucket, period_sql = GRANULARITIES[granularity]
+    conditions = ['r.bucket = ?', 'r.period_start >= ?']
+    params = [bucket, start or _default_start(granularity, datetime.now())]
+    if end:
+        conditions.append('r.period_start < ?')
+        params.append(end)
+    for column, value in (('r.consumable_barcode', consumable),
+                          ('r.department', department),
+                          ('r.worker_barcode', worker)):
+        if value:
+            conditions.append(f'{column} = ?')
+            params.append(value)
+
+    columns = f'{period_sql} AS period'
+    keys = '1'
+    if group:
+        columns += f', {GROUPS[group]} AS group_key'
+        keys = '1, 2'
+    rows = conn.execute(f"""
+        SELECT {columns}, SUM(r.quantity) AS quantity, SUM(r.usages) AS usages
+        FROM {_table(group, worker)} r
+        WHERE {' AND '.join(conditions)}
+        GROUP BY {keys}
+        ORDER BY {keys}
+    """, params).fetchall()
+    return [dict(row) for row in rows]
+
+def top(conn, group, days=30, limit=10):
+    """Größte Verbraucher (Material, Abteilung oder Mitarbeiter) der letzten Tage"""
+    if group not in GROUPS:
+        raise ValueError(f'Unbekannte Aufteilung: {group}')
+    start = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    join, label = LABELS[group]
+    rows = conn.execute(f"""
+        SELECT {GROUPS[group]} AS group_key, MAX({label}) AS label,
+               SUM(r.quantity) AS quantity, SUM(r.usages) AS usages
+        FROM {_table(group)} r
+        {join}
+        WHERE r.bucket = 'day' AND r.period_start >= ?
+        GROUP BY 1
+        ORDER BY quantity DESC
+        LIMIT ?
+    """, (start, limit)).fetchall()
+    return [dict(row) for row in rows]
@@ -1,8 +1,70 @@
 from .database import BaseModel, Database
+from app.utils.pagination import ListSpec
+from app.models.archive import HistorySpec
 
 class Worker(BaseModel):
     TABLE_NAME = 'workers'
 
+    # Mitarbeiterliste (/workers/)
+    LIST = ListSpec(
+        columns='''
+            w.*,
+            (SELECT COUNT(*) FROM lendings l
+             WHERE l.worker_barcode = w.barcode AND l.returned_at IS NULL) as active_lendings''',
+        source='workers w',
+        where='w.deleted = 0',
+        key='w.barcode',
+        sorts={
+            'name': ('w.lastname', 'w.firstname'),
+            'department': ("COALESCE(NULLIF(w.department, ''), 'Mitarbeiter')", 'w.lastname', 'w.firstname'),
+            'email': ("COALESCE(w.email, '')", 'w.lastname', 'w.firstname'),
+        },
+        default_sort='name',
+        filters={
+            'department': "COALESCE(NULLIF(w.department, ''), 'Mitarbeiter') = ?",
+        },
+        search=['w.firstname', 'w.lastname', "w.firstname || ' ' || w.lastname", 'w.email', 'w.barcode'],
+        name='workers.list'
+    )
+
+    # Vergangene Ausleihen und Entnahmen der Detailseite, ältere Seiten auch aus dem Archiv
+    HISTORY = HistorySpec(
+        name='workers.lending_history',
+        columns='''
+            h.tool_name,
+            h.tool_barcode,
+            strftime('%d.%m.%Y %H:%M', h.lent_at) as lent_at,
+            strftime('%d.%m.%Y %H:%M', h.returned_at) as returned_at,
+            h.item_type,
+            NULL as amount_display''',
+        source='''(
+                SELECT 'l' || l.id AS entry_key, l.worker_barcode,
+                       t.name AS tool_name, t.barcode AS tool_barcode,
+                       l.lent_at, l.returned_at, 'Werkzeug' AS item_type
+                FROM {lendings} l
+                JOIN tools t ON l.tool_barcode = t.barcode
+                WHERE l.returned_at IS NOT NULL
+                UNION ALL
+                SELECT 'u' || cu.id, cu.worker_barcode,
+                       c.name, c.barcode,
+                       cu.used_at, cu.used_at, 'Verbrauchsmaterial'
+                FROM {consumable_usages} cu
+                JOIN consumables c ON cu.consumable_barcode = c.barcode
+            ) h''',
+        where='h.worker_barcode = ?',
+        sort="COALESCE(h.lent_at, '')",
+        key='h.entry_key'
+    )
+
+    @staticmethod
+    def get_all_active_sorted():
+        """Aktive Mitarbeiter nach Namen, ohne Ausleihzählung (Index idx_workers_deleted_name)"""
+        return Database.query('''
+            SELECT * FROM workers
+            WHERE deleted = 0
+            ORDER BY lastname, firstname
+        ''')
+
     @staticmethod
     def get_all_with_lendings():
         sql = '''
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, g
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, g, Response, stream_with_context
 from app.models.database import Database
 from app.utils.decorators import admin_required
 from werkzeug.utils import secure_filename
@@ -7,11 +7,23 @@ from flask import current_app
 from app.utils.db_schema import SchemaManager
 import colorsys
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from app.models.models import Tool, Consumable, Worker
 import sqlite3
 from app.utils.error_handler import handle_errors, safe_db_query
 from app.utils.color_settings import save_color_setting
+from app.models import current_lending
+from app.models import batch_lending
+from app.models import stats_counters
+from app.models import usage_rollups
+from app.models import due_dates
+from app.models.consumable import withdraw
+from app.utils import settings_cache
+from app.utils import exports
+from app.utils import bulk_import
+from app.utils import query_stats
+import secrets
+import tempfile
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -54,8 +66,9 @@ def get_current_lendings():
                 w.barcode as worker_barcode,
                 w.department,
                 l.lent_at,
+                -- Fälligkeit aus der Leihfrist, siehe app/models/due_dates.py
                 CASE 
-                    WHEN julianday('now') - julianday(l.lent_at) > 7 
+                    WHEN l.due_at < datetime('now')
                     THEN 1 ELSE 0 
                 END as overdue
             FROM lendings l
@@ -256,9 +269,30 @@ def dashboard():
                 for row in cursor.fetchall()
             ]
 
+    def get_usage_overview():
+        """Verbrauchstrend und Ranglisten aus den Rollups (Stand von flask rollup-usage)"""
+        with Database.get_db() as conn:
+            start = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+            return {
+                'usage_trend': usage_rollups.trend(conn, 'day', start=start),
+                'usage_top_departments': usage_rollups.top(conn, 'department', days=30, limit=5),
+                'usage_top_consumables': usage_rollups.top(conn, 'consumable', days=30, limit=5),
+                'usage_rollup': usage_rollups.status(conn)
+            }
+
+    def get_overdue():
+        """Überfällige Ausleihen (Anfang des Teilindex) und ihre Anzahl"""
+        with Database.get_db() as conn:
+            return {
+                'overdue_lendings': due_dates.overdue(conn, Database.get_setting('OVERDUE_PANEL_SIZE')),
+                'overdue_count': due_dates.count_overdue(conn)
+            }
+
     stats = get_stats()
     current_lendings = get_current_lendings()
     consumable_usages = get_consumable_usages()
+    usage_overview = get_usage_overview()
+    overdue = get_overdue()
     colors = get_color_settings()
     deleted_items = get_deleted_items()
     
@@ -267,77 +301,153 @@ def dashboard():
                          current_lendings=current_lendings,
                          consumable_usages=consumable_usages,
                          colors=colors,
+                         **usage_overview,
+                         **overdue,
                          deleted_tools=deleted_items['tools'],
                          deleted_consumables=deleted_items['consumables'],
                          deleted_workers=deleted_items['workers'])
 
 @safe_db_query
 def get_stats():
+    # Zähler werden per Trigger gepflegt, siehe app/models/stats_counters.py
     with Database.get_db() as conn:
-        # Werkzeug-Statistiken
-        tools_stats = conn.execute('''
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN status = 'Verfügbar' THEN 1 ELSE 0 END) as available,
-                SUM(CASE WHEN status = 'Ausgeliehen' THEN 1 ELSE 0 END) as lent,
-                SUM(CASE WHEN status = 'Defekt' THEN 1 ELSE 0 END) as defect
-            FROM tools 
-            WHERE deleted = 0
-        ''').fetchone()
-
-        # Verbrauchsmaterial-Statistiken
-        consumables_stats = conn.execute('''
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN quantity > min_quantity THEN 1 ELSE 0 END) as sufficient,
-                SUM(CASE WHEN quantity <= min_quantity AND quantity > 0 THEN 1 ELSE 0 END) as low,
-                SUM(CASE WHEN quantity = 0 THEN 1 ELSE 0 END) as empty
-            FROM consumables 
-            WHERE deleted = 0
-        ''').fetchone()
-
-        # Mitarbeiter-Statistiken und Abteilungen
-        workers_stats = conn.execute('''
-            SELECT COUNT(*) as total
-            FROM workers 
-            WHERE deleted = 0
-        ''').fetchone()
-
-        departments = conn.execute('''
-            SELECT 
-                department as name,
-                COUNT(*) as count
-            FROM workers 
-            WHERE deleted = 0 
-            AND department IS NOT NULL 
-            GROUP BY department
-            ORDER BY department
-        ''').fetchall()
+        stats = stats_counters.dashboard_stats(conn)
 
-        return {
-            'tools': {
-                'total': tools_stats['total'],
-                'available': tools_stats['available'],
-                'lent': tools_stats['lent'],
-                'defect': tools_stats['defect']
-            },
-            'tools_count': tools_stats['total'],
-            'consumables': {
-                'total': consumables_stats['total'],
-                'sufficient': consumables_stats['sufficient'],
-                'low': consumables_stats['low'],
-                'empty': consumables_stats['empty']
-            },
-            'consumables_count': consumables_stats['total'],
-            'workers': {
-                'total': workers_stats['total'],
-                'departments': [
-                    {'name': dept['name'], 'count': dept['count']} 
-                    for dept in departments
-                ]
-            },
-            'workers_count': workers_stats['total']
-        }
+    return {
+        'tools': stats['tools'],
+        'tools_count': stats['tools']['total'],
+        'consumables': {
+            key: stats['consumables'][key]
+            for key in ('total', 'sufficient', 'low', 'empty')
+        },
+        'consumables_count': stats['consumables']['total'],
+        'workers': stats['workers'],
+        'workers_count': stats['workers']['total']
+    }
+
+@bp.route('/stats/check')
+@admin_required
+def check_stats():
+    """Vergleicht die Dashboard-Zähler mit einer frischen Zählung"""
+    with Database.get_db() as conn:
+        differences = stats_counters.check(conn)
+    return jsonify({
+        'success': not differences,
+        'message': 'Zähler sind konsistent' if not differences
+                   else f'{len(differences)} Abweichungen gefunden',
+        'differences': differences
+    })
+
+@bp.route('/metrics/queries')
+@admin_required
+def query_metrics():
+    """Laufzeitstatistik der Abfragen dieses Worker-Prozesses (?sort=total_ms|p95_ms|calls|mean_ms&limit=)"""
+    sort = request.args.get('sort', 'total_ms')
+    if sort not in ('total_ms', 'p95_ms', 'max_ms', 'mean_ms', 'calls', 'rows', 'errors'):
+        return jsonify({'success': False, 'message': f'Unbekannte Sortierung: {sort}'}), 400
+    limit = request.args.get('limit', type=int)
+    return jsonify({
+        'success': True,
+        **query_stats.info(),
+        'enabled': Database.get_setting('QUERY_STATS_ENABLED'),
+        'slow_query_ms': Database.get_setting('SLOW_QUERY_MS'),
+        'queries': query_stats.snapshot(sort, limit)
+    })
+
+@bp.route('/metrics/queries/reset', methods=['POST'])
+@admin_required
+def reset_query_metrics():
+    """Setzt die Abfragestatistik dieses Worker-Prozesses zurück"""
+    query_stats.reset()
+    return jsonify({'success': True, 'message': 'Abfragestatistik zurückgesetzt'})
+
+@bp.route('/export/<dataset>.<fmt>')
+@admin_required
+def export_data(dataset, fmt):
+    """Exportiert einen Datensatz als CSV oder XLSX (gestreamt, ?start=&end= JJJJ-MM-TT)"""
+    try:
+        body = exports.export(dataset, fmt,
+                              start=request.args.get('start'),
+                              end=request.args.get('end'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    logger.info(f"Export {dataset}.{fmt} gestartet ({request.args.to_dict()})")
+    response = Response(stream_with_context(body), mimetype=exports.MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{exports.filename(dataset, fmt)}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+IMPORT_LABELS = {
+    'tools': 'Werkzeuge',
+    'consumables': 'Verbrauchsmaterial',
+    'workers': 'Mitarbeiter'
+}
+
+def _import_path(token, fmt):
+    """Ablage einer hochgeladenen Importdatei zwischen Probelauf und Übernahme"""
+    return os.path.join(tempfile.gettempdir(), f'scandy-import-{token}.{fmt}')
+
+@bp.route('/import', methods=['GET', 'POST'])
+@admin_required
+def import_data():
+    """Massenimport: Datei hochladen und Probelauf anzeigen"""
+    if request.method == 'GET':
+        return render_template('admin/import.html', labels=IMPORT_LABELS)
+
+    entity = request.form.get('entity')
+    upload = request.files.get('file')
+    if entity not in IMPORT_LABELS or not upload or not upload.filename:
+        flash('Bitte Typ und Datei auswählen', 'error')
+        return redirect(url_for('admin.import_data'))
+
+    fmt = secure_filename(upload.filename).rsplit('.', 1)[-1].lower()
+    if fmt not in exports.FORMATS:
+        flash('Nur CSV- und XLSX-Dateien werden unterstützt', 'error')
+        return redirect(url_for('admin.import_data'))
+
+    token = secrets.token_hex(16)
+    upload.save(_import_path(token, fmt))
+    try:
+        with open(_import_path(token, fmt), 'rb') as f:
+            result = bulk_import.run(Database.get_db(), entity, bulk_import.read_rows(f, fmt))
+    except ValueError as e:
+        os.remove(_import_path(token, fmt))
+        flash(f'Datei kann nicht importiert werden: {str(e)}', 'error')
+        return redirect(url_for('admin.import_data'))
+
+    return render_template('admin/import.html', labels=IMPORT_LABELS, result=result,
+                           entity=entity, token=token, fmt=fmt, filename=upload.filename)
+
+@bp.route('/import/apply', methods=['POST'])
+@admin_required
+def apply_import():
+    """Massenimport: geprüfte Datei übernehmen"""
+    entity = request.form.get('entity')
+    token = request.form.get('token', '')
+    fmt = request.form.get('fmt')
+    if (entity not in IMPORT_LABELS or fmt not in exports.FORMATS
+            or len(token) != 32 or not all(c in '0123456789abcdef' for c in token)
+            or not os.path.exists(_import_path(token, fmt))):
+        flash('Die Importdatei ist nicht mehr vorhanden, bitte erneut hochladen', 'error')
+        return redirect(url_for('admin.import_data'))
+
+    try:
+        with open(_import_path(token, fmt), 'rb') as f:
+            result = bulk_import.run(Database.get_db(), entity,
+                                     bulk_import.read_rows(f, fmt), apply=True)
+    except ValueError as e:
+        flash(f'Datei kann nicht importiert werden: {str(e)}', 'error')
+        return redirect(url_for('admin.import_data'))
+    finally:
+        os.remove(_import_path(token, fmt))
+
+    flash(f"Import abgeschlossen: {result['created']} neu, {result['updated']} geändert "
+          f"(davon {result['stock_changed']} Bestände), "
+          f"{len(result['errors'])} fehlerhafte Zeilen übersprungen",
+          'success' if result['success'] else 'warning')
+    return render_template('admin/import.html', labels=IMPORT_LABELS, result=result,
+                           entity=entity, filename=request.form.get('filename'))
 
 @bp.route('/reset_design', methods=['POST'])
 @admin_required
@@ -555,52 +665,32 @@ def process_lending():
             
             if data['item_type'] == 'consumable':
                 logger.info(f"Processing consumable: {data['item_barcode']}")
-                
-                # Prüfe verfügbare Menge
-                cursor.execute("""
-                    SELECT id, quantity 
-                    FROM consumables 
-                    WHERE barcode = ? AND deleted = 0
-                """, (data['item_barcode'],))
-                consumable = cursor.fetchone()
-                
-                if not consumable:
-                    return jsonify({
-                        'success': False,
-                        'message': 'Verbrauchsmaterial nicht gefunden'
-                    }), 404
-                
-                if consumable['quantity'] < data['amount']:
+
+                try:
+                    amount = int(data.get('amount', 1))
+                except (TypeError, ValueError):
+                    amount = 0
+                if amount <= 0:
                     return jsonify({
                         'success': False,
-                        'message': 'Nicht genügend Material verfügbar'
+                        'message': 'Ungültige Menge'
                     }), 400
-                
-                # Reduziere die Menge
-                cursor.execute("""
-                    UPDATE consumables 
-                    SET quantity = quantity - ? 
-                    WHERE id = ?
-                """, (data['amount'], consumable['id']))
-                  
+
                 cursor.execute("""
                     SELECT id FROM workers
-                    WHERE barcode = ?
+                    WHERE barcode = ? AND deleted = 0
                 """, (data['worker_barcode'],))
-                worker_result = cursor.fetchone()
-                if not worker_result:
+                if not cursor.fetchone():
                     return jsonify({
                         'success': False,
                         'message': 'Mitarbeiter nicht gefunden'
                     }), 404
-                worker_id = worker_result[0]
-                
-                # Dann in consumable_usage einfügen
-                cursor.execute("""
-                    INSERT INTO consumable_usage 
-                    (consumable_id, worker_id, quantity) 
-                    VALUES (?, ?, ?)
-                """, (consumable['id'], worker_id, data['amount']))
+
+                # Bestand prüfen, abziehen und Entnahme protokollieren in einem Schritt
+                result = withdraw(conn, data['item_barcode'], data['worker_barcode'], amount)
+                if not result['success']:
+                    status = 404 if 'quantity' not in result else 400
+                    return jsonify(result), status
 
             else:
                 # Werkzeug-Logik
@@ -650,6 +740,8 @@ def process_lending():
                     WHERE barcode = ?
                 """, (data['item_barcode'],))
 
+                current_lending.refresh_tool(conn, data['item_barcode'])
+
                 logger.info(f"Tool lending recorded")
 
             conn.commit()
@@ -719,6 +811,43 @@ def process_return():
             'message': f'Fehler bei der Rückgabe: {str(e)}'
         }), 500
 
+@bp.route('/process_batch', methods=['POST'])
+@admin_required
+def process_batch():
+    """Verarbeitet eine Sammelausleihe oder -rückgabe in einer Transaktion
+
+    Erwartet JSON: {"action": "lend"|"return", "worker_barcode": "...",
+    "items": [{"barcode": "...", "amount": 1}, ...], "allow_partial": false}
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get('items') or []
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return jsonify({'success': False, 'message': 'Ungültige Positionsliste'}), 400
+        if len(items) > Database.get_setting('BATCH_MAX_ITEMS'):
+            return jsonify({'success': False, 'message': 'Zu viele Positionen'}), 400
+        if not data.get('worker_barcode'):
+            return jsonify({'success': False, 'message': 'Kein Mitarbeiter übermittelt'}), 400
+
+        with Database.get_db() as conn:
+            result = batch_lending.process_batch(
+                conn,
+                data.get('action'),
+                data.get('worker_barcode'),
+                items,
+                allow_partial=bool(data.get('allow_partial'))
+            )
+
+        status = 200 if result['success'] or (data.get('allow_partial') and result['results']) else 400
+        return jsonify(result), status
+
+    except Exception as e:
+        logger.error(f"Error in process_batch: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': f'Fehler bei der Verarbeitung: {str(e)}'
+        }), 500
+
 @bp.route('/add_tool', methods=['GET', 'POST'])
 @admin_required
 def add_tool():
@@ -777,7 +906,7 @@ def add_consumable():
             
             conn.commit()
             flash('Verbrauchsmaterial erfolgreich hinzugefügt', 'success')
-            return redirect(url_for('inventory.consumables'))
+            return redirect(url_for('consumables.index'))
     
     # GET-Request: Formular anzeigen
     return render_template('admin/add_consumable.html',
@@ -807,7 +936,7 @@ def add_worker():
             
             conn.commit()
             flash('Mitarbeiter erfolgreich hinzugefügt', 'success')
-            return redirect(url_for('inventory.workers'))
+            return redirect(url_for('workers.index'))
     
     # GET-Request: Formular anzeigen
     with Database.get_db() as conn:
@@ -816,18 +945,20 @@ def add_worker():
     return render_template('admin/add_worker.html',
                          departments=[dep[0] for dep in departments if dep[0]])
 
+def load_primary_color():
+    """Liest die Primärfarbe aus der Datenbank"""
+    return dict(Database.get_db().execute('''
+        SELECT key, value FROM settings
+        WHERE key IN ('primary_color')
+    ''').fetchall()) or {
+        'primary_color': '#3B82F6'  # Standardwert
+    }
+
 @bp.before_app_request
 def load_settings():
-    """Lädt die Einstellungen vor jeder Anfrage"""
+    """Lädt die Einstellungen vor jeder Anfrage (aus dem Cache)"""
     try:
-        with Database.get_db() as conn:
-            settings = dict(conn.execute('''
-                SELECT key, value FROM settings
-                WHERE key IN ('primary_color')
-            ''').fetchall()) or {
-                'primary_color': '#3B82F6'  # Standardwert
-            }
-            g.settings = settings
+        g.settings = dict(settings_cache.get('primary_color', load_primary_color))
     except Exception as e:
         print(f"Fehler beim Laden der Einstellungen: {str(e)}")
         g.settings = {'primary_color': '#3B82F6'}
@@ -916,26 +1047,5 @@ def update_color():
         return jsonify({'success': False, 'message': str(e)})
 
 def init_app(app):
-    app.register_blueprint(bp)
-    
-    # Context Processor für globale Template-Variablen
-    @app.context_processor
-    def utility_processor():
-        def get_trash_count():
-            try:
-                with Database.get_db() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        SELECT 
-                            (SELECT COUNT(*) FROM tools WHERE deleted = 1) +
-                            (SELECT COUNT(*) FROM consumables WHERE deleted = 1) +
-                            (SELECT COUNT(*) FROM workers WHERE deleted = 1) as total
-                    """)
-                    return cursor.fetchone()['total']
-            except Exception as e:
-                print(f"Fehler beim Ermitteln der Papierkorb-Anzahl: {str(e)}")
-                return 0
-                
-        return {
-            'trash_count': get_trash_count()
-        }
\ No newline at end of file
+    # trash_count kommt gecacht aus inject_globals in create_app
+    app.register_blueprint(bp)
\ No newline at end of file
@@ -1,26 +1,35 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, session, url_for, Response, stream_with_context
 from ..models.worker import Worker
 from ..models.tool import Tool
 from ..models.database import Database
+from ..models import current_lending
+from ..models import search_index
+from ..models import usage_rollups
+from ..models import live_events
+from ..models import stats_counters
+from ..models import change_log
+from ..models import sync
+from ..models import due_dates
+from ..utils import settings_cache
+from ..utils import barcode_index
+from ..utils import tracing
 from ..utils.decorators import login_required, admin_required
+import hmac
+import json
+import os
+import threading
+import time
 import traceback
 
 bp = Blueprint('api', __name__, url_prefix='/api')
 
-@bp.before_request
-def log_request_info():
-    """Loggt Details über eingehende Requests"""
-    print('\n=== API Request Debug Info ===')
-    print(f'Endpoint: {request.endpoint}')
-    print(f'Method: {request.method}')
-    print(f'URL: {request.url}')
-    print(f'Headers: {dict(request.headers)}')
-    print(f'Data: {request.get_data(as_text=True)}')
-    print('===========================\n')
+# Request-/Response-Details nur bei aktiviertem Tracing (TRACING_* in app/config.py)
+tracing.init_blueprint(bp)
 
 @bp.route('/workers', methods=['GET'])
 def get_workers():
-    workers = Worker.get_all_with_lendings()
+    # Stationen mit lokaler Kopie nutzen /api/sync statt dieser Vollabfrage
+    workers = Worker.get_all_active_sorted()
     return jsonify([{
         'id': w['id'],
         'barcode': w['barcode'],
@@ -31,9 +40,6 @@ def get_workers():
 @bp.route('/inventory/tools/<barcode>', methods=['GET'])
 def get_tool(barcode):
     try:
-        # Debug-Logging
-        print(f"Suche Werkzeug mit Barcode: {barcode}")
-        
         tool = Database.query('''
             SELECT 
                 id,
@@ -48,16 +54,11 @@ def get_tool(barcode):
             AND deleted = 0
         ''', [barcode], one=True)
         
-        # Debug-Logging
-        print(f"Gefundenes Werkzeug: {tool}")
-        
         if not tool:
-            print(f"Kein Werkzeug gefunden für Barcode: {barcode}")
             return jsonify({'error': 'Werkzeug nicht gefunden'}), 404
             
         # Konvertiere Row-Objekt in Dictionary
         tool_dict = dict(tool)
-        print(f"Konvertiertes Werkzeug: {tool_dict}")
             
         return jsonify(tool_dict)
         
@@ -68,9 +69,6 @@ def get_tool(barcode):
 @bp.route('/inventory/workers/<barcode>', methods=['GET'])
 def get_worker(barcode):
     try:
-        # Debug-Logging
-        print(f"Suche Mitarbeiter mit Barcode: {barcode}")
-        
         worker = Database.query('''
             SELECT 
                 id,
@@ -84,16 +82,11 @@ def get_worker(barcode):
             AND deleted = 0
         ''', [barcode], one=True)
         
-        # Debug-Logging
-        print(f"Gefundener Mitarbeiter: {worker}")
-        
         if not worker:
-            print(f"Kein Mitarbeiter gefunden für Barcode: {barcode}")
             return jsonify({'error': 'Mitarbeiter nicht gefunden'}), 404
             
         # Konvertiere Row-Objekt in Dictionary
         worker_dict = dict(worker)
-        print(f"Konvertierter Mitarbeiter: {worker_dict}")
             
         return jsonify(worker_dict)
         
@@ -101,21 +94,93 @@ def get_worker(barcode):
         print(f"Fehler bei Mitarbeitersuche: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/resolve/<barcode>', methods=['GET'])
+def resolve_barcode(barcode):
+    """Ordnet einen gescannten Barcode zu (Werkzeug, Material, Mitarbeiter) samt aktuellem Zustand"""
+    try:
+        entity = barcode_index.resolve(barcode, include_borrower=session.get('is_admin', False))
+    except Exception as e:
+        print(f"Fehler beim Auflösen von {barcode}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+    if not entity:
+        return jsonify({'success': False, 'message': 'Barcode nicht gefunden'}), 404
+    return jsonify({'success': True, **entity})
+
+# Detailseiten der Suchtreffer je Typ
+SEARCH_DETAIL_ENDPOINTS = {
+    'tool': 'tools.details',
+    'consumable': 'consumables.details',
+    'worker': 'workers.details'
+}
+
+@bp.route('/search', methods=['GET'])
+def search():
+    """Volltextsuche über Werkzeuge, Verbrauchsmaterial und Mitarbeiter"""
+    query = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+
+    # Mitarbeiter nur für Admins (wie die Mitarbeiterliste)
+    allowed = [t for t in search_index.SOURCES if t != 'worker' or session.get('is_admin')]
+    requested = [t for t in request.args.get('type', '').split(',') if t]
+    types = [t for t in requested if t in allowed] if requested else allowed
+    if not types:
+        return jsonify({'success': True, 'query': query, 'results': []})
+
+    try:
+        results = search_index.search(Database.get_db(), query, types, limit)
+    except Exception as e:
+        print(f"Fehler bei der Suche: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+    for result in results:
+        result['url'] = url_for(SEARCH_DETAIL_ENDPOINTS[result['entity_type']],
+                                barcode=result['barcode'])
+    return jsonify({'success': True, 'query': query, 'results': results})
+
+@bp.route('/usage/trend', methods=['GET'])
+@admin_required
+def usage_trend():
+    """Materialverbrauch pro Stunde/Tag/Woche/Monat aus den Rollups"""
+    args = request.args
+    try:
+        with Database.get_db() as conn:
+            series = usage_rollups.trend(
+                conn,
+                granularity=args.get('granularity', 'day'),
+                start=args.get('start'),
+                end=args.get('end'),
+                group=args.get('group'),
+                consumable=args.get('consumable'),
+                department=args.get('department'),
+                worker=args.get('worker')
+            )
+            rollup = usage_rollups.status(conn)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'series': series, 'rollup': rollup})
+
+@bp.route('/usage/top', methods=['GET'])
+@admin_required
+def usage_top():
+    """Größte Verbraucher nach Material, Abteilung oder Mitarbeiter"""
+    days = max(1, min(request.args.get('days', 30, type=int), 3660))
+    limit = max(1, min(request.args.get('limit', 10, type=int), 100))
+    try:
+        with Database.get_db() as conn:
+            rows = usage_rollups.top(conn, request.args.get('group', 'consumable'), days, limit)
+            rollup = usage_rollups.status(conn)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    return jsonify({'success': True, 'results': rows, 'rollup': rollup})
+
 @bp.route('/settings/colors', methods=['POST'])
 @admin_required
 def update_colors():
     try:
         data = request.json
-        print("\n=== Color Settings Debug Info ===")
-        print(f"Empfangene Farbdaten: {data}")
-        print(f"Request Method: {request.method}")
-        print(f"Content-Type: {request.content_type}")
-        print(f"Alle registrierten Routen:")
-        for rule in current_app.url_map.iter_rules():
-            print(f"  {rule.endpoint}: {rule}")
         
         if not data:
-            print("Keine JSON-Daten empfangen!")
             return jsonify({'error': 'Keine Daten empfangen'}), 400
             
         with Database.get_db() as conn:
@@ -130,9 +195,11 @@ def update_colors():
                 INSERT OR REPLACE INTO settings (key, value) 
                 VALUES (?, ?)
             ''', ('accent_color', data.get('accent_color')))
-            
+
+            # Farben in allen Workern neu laden
+            settings_cache.invalidate(conn)
             conn.commit()
-            print("Farben erfolgreich in Datenbank gespeichert")
+            settings_cache.clear()
             
         return jsonify({
             'status': 'success', 
@@ -144,35 +211,13 @@ def update_colors():
         })
         
     except Exception as e:
+        current_app.logger.error(f"Fehler beim Speichern der Farben: {str(e)}\n{traceback.format_exc()}")
         error_details = {
             'error': str(e),
-            'traceback': traceback.format_exc(),
-            'request_data': {
-                'method': request.method,
-                'url': request.url,
-                'headers': dict(request.headers),
-                'data': request.get_data(as_text=True)
-            }
+            'traceback': traceback.format_exc()
         }
-        print("\n=== Error Debug Info ===")
-        print(f"Fehler beim Speichern der Farben:")
-        print(f"Error Type: {type(e).__name__}")
-        print(f"Error Message: {str(e)}")
-        print(f"Traceback:\n{traceback.format_exc()}")
-        print("========================\n")
-        
         return jsonify(error_details), 500
 
-@bp.after_request
-def after_request(response):
-    """Loggt Details über ausgehende Responses"""
-    print('\n=== API Response Debug Info ===')
-    print(f'Status: {response.status}')
-    print(f'Headers: {dict(response.headers)}')
-    print(f'Data: {response.get_data(as_text=True)}')
-    print('============================\n')
-    return response
-
 # Falls es hier eine alte Version der Route gibt, 
 # kommentieren Sie diese aus oder löschen Sie sie
 
@@ -201,7 +246,8 @@ def return_tool():
                 SET status = 'available' 
                 WHERE barcode = ?
             """, (tool_barcode,))
-            
+
+            current_lending.refresh_tool(conn, tool_barcode)
             conn.commit()
             return jsonify({'success': True})
 
@@ -214,4 +260,165 @@ def return_tool():
 def delete_tool(barcode):
     db = Database()
     result = db.soft_delete_tool(barcode)
-    return jsonify(result)
\ No newline at end of file
+    return jsonify(result)
+
+@bp.route('/changes', methods=['GET'])
+@admin_required
+def get_changes():
+    """Einträge des Änderungsjournals nach ?since= (seq), optional mit aktuellem Datensatz
+
+    ?type=tool,worker filtert nach Entitätstyp, ?rows=1 hängt den aktuellen
+    Stand jeder Zeile an. Ist der Stand des Aufrufers nicht mehr fortsetzbar,
+    antwortet die Route mit 410 und reset; dann ab since=0 neu lesen.
+    """
+    limit = request.args.get('limit', Database.get_setting('CHANGE_LOG_PAGE_SIZE'), type=int)
+    limit = max(1, min(limit, Database.get_setting('CHANGE_LOG_MAX_PAGE_SIZE')))
+    since = max(0, request.args.get('since', 0, type=int))
+    types = [t for t in request.args.get('type', '').split(',') if t]
+    try:
+        result = change_log.read(Database.get_db(), since, limit, types or None,
+                                 with_rows=request.args.get('rows') == '1')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if result['reset']:
+        return jsonify({'success': False, 'reset': True,
+                        'message': 'Stand nicht mehr fortsetzbar, bitte ab since=0 neu lesen'}), 410
+    return jsonify({'success': True, **result})
+
+@bp.route('/lendings/overdue', methods=['GET'])
+@admin_required
+def overdue_lendings():
+    """Überfällige Ausleihen, die am längsten überfälligen zuerst (?limit=)"""
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    conn = Database.get_db()
+    return jsonify({
+        'success': True,
+        'count': due_dates.count_overdue(conn),
+        'lendings': due_dates.overdue(conn, limit)
+    })
+
+def _sync_authorized():
+    """Admin-Session oder Bearer-Token aus SYNC_TOKEN (Stationen ohne Login)"""
+    if session.get('is_admin'):
+        return True
+    token = Database.get_setting('SYNC_TOKEN')
+    return bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''),
+                                               f'Bearer {token}')
+
+@bp.route('/sync', methods=['GET'])
+def sync_changes():
+    """Delta-Sync: Mitarbeiter, Werkzeuge, Material und offene Ausleihen seit ?version=
+
+    version=0 (oder fehlend) liefert den vollständigen Stand. Die Antwort
+    enthält die neue version, upserts und deletes (Tombstones) pro Typ;
+    bei has_more sofort weiterfragen, bei reset mit version=0 neu beginnen.
+    """
+    if not _sync_authorized():
+        return jsonify({'success': False, 'message': 'Nicht autorisiert'}), 401
+    version = max(0, request.args.get('version', 0, type=int))
+    limit = request.args.get('limit', Database.get_setting('CHANGE_LOG_PAGE_SIZE'), type=int)
+    limit = max(1, min(limit, Database.get_setting('CHANGE_LOG_MAX_PAGE_SIZE')))
+    result = sync.changes_since(Database.get_db(), version, limit)
+    return jsonify({'success': True, **result})
+
+# Live-Ereignisse als Server-Sent Events (siehe app/models/live_events.py).
+# Jeder Stream belegt einen Gunicorn-Thread, daher begrenzt SSE_MAX_STREAMS
+# die gleichzeitigen Streams pro Worker und SSE_STREAM_SECONDS ihre Dauer;
+# der Browser verbindet sich danach mit Last-Event-ID von selbst neu. Zwischen
+# zwei Abfragen wird keine Datenbankverbindung gehalten.
+_stream_slots = {}
+_stream_slots_lock = threading.Lock()
+
+def _stream_slot():
+    """Semaphore für die Streams dieses Prozesses"""
+    with _stream_slots_lock:
+        slot = _stream_slots.get(os.getpid())
+        if slot is None:
+            _stream_slots.clear()
+            slot = _stream_slots[os.getpid()] = threading.BoundedSemaphore(
+                Database.get_setting('SSE_MAX_STREAMS'))
+        return slot
+
+def _sse(event, data, event_id=None):
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+def _poll(last_id, with_stats):
+    """Neue Ereignisse (und bei Bedarf die Dashboard-Zähler) mit kurz geliehener Verbindung"""
+    pool = Database.get_pool()
+    conn = pool.acquire()
+    try:
+        events, reset = live_events.since(conn, last_id)
+        stats = stats_counters.dashboard_stats(conn) if with_stats and events else None
+        return events, reset, stats
+    finally:
+        pool.release(conn)
+
+@bp.route('/events', methods=['GET'])
+@admin_required
+def live_event_stream():
+    """Live-Ereignisse (Ausleihe, Rückgabe, Entnahme, Bestand, Papierkorb) als text/event-stream
+
+    Fortsetzung ab dem Header Last-Event-ID oder ?last_event_id=, ohne beides
+    ab dem aktuellen Stand. ?stats=1 schickt nach neuen Ereignissen die
+    Dashboard-Zähler als Ereignis "stats" mit.
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Ungültige Event-ID'}), 400
+    with_stats = request.args.get('stats') == '1'
+
+    slot = _stream_slot()
+    if not slot.acquire(blocking=False):
+        response = jsonify({'success': False, 'message': 'Zu viele Live-Verbindungen'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(max(1, Database.get_setting('SSE_RETRY_MS') // 1000))
+        return response
+
+    poll_interval = Database.get_setting('SSE_POLL_INTERVAL')
+    heartbeat = Database.get_setting('SSE_HEARTBEAT_INTERVAL')
+    lifetime = Database.get_setting('SSE_STREAM_SECONDS')
+    retry_ms = Database.get_setting('SSE_RETRY_MS')
+
+    def stream():
+        nonlocal last_id
+        if last_id is None:
+            pool = Database.get_pool()
+            conn = pool.acquire()
+            try:
+                last_id = live_events.latest_id(conn)
+            finally:
+                pool.release(conn)
+        yield f'retry: {retry_ms}\n' + _sse('ready', {'last_event_id': last_id}, last_id)
+
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < lifetime:
+            events, reset, stats = _poll(last_id, with_stats)
+            if reset:
+                # Ereignisse verpasst: Client lädt neu und verbindet sich ohne ID
+                yield _sse('reset', {})
+                return
+            for event in events:
+                last_id = event['id']
+                yield _sse(event['event'], event, event['id'])
+            if stats is not None:
+                yield _sse('stats', stats)
+            if events:
+                last_sent = time.monotonic()
+                continue
+            if time.monotonic() - last_sent >= heartbeat:
+                # Kommentarzeile hält Proxys und die Verbindung offen
+                yield ': ping\n\n'
+                last_sent = time.monotonic()
+            time.sleep(poll_interval)
+
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    # Auch wenn der Client vor dem ersten Block abbricht
+    response.call_on_close(slot.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
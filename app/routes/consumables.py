@@ -1,29 +1,25 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from app.models.database import Database
 from app.models.consumable import Consumable
+from app.models import queries
+from app.models import archive
 from app.utils.decorators import login_required, admin_required
 from app.utils import routes
-from app.models.consumable import get_consumables
+from app.utils.pagination import list_response, rows_response
 
 bp = Blueprint('consumables', __name__, url_prefix='/inventory/consumables')
-print(f"Blueprint URL-Prefix: {bp.url_prefix}")
 
 @bp.route('/')
 def index():
-    print("Verbrauchsmaterial Route wurde aufgerufen")
-    consumables = get_consumables()
-    print(f"Gefundene Verbrauchsmaterialien: {len(consumables)}")
-    
-    # Sammle alle einzigartigen Orte und Typen für die Filter
-    orte = sorted(set(item['location'] for item in consumables if item['location']))
-    typen = sorted(set(item['category'] for item in consumables if item['category']))
-    print(f"Gefundene Orte: {orte}")
-    print(f"Gefundene Typen: {typen}")
-    
-    return render_template('consumables.html', 
-                         consumables=consumables,
-                         orte=orte,
-                         typen=typen)
+    # Seite, Tabellenzeilen (?format=rows) oder JSON (?format=json), siehe app/utils/pagination.py
+    def load_filters():
+        # Sammle alle einzigartigen Orte und Typen für die Filter
+        orte = [row[0] for row in Database.query(queries.CONSUMABLE_LOCATIONS)]
+        typen = [row[0] for row in Database.query(queries.CONSUMABLE_CATEGORIES)]
+        return {'orte': orte, 'typen': typen}
+
+    return list_response(Consumable.LIST, request.args, 'consumables.html', 'partials/consumable_rows.html',
+                         'consumables', load_context=load_filters)
 
 @bp.route('/add', methods=['GET', 'POST'])
 @admin_required
@@ -53,27 +49,23 @@ def add():
 def details(barcode):
     consumable = Consumable.get_by_barcode(barcode)
     if consumable:
+        # Entnahmeverlauf seitenweise, ältere Seiten auch aus dem Archiv
         try:
-            history = Database.query('''
-                SELECT 
-                    w.firstname || ' ' || w.lastname as worker_name,
-                    strftime('%d.%m.%Y %H:%M', cu.used_at) as timestamp,
-                    cu.quantity as amount,
-                    'Ausgabe' as action
-                FROM consumable_usage cu
-                JOIN workers w ON cu.worker_barcode = w.barcode
-                WHERE cu.consumable_id = (
-                    SELECT id FROM consumables WHERE barcode = ?
-                )
-                ORDER BY cu.used_at DESC
-            ''', [barcode])
+            history_page = archive.history_page(Database.get_db(), Consumable.HISTORY,
+                                                request.args, [barcode])
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
         except Exception as e:
             print(f"Fehler beim Abrufen der Historie: {e}")  # Debug-Ausgabe
-            history = []
+            history_page = {'items': [], 'next_cursor': None}
+        if request.args.get('format') == 'rows':
+            return rows_response('partials/consumable_history_rows.html', history_page,
+                                 history=history_page['items'])
             
         return render_template('consumable_details.html', 
                              consumable=consumable, 
-                             history=history)
+                             history=history_page['items'],
+                             history_page=history_page)
     flash('Verbrauchsmaterial nicht gefunden', 'error')
     return redirect(url_for('consumables.index'))
 
@@ -12,23 +12,19 @@ from ..models.database import Database
 from ..models.tool import Tool
 from ..models.worker import Worker
 from ..models.consumable import Consumable
+from ..models import stats_counters
+from ..models import archive
 from app.utils.decorators import login_required, admin_required
 from app.utils.error_handler import handle_errors, safe_db_query
+from app.utils.pagination import rows_response
 
 bp = Blueprint('inventory', __name__, url_prefix='/inventory')
 
 def get_tools_stats(conn):
     """Gibt Statistiken über Werkzeuge zurück"""
-    total = conn.execute('''
-        SELECT COUNT(*) FROM tools WHERE deleted = 0
-    ''').fetchone()[0]
-    
-    lent = conn.execute('''
-        SELECT COUNT(DISTINCT tool_barcode) 
-        FROM lendings 
-        WHERE returned_at IS NULL
-    ''').fetchone()[0]
-    
+    stats = stats_counters.dashboard_stats(conn)
+    total = stats['tools']['total']
+    lent = stats['lendings']['active']
     return {
         'total': total,
         'lent': lent,
@@ -37,30 +33,16 @@ def get_tools_stats(conn):
 
 def get_workers_stats(conn):
     """Gibt Statistiken über Mitarbeiter zurück"""
-    total = conn.execute('''
-        SELECT COUNT(*) FROM workers WHERE deleted = 0
-    ''').fetchone()[0]
-    
     return {
-        'total': total
+        'total': stats_counters.dashboard_stats(conn)['workers']['total']
     }
 
 def get_consumables_stats(conn):
     """Gibt Statistiken über Verbrauchsmaterialien zurück"""
-    total = conn.execute('''
-        SELECT COUNT(*) FROM consumables WHERE deleted = 0
-    ''').fetchone()[0]
-    
-    low_stock = conn.execute('''
-        SELECT COUNT(*) 
-        FROM consumables 
-        WHERE deleted = 0 
-        AND quantity <= min_quantity
-    ''').fetchone()[0]
-    
+    stats = stats_counters.dashboard_stats(conn)['consumables']
     return {
-        'total': total,
-        'low_stock': low_stock
+        'total': stats['total'],
+        'low_stock': stats['low_stock']
     }
 
 def get_current_lendings(conn):
@@ -132,24 +114,19 @@ def tool_details(barcode):
                 WHERE t.barcode = ? AND t.deleted = 0
             ''', (barcode,)).fetchone()
             
-            # Ausleihhistorie abrufen
-            history = conn.execute('''
-                SELECT 
-                    l.lent_at,
-                    l.returned_at,
-                    w.firstname || ' ' || w.lastname as worker_name
-                FROM lendings l
-                LEFT JOIN workers w ON l.worker_barcode = w.barcode
-                WHERE l.tool_barcode = ?
-                ORDER BY l.lent_at DESC
-            ''', (barcode,)).fetchall()
-            
             if not tool:
                 return "Werkzeug nicht gefunden", 404
+
+            # Ausleihhistorie seitenweise, ältere Seiten auch aus dem Archiv
+            history = archive.history_page(conn, Tool.HISTORY, request.args, [barcode])
+            if request.args.get('format') == 'rows':
+                return rows_response('partials/tool_history_rows.html', history,
+                                     lending_history=history['items'])
                 
             return render_template('tool_details.html', 
                                  tool=tool,
-                                 history=history)
+                                 lending_history=history['items'],
+                                 history_page=history)
                                  
     except Exception as e:
         print(f"Fehler in tool_details: {str(e)}")
@@ -180,26 +157,20 @@ def worker_details(barcode):
                 ORDER BY l.lent_at DESC
             ''', (barcode,)).fetchall()
             
-            # Ausleihhistorie
-            lending_history = conn.execute('''
-                SELECT t.name as tool_name,
-                       l.lent_at,
-                       l.returned_at,
-                       t.barcode as tool_barcode
-                FROM lendings l
-                JOIN tools t ON l.tool_barcode = t.barcode
-                WHERE l.worker_barcode = ?
-                AND l.returned_at IS NOT NULL
-                ORDER BY l.lent_at DESC
-            ''', (barcode,)).fetchall()
-            
             if not worker:
                 return "Mitarbeiter nicht gefunden", 404
+
+            # Ausleihhistorie seitenweise, ältere Seiten auch aus dem Archiv
+            history = archive.history_page(conn, Worker.HISTORY, request.args, [barcode])
+            if request.args.get('format') == 'rows':
+                return rows_response('partials/worker_history_rows.html', history,
+                                     lending_history=history['items'])
                 
             return render_template('worker_details.html',
                                  worker=worker,
                                  current_lendings=current_lendings,
-                                 lending_history=lending_history)
+                                 lending_history=history['items'],
+                                 history_page=history)
                                  
     except Exception as e:
         print(f"Fehler in worker_details: {str(e)}")
@@ -231,32 +202,14 @@ def tools():
 
 @bp.route('/consumables')
 def consumables():
-    consumables = Database.query('''
-        SELECT c.*, 
-               c.quantity as current_stock,
-               CASE 
-                   WHEN c.quantity <= c.min_quantity THEN 'low'
-                   ELSE 'ok'
-               END as stock_status
-        FROM consumables c
-        WHERE c.deleted = 0
-        ORDER BY c.name
-    ''')
-    return render_template('consumables.html', consumables=consumables)
+    # Paginierte Übersicht mit Filtern, siehe consumables.index
+    return redirect(url_for('consumables.index', **request.args))
 
 @bp.route('/workers')
 @admin_required
 def workers():
-    workers = Database.query('''
-        SELECT w.*, 
-               COUNT(CASE WHEN l.returned_at IS NULL THEN 1 END) as active_lendings
-        FROM workers w
-        LEFT JOIN lendings l ON w.barcode = l.worker_barcode
-        WHERE w.deleted = 0
-        GROUP BY w.id
-        ORDER BY w.lastname, w.firstname
-    ''')
-    return render_template('workers.html', workers=workers)
+    # Paginierte Übersicht mit Filtern, siehe workers.index
+    return redirect(url_for('workers.index', **request.args))
 
 @bp.route('/manual-lending')
 @admin_required
@@ -349,7 +302,7 @@ def update_consumable_stock(barcode):
             
             conn.commit()
             
-        return redirect(url_for('inventory.consumables'))
+        return redirect(url_for('consumables.index'))
         
     except Exception as e:
         print(f"Fehler beim Update des Verbrauchsmaterials: {str(e)}")
@@ -440,7 +393,7 @@ def add_worker():
                 [barcode, firstname, lastname, department, email]
             )
             flash('Mitarbeiter erfolgreich hinzugefügt', 'success')
-            return redirect(url_for('inventory.workers'))
+            return redirect(url_for('workers.index'))
             
         except Exception as e:
             flash(f'Fehler beim Hinzufügen: {str(e)}', 'error')
@@ -0,0 +1,102 @@
+import hashlib
+import os
+from flask import Blueprint, Response, jsonify, request, send_file
+from app.models.database import Database
+from app.utils import barcode_index
+from app.utils import labels
+from app.utils import metrics
+from app.utils.decorators import admin_required
+
+bp = Blueprint('labels', __name__, url_prefix='/labels')
+
+# Etiketten auf Abruf. Das ETag ist der Inhaltsschlüssel des Etiketts (Hash
+# aus Barcode, Beschriftung, Layout und Render-Version) und steht fest, bevor
+# etwas gerendert wird: passt If-None-Match, gibt es sofort 304. Sonst wird
+# die Datei aus dem Cache geliefert und nur beim ersten Abruf gerendert.
+
+MIMETYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+    'pdf': 'application/pdf',
+}
+
+def _not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _send(path, fmt, etag, download_name):
+    # Relativer Pfad würde sonst relativ zum App-Verzeichnis aufgelöst
+    response = send_file(os.path.abspath(path), mimetype=MIMETYPES[fmt], etag=etag,
+                         download_name=download_name, conditional=True)
+    # Beschriftung kann sich ändern, daher immer nachfragen (304 ist billig)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _render_single(barcode, name, layout_name, fmt, path):
+    """Rendert ein Etikett im gewünschten Format in den Cache"""
+    if fmt == 'png':
+        labels.write_atomic(path, labels.render_png(barcode, name, labels.LAYOUTS[layout_name]))
+    elif fmt == 'svg':
+        labels.write_atomic(path, labels.render_svg(barcode, name, labels.LAYOUTS[layout_name]))
+    else:
+        labels.write_atomic(path, labels.render_pdf(
+            [{'barcode': barcode, 'name': name}], layout_name, workers=1))
+
+@bp.route('/sheet.pdf')
+@admin_required
+def sheet():
+    """Etikettenbogen für eine Auswahl (?barcode=..&type=..&since=..&layout=..)"""
+    layout_name = request.args.get('layout', labels.DEFAULT_LAYOUT)
+    try:
+        labels.get_layout(layout_name)
+        items = labels.load_items(
+            Database.get_db(),
+            request.args.getlist('type') or None,
+            request.args.getlist('barcode') or None,
+            request.args.get('since')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if not items:
+        return jsonify({'success': False, 'message': 'Keine passenden Einträge gefunden'}), 404
+
+    etag = hashlib.sha256(''.join(
+        labels.cache_key(item['barcode'], item['name'], layout_name) for item in items
+    ).encode('ascii')).hexdigest()
+    if request.if_none_match.contains(etag):
+        return _not_modified(etag)
+
+    path = os.path.join(Database.get_setting('LABEL_CACHE_DIR'), 'sheets', f'{etag}.pdf')
+    cached = os.path.exists(path)
+    metrics.cache_access('labels', cached)
+    if not cached:
+        labels.write_atomic(path, labels.render_pdf(items, layout_name, title='Scandy Etiketten'))
+    return _send(path, 'pdf', etag, 'etiketten.pdf')
+
+@bp.route('/<barcode>.<fmt>')
+@admin_required
+def label(barcode, fmt):
+    """Einzelnes Etikett als PNG, SVG oder PDF (?layout=single|a4_3x10)"""
+    if fmt not in MIMETYPES:
+        return jsonify({'success': False, 'message': f'Unbekanntes Format: {fmt}'}), 404
+    layout_name = request.args.get('layout', 'single')
+    if layout_name not in labels.LAYOUTS:
+        return jsonify({'success': False, 'message': f'Unbekanntes Layout: {layout_name}'}), 400
+
+    entity = barcode_index.resolve(barcode)
+    if not entity:
+        return jsonify({'success': False, 'message': 'Barcode nicht gefunden'}), 404
+
+    etag = f"{labels.cache_key(barcode, entity['name'], layout_name)}-{fmt}"
+    if request.if_none_match.contains(etag):
+        return _not_modified(etag)
+
+    path = labels.cache_path(Database.get_setting('LABEL_CACHE_DIR'),
+                             barcode, entity['name'], layout_name, fmt)
+    cached = os.path.exists(path)
+    metrics.cache_access('labels', cached)
+    if not cached:
+        _render_single(barcode, entity['name'], layout_name, fmt, path)
+    return _send(path, fmt, etag, f'{barcode}.{fmt}')
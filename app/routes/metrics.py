@@ -0,0 +1,56 @@
+import hmac
+import os
+import time
+from flask import Blueprint, Response, current_app, g, request
+from app.models.database import Database
+from app.utils import metrics
+from app.utils.sqlite_session import SqliteSessionInterface
+
+bp = Blueprint('metrics', __name__)
+
+# /metrics für Prometheus (Textformat, über alle Gunicorn-Worker summiert,
+# siehe app/utils/metrics.py). Gemessen wird jede Anfrage der App über
+# before_request/after_request; /metrics selbst zählt nicht mit. Ist
+# METRICS_TOKEN gesetzt, muss der Scraper ihn als Bearer-Token schicken.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _start_timer():
+    g.metrics_started = time.perf_counter()
+
+def _record(response):
+    started = g.pop('metrics_started', None)
+    if started is None or request.endpoint == 'metrics.scrape':
+        return response
+    # Nicht zugeordnete URLs (404) unter einem Namen, sonst wächst die Label-Menge beliebig
+    metrics.observe_request(request.endpoint or 'unmatched', request.method,
+                            response.status_code, time.perf_counter() - started)
+    return response
+
+def _session_gauges(gauges):
+    interface = current_app.session_interface
+    if not isinstance(interface, SqliteSessionInterface):
+        return
+    gauges[('scandy_sessions_active', ())] = interface.store.count()
+    try:
+        gauges[('scandy_sessions_db_bytes', ())] = os.path.getsize(interface.store.path)
+    except OSError:
+        pass
+
+@bp.route('/metrics')
+def scrape():
+    """Metriken im Prometheus-Textformat"""
+    token = Database.get_setting('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return Response('Nicht autorisiert\n', status=401, mimetype='text/plain')
+
+    counters, histograms, gauges = metrics.collect()
+    _session_gauges(gauges)
+    return Response(metrics.render(counters, histograms, gauges), content_type=CONTENT_TYPE)
+
+def init_app(app):
+    if not app.config.get('METRICS_ENABLED', Database.get_setting('METRICS_ENABLED')):
+        return
+    app.before_request(_start_timer)
+    app.after_request(_record)
+    app.register_blueprint(bp)
@@ -1,64 +1,26 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
 from app.models.database import Database
+from app.models import current_lending
+from app.models import queries
+from app.models import archive
+from app.models.tool import Tool
 from app.utils.decorators import login_required, admin_required
+from app.utils.pagination import list_response, rows_response
 
 bp = Blueprint('tools', __name__, url_prefix='/tools')
 
 @bp.route('/', methods=['GET'])
 def index():
-    with Database.get_db() as conn:
-        cursor = conn.cursor()
-        # Status-Filter aus URL
-        status = request.args.get('status')
-        
-        # Basis-Query
-        query = """
-            SELECT 
-                t.barcode,
-                t.name,
-                t.location,
-                CASE 
-                    WHEN t.status = 'Defekt' THEN 'Defekt'
-                    WHEN l.id IS NOT NULL THEN 'Ausgeliehen'
-                    ELSE 'Verfügbar'
-                END as status,
-                strftime('%d.%m.%Y %H:%M', l.lent_at) as status_since,
-                CASE WHEN ? THEN w.firstname || ' ' || w.lastname ELSE NULL END as current_borrower,
-                CASE WHEN ? THEN w.department ELSE NULL END as borrower_department
-            FROM tools t
-            LEFT JOIN (
-                SELECT tool_barcode, MAX(id) as latest_id
-                FROM lendings 
-                WHERE returned_at IS NULL
-                GROUP BY tool_barcode
-            ) latest ON t.barcode = latest.tool_barcode
-            LEFT JOIN lendings l ON latest.latest_id = l.id
-            LEFT JOIN workers w ON l.worker_barcode = w.barcode
-            WHERE t.deleted = 0
-        """
-        
-        params = [session.get('is_admin', False), session.get('is_admin', False)]
-        if status:
-            query += """ AND LOWER(CASE 
-                        WHEN t.status = 'Defekt' THEN 'Defekt'
-                        WHEN l.id IS NOT NULL THEN 'Ausgeliehen'
-                        ELSE 'Verfügbar'
-                    END) = LOWER(?)"""
-            params.append(status)
-            
-        query += " ORDER BY t.name"
-        
-        cursor.execute(query, params)
-        tools = cursor.fetchall()
-        
+    # Seite, Tabellenzeilen (?format=rows) oder JSON (?format=json), siehe app/utils/pagination.py
+    is_admin = session.get('is_admin', False)
+
+    def load_filters():
         # Hole alle unique Orte für Filter
-        cursor.execute("SELECT DISTINCT location FROM tools WHERE location IS NOT NULL AND deleted = 0")
-        locations = [row[0] for row in cursor.fetchall()]
-        
-        return render_template('tools.html', 
-                             tools=tools, 
-                             orte=locations,
-                             selected_status=status)
+        locations = [row[0] for row in Database.query(queries.TOOL_LOCATIONS)]
+        return {'orte': locations, 'selected_status': request.args.get('status')}
+
+    return list_response(Tool.LIST, request.args, 'tools.html', 'partials/tool_rows.html', 'tools',
+                         params=[is_admin, is_admin], load_context=load_filters)
 
 @bp.route('/add', methods=['GET', 'POST'])
 @admin_required
@@ -85,34 +47,25 @@ def add():
 
 @bp.route('/<barcode>', methods=['GET'])
 def details(barcode):
-    tool = Database.query('''
-        SELECT * FROM tools 
-        WHERE barcode = ? AND deleted = 0
-    ''', [barcode], one=True)
+    tool = Database.query(queries.TOOL_DETAILS, [barcode], one=True)
     
     if not tool:
         flash('Werkzeug nicht gefunden', 'error')
         return redirect(url_for('tools.index'))
 
-    # Hole Ausleihverlauf
-    lending_history = Database.query('''
-        SELECT 
-            l.id,
-            w.firstname || ' ' || w.lastname as worker_name,
-            strftime('%d.%m.%Y %H:%M', l.lent_at) as timestamp,
-            CASE 
-                WHEN l.returned_at IS NULL THEN 'Ausgeliehen'
-                ELSE 'Zurückgegeben'
-            END as action
-        FROM lendings l
-        LEFT JOIN workers w ON l.worker_barcode = w.barcode
-        WHERE l.tool_barcode = ?
-        ORDER BY l.lent_at DESC
-    ''', [barcode])
+    # Ausleihverlauf seitenweise, ältere Seiten auch aus dem Archiv
+    try:
+        history = archive.history_page(Database.get_db(), Tool.HISTORY, request.args, [barcode])
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if request.args.get('format') == 'rows':
+        return rows_response('partials/tool_history_rows.html', history,
+                             lending_history=history['items'])
 
     return render_template('tool_details.html', 
                          tool=tool,
-                         lending_history=lending_history)
+                         lending_history=history['items'],
+                         history_page=history)
 
 @bp.route('/<barcode>/edit', methods=['POST'])
 @admin_required
@@ -162,7 +115,8 @@ def return_tool(barcode):
                 WHERE tool_barcode = ? 
                 AND returned_at IS NULL
             ''', [barcode])
-            
+
+            current_lending.refresh_tool(conn, barcode)
             conn.commit()
             return jsonify({'success': True})
     except Exception as e:
@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session
 from app.models.database import Database
 from app.models.worker import Worker
+from app.models import queries
+from app.models import search_index
+from app.models import archive
 from app.utils.decorators import login_required, admin_required
+from app.utils.pagination import list_response, rows_response
 from datetime import datetime
 
 bp = Blueprint('workers', __name__, url_prefix='/workers')
@@ -9,8 +13,8 @@ bp = Blueprint('workers', __name__, url_prefix='/workers')
 @bp.route('/')
 @admin_required
 def index():
-    workers = Worker.get_all_with_lendings()
-    return render_template('workers.html', workers=workers)
+    # Seite, Tabellenzeilen (?format=rows) oder JSON (?format=json), siehe app/utils/pagination.py
+    return list_response(Worker.LIST, request.args, 'workers.html', 'partials/worker_rows.html', 'workers')
 
 @bp.route('/workers/add', methods=['GET', 'POST'])
 @admin_required
@@ -60,58 +64,28 @@ def details(barcode):
         'Mitarbeiter'
     ]
     
-    worker = Database.query('SELECT * FROM workers WHERE barcode = ? AND deleted = 0', [barcode], one=True)
+    worker = Database.query(queries.WORKER_DETAILS, [barcode], one=True)
     if not worker:
         flash('Mitarbeiter nicht gefunden', 'error')
         return redirect(url_for('workers.index'))
 
-    # Hole aktuelle Ausleihen
-    current_lendings = Database.query('''
-        SELECT 
-            t.name as tool_name,
-            t.barcode as tool_barcode,
-            strftime('%d.%m.%Y %H:%M', l.lent_at) as lent_at,
-            'Werkzeug' as item_type,
-            1 as amount_display
-        FROM lendings l
-        JOIN tools t ON l.tool_barcode = t.barcode
-        WHERE l.worker_barcode = ? 
-        AND l.returned_at IS NULL
-        ORDER BY l.lent_at DESC
-    ''', [barcode])
+    # Ausleihhistorie seitenweise, ältere Seiten auch aus dem Archiv
+    try:
+        history = archive.history_page(Database.get_db(), Worker.HISTORY, request.args, [barcode])
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if request.args.get('format') == 'rows':
+        return rows_response('partials/worker_history_rows.html', history,
+                             lending_history=history['items'])
 
-    # Hole Ausleihhistorie
-    lending_history = Database.query('''
-        SELECT 
-            t.name as tool_name,
-            t.barcode as tool_barcode,
-            strftime('%d.%m.%Y %H:%M', l.lent_at) as lent_at,
-            strftime('%d.%m.%Y %H:%M', l.returned_at) as returned_at,
-            'Werkzeug' as item_type,
-            NULL as amount_display
-        FROM lendings l
-        JOIN tools t ON l.tool_barcode = t.barcode
-        WHERE l.worker_barcode = ?
-        AND l.returned_at IS NOT NULL
-        UNION ALL
-        SELECT 
-            c.name as tool_name,
-            c.barcode as tool_barcode,
-            strftime('%d.%m.%Y %H:%M', cu.used_at) as lent_at,
-            strftime('%d.%m.%Y %H:%M', cu.used_at) as returned_at,
-            'Verbrauchsmaterial' as item_type,
-            NULL as amount_display
-        FROM consumable_usage cu
-        JOIN consumables c ON cu.consumable_id = c.id
-        JOIN workers w ON cu.worker_id = w.id
-        WHERE w.barcode = ?
-        ORDER BY lent_at DESC
-    ''', [barcode, barcode])
+    # Hole aktuelle Ausleihen
+    current_lendings = Database.query(queries.WORKER_CURRENT_LENDINGS, [barcode])
 
     return render_template('worker_details.html', 
                          worker=worker,
                          current_lendings=current_lendings,
-                         lending_history=lending_history,
+                         lending_history=history['items'],
+                         history_page=history,
                          departments=departments)
 
 @bp.route('/<barcode>/edit', methods=['POST'])
@@ -157,11 +131,11 @@ def delete(barcode):
 def search():
     query = request.args.get('q', '')
     try:
-        workers = Database.query('''
-            SELECT * FROM workers 
-            WHERE (firstname LIKE ? OR lastname LIKE ? OR barcode LIKE ?) 
-            AND deleted = 0
-        ''', [f'%{query}%', f'%{query}%', f'%{query}%'])
+        # Volltextindex (Präfixsuche), siehe app/models/search_index.py
+        match = search_index.build_match_query(query)
+        if not match:
+            return jsonify([])
+        workers = Database.query(queries.WORKER_SEARCH, [match])
         return jsonify([dict(worker) for worker in workers])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
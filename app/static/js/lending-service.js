@@ -219,8 +219,10 @@
                     throw new Error(result.message || 'Fehler bei der Rückgabe');
                 }
 
-                // Seite neu laden nach erfolgreicher Rückgabe
-                location.reload();
+                // Seite neu laden nach erfolgreicher Rückgabe (außer die Live-Ereignisse aktualisieren sie)
+                if (!window.LiveEvents?.active()) {
+                    location.reload();
+                }
                 return result;
 
             } catch (error) {
@@ -340,8 +342,15 @@ window.ManualLending = {
                 } else {
                     alert(message);
                 }
-                
-                location.reload();
+
+                if (window.LiveEvents?.active()) {
+                    // Tabelle und Listen werden über die Live-Ereignisse aktualisiert
+                    this.selectedItem = null;
+                    document.getElementById('previewItem').textContent = 'Kein Artikel ausgewählt';
+                    this.updateConfirmButton();
+                } else {
+                    location.reload();
+                }
             } else {
                 alert(result.message || 'Fehler bei der Ausleihe');
             }
@@ -0,0 +1,77 @@
+// Live-Ereignisse über Server-Sent Events (/api/events)
+// Seiten registrieren Handler pro Ereignistyp und patchen damit ihre Tabellen,
+// statt nach jeder Ausleihe/Rückgabe die ganze Seite neu zu laden.
+(function() {
+    'use strict';
+
+    const EVENT_TYPES = ['lending', 'return', 'usage', 'stock', 'status', 'trash', 'stats'];
+    const MAX_BACKOFF_MS = 60000;
+
+    window.LiveEvents = {
+        source: null,
+        lastEventId: null,
+        handlers: {},
+        options: {},
+        backoff: 1000,
+
+        // handlers: {lending: fn(event), ...}; options.stats = Dashboard-Zähler mitschicken
+        connect(handlers, options = {}) {
+            if (typeof EventSource === 'undefined') return;
+            this.handlers = handlers;
+            this.options = options;
+            this.open();
+        },
+
+        open() {
+            const params = new URLSearchParams();
+            // Beim ersten Verbinden ab jetzt, danach ab dem letzten Ereignis
+            if (this.lastEventId !== null) params.set('last_event_id', this.lastEventId);
+            if (this.options.stats) params.set('stats', '1');
+
+            const source = new EventSource(`/api/events?${params}`);
+            this.source = source;
+
+            source.addEventListener('ready', (e) => {
+                this.backoff = 1000;
+                this.lastEventId = JSON.parse(e.data).last_event_id;
+            });
+
+            // Ereignisse verpasst (z.B. lange offline): einmal vollständig neu laden
+            source.addEventListener('reset', () => {
+                source.close();
+                location.reload();
+            });
+
+            EVENT_TYPES.forEach(type => {
+                source.addEventListener(type, (e) => {
+                    if (e.lastEventId) this.lastEventId = Number(e.lastEventId);
+                    const handler = this.handlers[type];
+                    if (!handler) return;
+                    try {
+                        handler(JSON.parse(e.data));
+                    } catch (error) {
+                        console.error(`Live-Ereignis ${type} nicht verarbeitet:`, error);
+                    }
+                });
+            });
+
+            // Abgelehnte Verbindung (503, Login abgelaufen): der Browser gibt auf,
+            // daher selbst mit wachsender Wartezeit neu verbinden
+            source.onerror = () => {
+                if (source.readyState !== EventSource.CLOSED) return;
+                setTimeout(() => this.open(), this.backoff);
+                this.backoff = Math.min(this.backoff * 2, MAX_BACKOFF_MS);
+            };
+        },
+
+        // true, solange ein Stream offen ist (dann ist kein Neuladen nötig)
+        active() {
+            return this.source !== null && this.source.readyState === EventSource.OPEN;
+        },
+
+        close() {
+            if (this.source) this.source.close();
+            this.source = null;
+        }
+    };
+})();
@@ -76,4 +76,145 @@ function initializeTable(tableId, options = {}) {
             th.addEventListener('click', () => sortTable(index));
         }
     });
-} 
\ No newline at end of file
+} 
+
+// Serverseitig paginierte Tabelle (siehe app/utils/pagination.py).
+// Suche, Filter und Sortierung laden die erste Seite neu, weitere Seiten
+// werden über den Cursor nachgeladen, sobald das Tabellenende sichtbar wird.
+// Erwartet am <table>: data-url, data-next-cursor, data-sort, data-dir;
+// an den Filter-Selects: data-filter="<URL-Parameter>";
+// an sortierbaren Spaltenköpfen: data-sort="<Sortierung>".
+function initializeServerTable(tableId) {
+    const table = document.getElementById(tableId);
+    if (!table) return;
+
+    const tbody = table.querySelector('tbody');
+    const searchInput = document.getElementById('searchInput');
+    const filterSelects = document.querySelectorAll('select[data-filter]');
+    const more = document.getElementById(tableId + 'More');
+    const moreButton = more?.querySelector('button');
+
+    let nextCursor = table.dataset.nextCursor || null;
+    let sort = table.dataset.sort || '';
+    let dir = table.dataset.dir || 'asc';
+    let loading = false;
+    let requestId = 0;
+    let searchTimer = null;
+
+    function currentParams() {
+        const params = new URLSearchParams();
+        const q = searchInput?.value.trim();
+        if (q) params.set('q', q);
+        filterSelects.forEach(select => {
+            if (select.value) params.set(select.dataset.filter, select.value);
+        });
+        if (sort) params.set('sort', sort);
+        if (dir === 'desc') params.set('dir', 'desc');
+        return params;
+    }
+
+    function renderBarcodes(rows) {
+        if (typeof JsBarcode === 'undefined') return;
+        rows.forEach(row => {
+            row.querySelectorAll('svg.barcode').forEach(svg => JsBarcode(svg).init());
+        });
+    }
+
+    function nearEnd() {
+        return more && more.getBoundingClientRect().top < window.innerHeight + 400;
+    }
+
+    function updateMore() {
+        if (moreButton) moreButton.classList.toggle('hidden', !nextCursor);
+    }
+
+    function updateSortIcons() {
+        table.querySelectorAll('th[data-sort]').forEach(th => {
+            const icon = th.querySelector('i');
+            if (!icon) return;
+            icon.className = 'fas ml-1 ' + (th.dataset.sort !== sort ? 'fa-sort'
+                : dir === 'desc' ? 'fa-sort-down' : 'fa-sort-up');
+        });
+    }
+
+    async function loadPage(append) {
+        if (append && (!nextCursor || loading)) return;
+        const id = ++requestId;
+        const params = currentParams();
+        if (append) params.set('cursor', nextCursor);
+
+        // Browser-URL aktualisieren, damit Reload und Zurück den Zustand behalten
+        if (!append) {
+            const query = params.toString();
+            history.replaceState(null, '', query ? `?${query}` : location.pathname);
+        }
+
+        params.set('format', 'rows');
+        loading = true;
+        let loaded = false;
+        try {
+            const response = await fetch(`${table.dataset.url}?${params}`);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const html = await response.text();
+            // Veraltete Antworten (Nutzer hat inzwischen weitergetippt) verwerfen
+            if (id !== requestId) return;
+
+            const template = document.createElement('template');
+            template.innerHTML = html;
+            const rows = Array.from(template.content.querySelectorAll('tr'));
+            if (!append) tbody.innerHTML = '';
+            tbody.append(...rows);
+            renderBarcodes(rows);
+
+            nextCursor = response.headers.get('X-Next-Cursor') || null;
+            updateMore();
+            loaded = true;
+        } catch (error) {
+            console.error('Fehler beim Laden der Tabelle:', error);
+        } finally {
+            if (id === requestId) loading = false;
+        }
+        // Bildschirm noch nicht gefüllt? Dann gleich die nächste Seite holen
+        if (loaded && nextCursor && nearEnd()) loadPage(true);
+    }
+
+    // Event Listener
+    if (searchInput) {
+        searchInput.addEventListener('input', () => {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => loadPage(false), 300);
+        });
+    }
+
+    filterSelects.forEach(select => {
+        select.addEventListener('change', () => loadPage(false));
+    });
+
+    table.querySelectorAll('th[data-sort]').forEach(th => {
+        th.style.cursor = 'pointer';
+        th.addEventListener('click', () => {
+            if (sort === th.dataset.sort) {
+                dir = dir === 'asc' ? 'desc' : 'asc';
+            } else {
+                sort = th.dataset.sort;
+                dir = 'asc';
+            }
+            updateSortIcons();
+            loadPage(false);
+        });
+    });
+
+    if (moreButton) {
+        moreButton.addEventListener('click', () => loadPage(true));
+    }
+
+    // Automatisch nachladen, wenn das Tabellenende in Sicht kommt
+    if (more && 'IntersectionObserver' in window) {
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) loadPage(true);
+        }, {rootMargin: '400px'}).observe(more);
+    }
+
+    updateSortIcons();
+    updateMore();
+}
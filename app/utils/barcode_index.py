@@ -0,0 +1,120 @@
+from app.models.database import Database
+from app.models.consumable import STOCK_STATUS_SQL
+from app.utils import settings_cache
+
+# Prozesslokaler Index Barcode -> (Typ, ID) für /api/resolve/<barcode>.
+# Der Index liegt im settings_cache und wird mit ihm verworfen (Löschen,
+# Wiederherstellen usw. rufen settings_cache.invalidate() und nach dem Commit
+# clear() auf). Einträge sind nur Hinweise: die Zustandsabfrage prüft ID,
+# Barcode und deleted erneut, bei Abweichung wird direkt in der Datenbank
+# nachgeschlagen. Veraltete Einträge anderer Worker führen daher nie zu
+# falschen Antworten.
+
+# Bei doppelten Barcodes gewinnt der erste Typ
+LOAD_SQL = '''
+    SELECT barcode, 'tool' AS entity_type, id FROM tools WHERE deleted = 0
+    UNION ALL
+    SELECT barcode, 'consumable', id FROM consumables WHERE deleted = 0
+    UNION ALL
+    SELECT barcode, 'worker', id FROM workers WHERE deleted = 0
+'''
+
+LOOKUP_SQL = '''
+    SELECT entity_type, id FROM (
+        SELECT 1 AS prio, 'tool' AS entity_type, id FROM tools WHERE barcode = ? AND deleted = 0
+        UNION ALL
+        SELECT 2, 'consumable', id FROM consumables WHERE barcode = ? AND deleted = 0
+        UNION ALL
+        SELECT 3, 'worker', id FROM workers WHERE barcode = ? AND deleted = 0
+    )
+    ORDER BY prio
+    LIMIT 1
+'''
+
+STATE_SQL = {
+    'tool': '''
+        SELECT t.barcode, t.name, t.description, t.category, t.location,
+               CASE
+                   WHEN t.status = 'Defekt' THEN 'Defekt'
+                   WHEN l.lending_id IS NOT NULL THEN 'Ausgeliehen'
+                   ELSE 'Verfügbar'
+               END AS status,
+               l.lent_at,
+               w.barcode AS worker_barcode,
+               w.firstname || ' ' || w.lastname AS worker_name,
+               w.department AS worker_department
+        FROM tools t
+        LEFT JOIN tool_current_lending l ON l.tool_barcode = t.barcode
+            AND l.returned_at IS NULL
+        LEFT JOIN workers w ON w.barcode = l.worker_barcode
+        WHERE t.id = ? AND t.barcode = ? AND t.deleted = 0
+    ''',
+    'consumable': f'''
+        SELECT c.barcode, c.name, c.description, c.category, c.location,
+               c.quantity, c.min_quantity,
+               {STOCK_STATUS_SQL} AS stock_status
+        FROM consumables c
+        WHERE c.id = ? AND c.barcode = ? AND c.deleted = 0
+    ''',
+    'worker': '''
+        SELECT w.barcode, w.firstname, w.lastname, w.department,
+               (SELECT COUNT(*) FROM lendings l
+                WHERE l.worker_barcode = w.barcode AND l.returned_at IS NULL) AS active_lendings
+        FROM workers w
+        WHERE w.id = ? AND w.barcode = ? AND w.deleted = 0
+    ''',
+}
+
+def load_index():
+    """Liest alle aktiven Barcodes in ein Dictionary"""
+    index = {}
+    for row in Database.get_db().execute(LOAD_SQL):
+        index.setdefault(row['barcode'], (row['entity_type'], row['id']))
+    return index
+
+def get_index():
+    return settings_cache.get('barcode_index', load_index)
+
+def _load_state(conn, entity_type, entity_id, barcode, include_borrower):
+    row = conn.execute(STATE_SQL[entity_type], (entity_id, barcode)).fetchone()
+    if not row:
+        return None
+
+    state = dict(row)
+    state['type'] = entity_type
+    if entity_type == 'tool':
+        state['available'] = state['status'] == 'Verfügbar'
+        borrower = None
+        if include_borrower and state['worker_barcode']:
+            borrower = {
+                'barcode': state['worker_barcode'],
+                'name': state['worker_name'],
+                'department': state['worker_department']
+            }
+        for key in ('worker_barcode', 'worker_name', 'worker_department'):
+            del state[key]
+        state['current_borrower'] = borrower
+    elif entity_type == 'consumable':
+        state['available'] = (state['quantity'] or 0) > 0
+    else:
+        state['name'] = f"{state['firstname']} {state['lastname']}"
+    return state
+
+def resolve(barcode, include_borrower=False):
+    """Ordnet einen Barcode zu und liefert den aktuellen Zustand (oder None)"""
+    conn = Database.get_db()
+    index = get_index()
+
+    entry = index.get(barcode)
+    if entry:
+        state = _load_state(conn, entry[0], entry[1], barcode, include_borrower)
+        if state:
+            return state
+        # Veralteter Eintrag (gelöscht oder Barcode geändert)
+        index.pop(barcode, None)
+
+    row = conn.execute(LOOKUP_SQL, (barcode, barcode, barcode)).fetchone()
+    if not row:
+        return None
+    index[barcode] = (row['entity_type'], row['id'])
+    return _load_state(conn, row['entity_type'], row['id'], barcode, include_borrower)
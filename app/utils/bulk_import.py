@@ -0,0 +1,298 @@
+import csv
+import io
+import logging
+from app.models.database import Database
+from app.utils import settings_cache
+
+logger = logging.getLogger(__name__)
+
+# Massenimport von Werkzeugen, Verbrauchsmaterial und Mitarbeitern aus CSV
+# oder XLSX. Die Datei wird blockweise gelesen; pro Block werden die Zeilen
+# geprüft, die vorhandenen Einträge mit einer Abfrage geladen und neue bzw.
+# geänderte Zeilen per executemany als Upsert (nach Barcode) geschrieben.
+# Jeder Block ist eine eigene Transaktion. Ohne apply=True wird nur
+# verglichen (Probelauf), damit der Unterschied vorher sichtbar ist.
+#
+# Spalten, die in der Datei fehlen, bleiben bei bestehenden Einträgen
+# unverändert, ebenso leere Zahlenfelder (neue Einträge bekommen dort 0).
+# Bestandsänderungen per Import laufen am Entnahmeprotokoll vorbei und
+# werden deshalb im Ergebnis gesondert aufgeführt. Als Überschriften gehen
+# die Spaltennamen der Tabelle oder die deutschen Überschriften des
+# Exports, eine exportierte Datei lässt sich also direkt wieder einlesen.
+# Fehlerhafte Zeilen werden übersprungen und gemeldet, die übrigen
+# trotzdem geschrieben.
+
+# Typ -> (Tabelle, Pflichtspalten, optionale Spalten, Ganzzahlspalten,
+#         feste Werte nur für neue Einträge)
+ENTITIES = {
+    'tools': ('tools', ['barcode', 'name'],
+              ['description', 'category', 'location'], [],
+              {'status': 'Verfügbar'}),
+    'consumables': ('consumables', ['barcode', 'name'],
+                    ['description', 'category', 'location', 'quantity', 'min_quantity'],
+                    ['quantity', 'min_quantity'], {}),
+    'workers': ('workers', ['barcode', 'firstname', 'lastname'],
+                ['department', 'email'], [], {}),
+}
+
+# Deutsche Überschriften (wie im Export und in den Formularen)
+HEADERS = {
+    'barcode': ['Barcode'],
+    'name': ['Name', 'Bezeichnung'],
+    'description': ['Beschreibung'],
+    'category': ['Kategorie'],
+    'location': ['Standort', 'Ort'],
+    'quantity': ['Bestand', 'Menge'],
+    'min_quantity': ['Mindestbestand'],
+    'firstname': ['Vorname'],
+    'lastname': ['Nachname'],
+    'department': ['Abteilung'],
+    'email': ['E-Mail', 'Email'],
+}
+
+# Typ -> Spalte mit dem Lagerbestand (Änderungen werden gesondert gemeldet)
+STOCK_COLUMNS = {'consumables': 'quantity'}
+
+# Barcodes sind über alle Typen eindeutig (vgl. /api/resolve)
+BARCODE_TABLES = ('tools', 'consumables', 'workers')
+
+# Höchstzahl gemeldeter Änderungen im Ergebnis (Fehler werden alle gemeldet)
+MAX_REPORTED_CHANGES = 500
+
+def _header_aliases(entity):
+    """Überschrift (klein geschrieben) -> Spaltenname"""
+    _, required, optional, _, _ = ENTITIES[entity]
+    aliases = {}
+    for column in required + optional:
+        aliases[column] = column
+        for header in HEADERS.get(column, []):
+            aliases[header.lower()] = column
+    return aliases
+
+def read_rows(stream, fmt):
+    """Liefert die Zeilen einer CSV- oder XLSX-Datei als Listen (erste Zeile = Kopf)"""
+    if fmt == 'xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield ['' if value is None else value for value in row]
+        finally:
+            workbook.close()
+        return
+    if fmt != 'csv':
+        raise ValueError(f'Unbekanntes Format: {fmt}')
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    sample = text.read(4096)
+    text.seek(0)
+    delimiter = ';' if sample.count(';') >= sample.count(',') else ','
+    yield from csv.reader(text, delimiter=delimiter)
+
+def _map_header(entity, header):
+    """Ordnet die Kopfzeile den Spalten zu, wirft ValueError bei Pflichtlücken"""
+    _, required, _, _, _ = ENTITIES[entity]
+    aliases = _header_aliases(entity)
+    mapping = {}
+    for index, name in enumerate(header):
+        column = aliases.get(str(name).strip().lower())
+        if column and column not in mapping.values():
+            mapping[index] = column
+    missing = [column for column in required if column not in mapping.values()]
+    if missing:
+        raise ValueError(f"Pflichtspalten fehlen: {', '.join(missing)}")
+    return mapping
+
+def _parse_row(entity, mapping, values):
+    """Wandelt eine Zeile in ein Dictionary, liefert (Werte, Fehlermeldung)"""
+    _, required, _, integers, _ = ENTITIES[entity]
+    row = {}
+    for index, column in mapping.items():
+        value = values[index] if index < len(values) else ''
+        # Zahlen aus XLSX (z.B. Barcode 4711.0) ohne Nachkommastellen übernehmen
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        value = str(value).strip() if value is not None else ''
+        if column in integers:
+            # Leer = bestehenden Wert behalten (neue Einträge: 0, siehe _classify)
+            if value == '':
+                value = None
+            else:
+                try:
+                    value = int(float(value.replace(',', '.')))
+                except ValueError:
+                    return None, f'{column}: ganze Zahl erwartet, "{value}" gefunden'
+                if value < 0:
+                    return None, f'{column}: darf nicht negativ sein'
+        elif value == '':
+            value = None
+        row[column] = value
+    for column in required:
+        if not row.get(column):
+            return None, f'{column} fehlt'
+    return row, None
+
+def _chunks(rows, size):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _placeholders(values):
+    return ', '.join('?' * len(values))
+
+def _load_existing(conn, entity, barcodes, columns):
+    table = ENTITIES[entity][0]
+    rows = conn.execute(f"""
+        SELECT barcode, deleted, {', '.join(columns)}
+        FROM {table} WHERE barcode IN ({_placeholders(barcodes)})
+    """, barcodes).fetchall()
+    return {row['barcode']: row for row in rows}
+
+def _load_foreign(conn, entity, barcodes):
+    """Barcodes, die bereits von einem anderen Typ belegt sind"""
+    table = ENTITIES[entity][0]
+    foreign = {}
+    for other in BARCODE_TABLES:
+        if other == table:
+            continue
+        for row in conn.execute(f"""
+            SELECT barcode FROM {other} WHERE barcode IN ({_placeholders(barcodes)})
+        """, barcodes):
+            foreign.setdefault(row['barcode'], other)
+    return foreign
+
+def _upsert_sql(entity, columns):
+    table, _, _, integers, insert_only = ENTITIES[entity]
+    insert_columns = columns + list(insert_only)
+    # Leere Zahlenfelder kommen als NULL und lassen den gespeicherten Wert stehen
+    updates = ', '.join(
+        f'{column} = COALESCE(excluded.{column}, {column})' if column in integers
+        else f'{column} = excluded.{column}'
+        for column in columns if column != 'barcode'
+    )
+    return f"""
+        INSERT INTO {table} ({', '.join(insert_columns)})
+        VALUES ({_placeholders(insert_columns)})
+        ON CONFLICT(barcode) DO UPDATE SET {updates}
+        WHERE deleted = 0
+    """
+
+def _classify(conn, entity, columns, chunk, seen, result):
+    """Prüft einen Block gegen die Datenbank, liefert die zu schreibenden Zeilen"""
+    integers = ENTITIES[entity][3]
+    stock_column = STOCK_COLUMNS.get(entity)
+    barcodes = [row['barcode'] for _, row in chunk]
+    existing = _load_existing(conn, entity, barcodes, columns)
+    foreign = _load_foreign(conn, entity, barcodes)
+    pending = []
+
+    for line, row in chunk:
+        barcode = row['barcode']
+        if barcode in seen:
+            result['errors'].append({'row': line, 'barcode': barcode,
+                                     'message': f'Barcode doppelt in der Datei (zuerst Zeile {seen[barcode]})'})
+            continue
+        seen[barcode] = line
+        if barcode in foreign:
+            result['errors'].append({'row': line, 'barcode': barcode,
+                                     'message': f'Barcode ist bereits vergeben ({foreign[barcode]})'})
+            continue
+
+        current = existing.get(barcode)
+        if current is None:
+            for column in integers:
+                if column in row and row[column] is None:
+                    row[column] = 0
+            result['created'] += 1
+            change = {'row': line, 'barcode': barcode, 'action': 'create'}
+        elif current['deleted']:
+            result['errors'].append({'row': line, 'barcode': barcode,
+                                     'message': 'Barcode gehört zu einem gelöschten Eintrag (Papierkorb)'})
+            continue
+        else:
+            fields = {column: [current[column], row[column]] for column in columns
+                      if not (column in integers and row[column] is None)
+                      and (current[column] if current[column] != '' else None) != row[column]}
+            if not fields:
+                result['unchanged'] += 1
+                continue
+            result['updated'] += 1
+            change = {'row': line, 'barcode': barcode, 'action': 'update', 'fields': fields}
+            if stock_column in fields:
+                result['stock_changed'] += 1
+                if len(result['stock_changes']) < MAX_REPORTED_CHANGES:
+                    old, new = fields[stock_column]
+                    result['stock_changes'].append({'row': line, 'barcode': barcode,
+                                                    'old': old, 'new': new})
+
+        if len(result['changes']) < MAX_REPORTED_CHANGES:
+            result['changes'].append(change)
+        pending.append(row)
+    return pending
+
+def run(conn, entity, rows, apply=False, chunk_size=None):
+    """Prüft (und schreibt mit apply=True) die Zeilen einer Importdatei
+
+    rows ist ein Iterator über Zeilen (Listen), die erste Zeile ist der Kopf.
+    Wirft ValueError bei unbekanntem Typ oder unbrauchbarer Kopfzeile.
+    """
+    if entity not in ENTITIES:
+        raise ValueError(f'Unbekannter Importtyp: {entity}')
+    chunk_size = chunk_size or Database.get_setting('IMPORT_CHUNK_SIZE')
+    rows = iter(rows)
+    header = next(rows, None)
+    if not header:
+        raise ValueError('Die Datei ist leer')
+    mapping = _map_header(entity, header)
+    columns = list(mapping.values())
+    upsert = _upsert_sql(entity, columns)
+    insert_only = list(ENTITIES[entity][4].values())
+
+    result = {'success': True, 'applied': apply, 'rows': 0, 'created': 0,
+              'updated': 0, 'unchanged': 0, 'stock_changed': 0, 'errors': [],
+              'changes': [], 'stock_changes': []}
+    seen = {}
+
+    def parsed():
+        # Zeilennummern wie in der Tabellenkalkulation (Kopf = Zeile 1)
+        for line, values in enumerate(rows, start=2):
+            if not any(str(value).strip() for value in values):
+                continue
+            result['rows'] += 1
+            row, error = _parse_row(entity, mapping, values)
+            if error:
+                result['errors'].append({'row': line, 'barcode': None, 'message': error})
+                continue
+            yield line, row
+
+    for chunk in _chunks(parsed(), chunk_size):
+        if not apply:
+            _classify(conn, entity, columns, chunk, seen, result)
+            continue
+
+        conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            pending = _classify(conn, entity, columns, chunk, seen, result)
+            conn.executemany(upsert, [
+                [row[column] for column in columns] + insert_only for row in pending
+            ])
+            settings_cache.invalidate(conn)
+            conn.commit()
+            settings_cache.clear()
+        except Exception:
+            conn.rollback()
+            raise
+
+    result['errors'].sort(key=lambda error: error['row'])
+    result['success'] = not result['errors']
+    if apply:
+        logger.info(f"Import {entity}: {result['created']} neu, {result['updated']} geändert "
+                    f"(davon {result['stock_changed']} Bestände), {len(result['errors'])} Fehler")
+    return result
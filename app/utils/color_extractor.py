@@ -1,4 +1,3 @@
-from PIL import Image
 import colorsys
 from flask import current_app
 import os
@@ -7,6 +6,9 @@ def extract_dominant_color(logo_path=None):
     """Gibt die Standardfarben zurück oder extrahiert sie aus einem Bild (nicht SVG)"""
     try:
         if logo_path and not logo_path.lower().endswith('.svg'):
+            # PIL erst laden, wenn tatsächlich ein Bild ausgewertet wird
+            from PIL import Image
+
             full_path = os.path.join(current_app.static_folder, 'images', logo_path)
             img = Image.open(full_path).convert('RGBA')
             
@@ -1,4 +1,5 @@
 from app.models.database import Database
+from app.utils import settings_cache
 import colorsys
 
 def hex_to_hsl(hex_color):
@@ -56,6 +57,8 @@ def save_color_setting(key, value):
                 INSERT OR REPLACE INTO settings (key, value)
                 VALUES (?, ?)
             """, (f'{key}_color', value))
+            settings_cache.invalidate(conn)
             conn.commit()
+            settings_cache.clear()
     except Exception as e:
         print(f"Fehler beim Speichern der Farbeinstellung: {e}")
\ No newline at end of file
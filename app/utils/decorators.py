@@ -1,6 +1,6 @@
+import time
 from functools import wraps
 from flask import session, redirect, url_for, request, flash
-from datetime import datetime
 from app.utils.logger import loggers
 
 def login_required(f):
@@ -53,21 +53,21 @@ def log_db_operation(operation):
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            start_time = datetime.now()
+            start_time = time.perf_counter()
             try:
                 result = f(*args, **kwargs)
-                duration = (datetime.now() - start_time).total_seconds()
+                duration = time.perf_counter() - start_time
                 loggers['database'].info(
                     f"DB Operation: {operation} - "
-                    f"Dauer: {duration:.2f}s - "
+                    f"Dauer: {duration * 1000:.1f} ms - "
                     f"Erfolgreich: Ja"
                 )
                 return result
             except Exception as e:
-                duration = (datetime.now() - start_time).total_seconds()
+                duration = time.perf_counter() - start_time
                 loggers['database'].error(
                     f"DB Operation: {operation} - "
-                    f"Dauer: {duration:.2f}s - "
+                    f"Dauer: {duration * 1000:.1f} ms - "
                     f"Fehler: {str(e)}"
                 )
                 raise
@@ -0,0 +1,187 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import datetime
+from app.models.database import Database
+from app.models import archive
+
+# Export von Beständen und Historie als CSV oder XLSX. Die Zeilen werden
+# blockweise per fetchmany() gelesen und sofort weitergegeben, der
+# Speicherbedarf hängt also nicht von der Tabellengröße ab. CSV wird direkt
+# gestreamt; XLSX entsteht mit openpyxl im write-only-Modus in einer
+# temporären Datei, die anschließend in Blöcken ausgeliefert wird.
+# Ausleihen und Entnahmen enthalten auch die archivierten Zeilen
+# (app/models/archive.py), {lendings}/{consumable_usages} stehen für die Quelle.
+
+FORMATS = ('csv', 'xlsx')
+
+MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Datensatz -> (Spaltenüberschriften, SQL, Spalte für den Datumsfilter, Sortierung)
+# Sortiert wird nach der ID, damit SQLite ohne Vorsortieren sofort liefern kann
+DATASETS = {
+    'tools': (
+        ['Barcode', 'Name', 'Beschreibung', 'Kategorie', 'Standort', 'Status', 'Angelegt'],
+        '''SELECT barcode, name, description, category, location, status, created_at
+           FROM tools WHERE deleted = 0''',
+        'created_at',
+        'id',
+    ),
+    'workers': (
+        ['Barcode', 'Vorname', 'Nachname', 'Abteilung', 'E-Mail', 'Angelegt'],
+        '''SELECT barcode, firstname, lastname, department, email, created_at
+           FROM workers WHERE deleted = 0''',
+        'created_at',
+        'id',
+    ),
+    'consumables': (
+        ['Barcode', 'Name', 'Beschreibung', 'Kategorie', 'Standort', 'Bestand',
+         'Mindestbestand', 'Angelegt'],
+        '''SELECT barcode, name, description, category, location, quantity,
+                  min_quantity, created_at
+           FROM consumables WHERE deleted = 0''',
+        'created_at',
+        'id',
+    ),
+    'lendings': (
+        ['ID', 'Werkzeug', 'Werkzeugname', 'Mitarbeiter', 'Mitarbeitername',
+         'Ausgeliehen', 'Fällig', 'Zurückgegeben'],
+        '''SELECT l.id, l.tool_barcode, t.name, l.worker_barcode,
+                  w.firstname || ' ' || w.lastname, l.lent_at, l.due_at, l.returned_at
+           FROM {lendings} l
+           LEFT JOIN tools t ON t.barcode = l.tool_barcode
+           LEFT JOIN workers w ON w.barcode = l.worker_barcode
+           WHERE 1 = 1''',
+        'l.lent_at',
+        'l.id',
+    ),
+    'consumable_usages': (
+        ['ID', 'Material', 'Materialname', 'Mitarbeiter', 'Mitarbeitername',
+         'Menge', 'Entnommen'],
+        '''SELECT cu.id, cu.consumable_barcode, c.name, cu.worker_barcode,
+                  w.firstname || ' ' || w.lastname, cu.quantity, cu.used_at
+           FROM {consumable_usages} cu
+           LEFT JOIN consumables c ON c.barcode = cu.consumable_barcode
+           LEFT JOIN workers w ON w.barcode = cu.worker_barcode
+           WHERE 1 = 1''',
+        'cu.used_at',
+        'cu.id',
+    ),
+}
+
+def _parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'Ungültiges Datum für {name}: {value} (erwartet JJJJ-MM-TT)')
+
+def build_query(dataset, start=None, end=None, archived=False):
+    """Liefert (Überschriften, SQL, Parameter); end ist inklusive
+
+    archived: auch die Archivtabellen lesen (Archiv muss angehängt sein).
+    Wirft ValueError bei unbekanntem Datensatz oder ungültigem Datum.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f'Unbekannter Datensatz: {dataset}')
+    headers, sql, date_column, order_column = DATASETS[dataset]
+    sql = sql.format(**(archive.UNION_SOURCES if archived else archive.HOT_SOURCES))
+    params = []
+    start = _parse_date(start, 'start')
+    end = _parse_date(end, 'end')
+    if start:
+        sql += f' AND {date_column} >= ?'
+        params.append(start)
+    if end:
+        sql += f" AND {date_column} < date(?, '+1 day')"
+        params.append(end)
+    return headers, sql + f' ORDER BY {order_column}', params
+
+def iter_rows(sql, params, batch_size=None, archived=False):
+    """Liest die Zeilen blockweise über eine eigene Verbindung
+
+    Die Verbindung gehört dem Generator, damit ein gestreamter Export nicht
+    von der Request-Verbindung abhängt (die nach dem Request zurück in den
+    Pool geht). Alle Blöcke stammen aus demselben Lese-Snapshot.
+    """
+    batch_size = batch_size or Database.get_setting('EXPORT_BATCH_SIZE')
+    conn = Database.get_db_connection()
+    try:
+        if archived:
+            archive.attach(conn)
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield tuple(row)
+    finally:
+        conn.close()
+
+def stream_csv(headers, rows, flush_rows=500):
+    """Erzeugt CSV-Blöcke (Semikolon, UTF-8 mit BOM für Excel)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    buffer.write('\ufeff')
+    writer.writerow(headers)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_rows:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode('utf-8')
+
+def write_xlsx(headers, rows, target, title):
+    """Schreibt eine XLSX-Datei zeilenweise (openpyxl write-only)"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(target)
+
+def stream_xlsx(headers, rows, title, chunk_size=64 * 1024):
+    """Erzeugt eine XLSX-Datei in einer Temp-Datei und liefert sie in Blöcken"""
+    fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='scandy-export-')
+    os.close(fd)
+    try:
+        write_xlsx(headers, rows, path, title)
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+def filename(dataset, fmt, now=None):
+    """Dateiname nach dem Muster der bisherigen Exporte (workers_20241202_082139.xlsx)"""
+    return f"{dataset}_{(now or datetime.now()).strftime('%Y%m%d_%H%M%S')}.{fmt}"
+
+def export(dataset, fmt, start=None, end=None):
+    """Liefert einen Generator mit den Bytes des Exports
+
+    Wirft ValueError bei unbekanntem Datensatz, Format oder Datum – und zwar
+    sofort, nicht erst beim ersten Lesen aus dem Generator.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unbekanntes Format: {fmt}')
+    archived = os.path.exists(archive.archive_path())
+    headers, sql, params = build_query(dataset, start, end, archived)
+    rows = iter_rows(sql, params, archived=archived)
+    if fmt == 'csv':
+        return stream_csv(headers, rows)
+    return stream_xlsx(headers, rows, dataset)
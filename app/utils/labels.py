@@ -0,0 +1,260 @@
+import functools
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from app.models.database import Database
+
+# Barcode-Etiketten aus inventory.db (ersetzt die Bildschleife aus
+# generate_barcodes.py). Jedes Etikett wird direkt in Zielgröße gezeichnet:
+# python-barcode liefert nur die Modulfolge des Code128, die Balken malt
+# PIL mit ganzzahliger Modulbreite (scharf, kein Skalieren). Fertige
+# Etiketten liegen als PNG im Cache-Verzeichnis, Schlüssel ist ein Hash aus
+# Barcode, Name und Layout. Größere Mengen werden über einen Prozesspool
+# gerendert, die Bögen entstehen als mehrseitiges PDF mit reportlab.
+# PIL, python-barcode und reportlab werden erst beim Rendern importiert.
+
+# Version der Zeichenroutine, fließt in den Cache-Schlüssel ein
+RENDER_VERSION = 1
+
+MM_PER_INCH = 25.4
+
+class Layout:
+    """Etikettengröße und Anordnung auf dem Bogen (Maße in mm)"""
+
+    def __init__(self, name, width, height, columns=1, rows=1, margin_left=0,
+                 margin_top=0, gap_x=0, gap_y=0, page_width=None, page_height=None,
+                 dpi=300, font_size=2.8):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.columns = columns
+        self.rows = rows
+        self.margin_left = margin_left
+        self.margin_top = margin_top
+        self.gap_x = gap_x
+        self.gap_y = gap_y
+        self.page_width = page_width or width
+        self.page_height = page_height or height
+        self.dpi = dpi
+        self.font_size = font_size
+
+    @property
+    def per_page(self):
+        return self.columns * self.rows
+
+    def px(self, value_mm):
+        return int(round(value_mm / MM_PER_INCH * self.dpi))
+
+    def position(self, index):
+        """Linke obere Ecke des Etiketts auf seiner Seite (mm, von oben gemessen)"""
+        slot = index % self.per_page
+        column, row = slot % self.columns, slot // self.columns
+        return (self.margin_left + column * (self.width + self.gap_x),
+                self.margin_top + row * (self.height + self.gap_y))
+
+LAYOUTS = {
+    # A4-Bogen mit 3 x 10 Etiketten (wie bisher generate_barcodes.py)
+    'a4_3x10': Layout('a4_3x10', 63.5, 25.4, columns=3, rows=10, margin_left=7.2,
+                      margin_top=21.5, gap_x=2.5, gap_y=0,
+                      page_width=210, page_height=297),
+    # Einzeletikett für Etikettendrucker (62 mm Endlosband)
+    'single': Layout('single', 62, 29),
+}
+
+DEFAULT_LAYOUT = 'a4_3x10'
+
+def get_layout(name):
+    """Liefert ein Layout, wirft ValueError bei unbekanntem Namen"""
+    if name not in LAYOUTS:
+        raise ValueError(f'Unbekanntes Layout: {name}')
+    return LAYOUTS[name]
+
+def label_text(barcode, name):
+    return f"{(name or '')[:30]} - {barcode}"
+
+def cache_key(barcode, name, layout_name):
+    raw = f'{RENDER_VERSION}\x00{layout_name}\x00{barcode}\x00{name or ""}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def cache_path(cache_dir, barcode, name, layout_name, ext='png'):
+    key = cache_key(barcode, name, layout_name)
+    return os.path.join(cache_dir, key[:2], f'{key}.{ext}')
+
+def write_atomic(path, data):
+    """Schreibt eine Cache-Datei so, dass Leser nie eine halbe Datei sehen"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def modules(barcode):
+    """Modulfolge ('1' = Balken) des Code128 für den Barcode"""
+    import barcode as python_barcode
+
+    return python_barcode.get('code128', barcode).build()[0]
+
+@functools.lru_cache(maxsize=8)
+def _font(size_px):
+    """Schrift einmal pro Prozess und Größe laden"""
+    from PIL import ImageFont
+
+    for candidate in ('DejaVuSans.ttf', 'Arial.ttf', 'Arial'):
+        try:
+            return ImageFont.truetype(candidate, size_px)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+def _geometry(barcode, layout):
+    """Balkenbereich in Pixeln: (Module, Modulbreite, x-Start, Höhe, Textzeile)"""
+    bars = modules(barcode)
+    width, height = layout.px(layout.width), layout.px(layout.height)
+    quiet = layout.px(2)
+    module_px = max(1, (width - 2 * quiet) // len(bars))
+    x0 = (width - module_px * len(bars)) // 2
+    text_px = layout.px(layout.font_size)
+    bar_height = height - text_px - 3 * layout.px(1)
+    return bars, module_px, x0, bar_height, text_px
+
+def _runs(bars):
+    """Zusammenhängende Balken als (Startmodul, Länge)"""
+    start = None
+    for index, bit in enumerate(bars + '0'):
+        if bit == '1' and start is None:
+            start = index
+        elif bit != '1' and start is not None:
+            yield start, index - start
+            start = None
+
+def render_png(barcode, name, layout):
+    """Zeichnet ein Etikett und liefert es als PNG (Bytes)"""
+    from PIL import Image, ImageDraw
+
+    bars, module_px, x0, bar_height, text_px = _geometry(barcode, layout)
+    width, height = layout.px(layout.width), layout.px(layout.height)
+    top = layout.px(1)
+
+    image = Image.new('1', (width, height), 1)
+    draw = ImageDraw.Draw(image)
+    for start, length in _runs(bars):
+        x = x0 + start * module_px
+        draw.rectangle([x, top, x + length * module_px - 1, top + bar_height], fill=0)
+
+    font = _font(text_px)
+    text = label_text(barcode, name)
+    text_width = draw.textlength(text, font=font)
+    draw.text(((width - text_width) // 2, top + bar_height + layout.px(1)), text, fill=0, font=font)
+
+    output = io.BytesIO()
+    image.save(output, format='PNG', dpi=(layout.dpi, layout.dpi), optimize=True)
+    return output.getvalue()
+
+def render_svg(barcode, name, layout):
+    """Zeichnet ein Etikett als SVG (Vektor, Maße in mm)"""
+    from xml.sax.saxutils import escape
+
+    bars, module_px, x0, bar_height, text_px = _geometry(barcode, layout)
+    width, height = layout.px(layout.width), layout.px(layout.height)
+    top = layout.px(1)
+    rects = ''.join(
+        f'<rect x="{x0 + start * module_px}" y="{top}" width="{length * module_px}" height="{bar_height}"/>'
+        for start, length in _runs(bars)
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{layout.width}mm" height="{layout.height}mm" '
+        f'viewBox="0 0 {width} {height}">'
+        f'<rect width="100%" height="100%" fill="#fff"/>'
+        f'<g fill="#000" shape-rendering="crispEdges">{rects}</g>'
+        f'<text x="{width / 2}" y="{top + bar_height + layout.px(1) + text_px}" font-family="DejaVu Sans, Arial, sans-serif" '
+        f'font-size="{text_px}" text-anchor="middle">{escape(label_text(barcode, name))}</text>'
+        f'</svg>'
+    ).encode('utf-8')
+
+def _render_to_cache(task):
+    """Pool-Aufgabe: rendert ein Etikett in den Cache und liefert den Pfad"""
+    barcode, name, layout_name, cache_dir = task
+    path = cache_path(cache_dir, barcode, name, layout_name)
+    if not os.path.exists(path):
+        write_atomic(path, render_png(barcode, name, LAYOUTS[layout_name]))
+    return path
+
+def render_labels(items, layout_name=DEFAULT_LAYOUT, workers=None):
+    """Stellt für alle Einträge ein PNG im Cache sicher, liefert die Pfade
+
+    items sind Dictionaries mit barcode und name. Nur fehlende Etiketten
+    werden gerendert, ab LABEL_PARALLEL_THRESHOLD über einen Prozesspool.
+    """
+    get_layout(layout_name)
+    cache_dir = Database.get_setting('LABEL_CACHE_DIR')
+    paths = [cache_path(cache_dir, item['barcode'], item['name'], layout_name) for item in items]
+    missing = list({path: (item['barcode'], item['name'], layout_name, cache_dir)
+                    for item, path in zip(items, paths)
+                    if not os.path.exists(path)}.values())
+
+    workers = workers if workers is not None else Database.get_setting('LABEL_WORKERS')
+    if workers > 1 and len(missing) >= Database.get_setting('LABEL_PARALLEL_THRESHOLD'):
+        # spawn statt fork: der Aufrufer ist oft ein Gunicorn-Worker mit Threads
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            chunksize = max(1, len(missing) // (workers * 4))
+            list(pool.map(_render_to_cache, missing, chunksize=chunksize))
+    else:
+        for task in missing:
+            _render_to_cache(task)
+    return paths
+
+def render_pdf(items, layout_name=DEFAULT_LAYOUT, title=None, workers=None):
+    """Setzt die Etiketten als mehrseitiges PDF und liefert die Bytes"""
+    from reportlab.lib.units import mm
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    layout = get_layout(layout_name)
+    paths = render_labels(items, layout_name, workers)
+
+    output = io.BytesIO()
+    pdf = canvas.Canvas(output, pagesize=(layout.page_width * mm, layout.page_height * mm))
+    if title:
+        pdf.setTitle(title)
+    for index, path in enumerate(paths):
+        if index and index % layout.per_page == 0:
+            pdf.showPage()
+        if title and index % layout.per_page == 0 and layout.per_page > 1:
+            pdf.setFont('Helvetica', 10)
+            pdf.drawString(layout.margin_left * mm, (layout.page_height - 12) * mm, title)
+        x, y = layout.position(index)
+        pdf.drawImage(ImageReader(path), x * mm,
+                      (layout.page_height - y - layout.height) * mm,
+                      width=layout.width * mm, height=layout.height * mm)
+    pdf.showPage()
+    pdf.save()
+    return output.getvalue()
+
+# Typ -> SQL für Barcode und Beschriftung
+LABEL_SOURCES = {
+    'tool': "SELECT barcode, name, created_at FROM tools WHERE deleted = 0",
+    'consumable': "SELECT barcode, name, created_at FROM consumables WHERE deleted = 0",
+    'worker': """SELECT barcode, firstname || ' ' || lastname AS name, created_at
+                 FROM workers WHERE deleted = 0""",
+}
+
+def load_items(conn, entity_types=None, barcodes=None, since=None):
+    """Wählt Etiketten aus inventory.db aus (nach Typ, Barcodes, Anlagedatum)"""
+    selects = []
+    params = []
+    for entity_type in entity_types or LABEL_SOURCES:
+        if entity_type not in LABEL_SOURCES:
+            raise ValueError(f'Unbekannter Typ: {entity_type}')
+        sql = LABEL_SOURCES[entity_type]
+        if barcodes:
+            sql += f" AND barcode IN ({', '.join('?' * len(barcodes))})"
+            params.extend(barcodes)
+        if since:
+            sql += " AND created_at >= ?"
+            params.append(since)
+        selects.append(f"SELECT barcode, name FROM ({sql})")
+    rows = conn.execute(' UNION ALL '.join(selects) + ' ORDER BY name, barcode', params)
+    return [dict(row) for row in rows]
@@ -2,11 +2,19 @@ import logging
 from logging.handlers import RotatingFileHandler
 import os
 
-# Stelle sicher, dass das logs-Verzeichnis existiert
-if not os.path.exists('logs'):
-    os.makedirs('logs')
+# Die Log-Dateien unter logs/ werden erst beim ersten Zugriff auf den
+# jeweiligen Logger eingerichtet (nicht beim Import), damit der Start der
+# App und jedes Gunicorn-Workers keine Verzeichnisse und Handler anlegt.
+
+LOG_FILES = {
+    'user_actions': 'logs/user_actions.log',
+    'errors': 'logs/errors.log',
+    'database': 'logs/database.log',
+    'slow_queries': 'logs/slow_queries.log'
+}
 
 def setup_logger(name, log_file, level=logging.INFO):
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
     handler = RotatingFileHandler(
         log_file,
         maxBytes=1024 * 1024,  # 1 MB
@@ -16,16 +24,20 @@ def setup_logger(name, log_file, level=logging.INFO):
     handler.setFormatter(logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     ))
-    
+
     logger = logging.getLogger(name)
     logger.setLevel(level)
     logger.addHandler(handler)
-    
+
     return logger
 
-# Logger initialisieren
-loggers = {
-    'user_actions': setup_logger('user_actions', 'logs/user_actions.log'),
-    'errors': setup_logger('errors', 'logs/errors.log'),
-    'database': setup_logger('database', 'logs/database.log')
-} 
\ No newline at end of file
+class LazyLoggers(dict):
+    """Richtet die Logger aus LOG_FILES beim ersten Zugriff ein"""
+
+    def __missing__(self, name):
+        if name not in LOG_FILES:
+            raise KeyError(name)
+        return self.setdefault(name, setup_logger(name, LOG_FILES[name]))
+
+# Logger (loggers['errors'] usw.)
+loggers = LazyLoggers()
@@ -0,0 +1,355 @@
+import atexit
+import contextlib
+import glob
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: archive.json wird dann nicht gesperrt
+    fcntl = None
+
+# Metriken im Prometheus-Textformat (/metrics). Jeder Gunicorn-Worker zählt
+# im Speicher (Zähler und Histogramme, ein Lock, keine I/O im Request) und
+# schreibt alle METRICS_FLUSH_INTERVAL Sekunden eine Momentaufnahme nach
+# METRICS_DIR/<pid>.json. /metrics schreibt die eigene Aufnahme sofort und
+# summiert die Dateien aller Worker. Zähler beendeter Worker bleiben
+# erhalten (werden in archive.json zusammengeführt), Gauges zählen nur für
+# laufende Prozesse. Das Verzeichnis wird beim Start von Gunicorn geleert
+# (on_starting in gunicorn.conf.py).
+
+# Name -> (Typ, Hilfetext, Bucket-Grenzen bei Histogrammen)
+METRICS = {
+    'scandy_http_requests_total': (
+        'counter', 'Anfragen nach Endpoint, Methode und Status', None),
+    'scandy_http_request_duration_seconds': (
+        'histogram', 'Bearbeitungszeit der Anfragen nach Endpoint',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)),
+    'scandy_db_queries_total': (
+        'counter', 'Datenbankabfragen nach Name (siehe /admin/metrics/queries)', None),
+    'scandy_db_query_seconds_total': (
+        'counter', 'Summierte Laufzeit der Datenbankabfragen nach Name', None),
+    'scandy_db_query_duration_seconds': (
+        'histogram', 'Laufzeit einzelner Datenbankabfragen',
+        (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)),
+    'scandy_db_errors_total': (
+        'counter', 'Fehlgeschlagene Abfragen (kind=locked für busy/locked nach Ablauf von busy_timeout)', None),
+    'scandy_db_connections_opened_total': (
+        'counter', 'Geöffnete SQLite-Verbindungen', None),
+    'scandy_db_connections_reused_total': (
+        'counter', 'Aus dem Pool wiederverwendete Verbindungen', None),
+    'scandy_db_pool_idle_connections': (
+        'gauge', 'Freie Verbindungen in den Pools der laufenden Worker', None),
+    'scandy_cache_requests_total': (
+        'counter', 'Cache-Zugriffe nach Cache und Ergebnis (hit/miss)', None),
+    'scandy_cache_hit_ratio': (
+        'gauge', 'Trefferquote seit dem Start (aus scandy_cache_requests_total)', None),
+    'scandy_sessions_active': (
+        'gauge', 'Nicht abgelaufene Sessions im SQLite-Session-Store', None),
+    'scandy_sessions_db_bytes': (
+        'gauge', 'Größe der Session-Datenbank in Bytes', None),
+    'scandy_workers': (
+        'gauge', 'Laufende Worker-Prozesse mit Metrik-Datei', None),
+}
+
+ARCHIVE_FILE = 'archive.json'
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_gauges = {}
+_flusher_pid = None
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())) if labels else ())
+
+def inc(name, labels=None, value=1):
+    """Erhöht einen Zähler dieses Prozesses"""
+    _start_flusher()
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, labels=None):
+    """Trägt einen Messwert in ein Histogramm ein"""
+    _start_flusher()
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            # Zähler je Bucket (nicht kumuliert), +Inf, Summe
+            entry = _histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(buckets)
+        entry[index] += 1
+        entry[-1] += value
+
+def set_gauge(name, value, labels=None):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+def observe_request(endpoint, method, status, duration):
+    labels = {'endpoint': endpoint}
+    inc('scandy_http_requests_total', {'endpoint': endpoint, 'method': method, 'status': str(status)})
+    observe('scandy_http_request_duration_seconds', duration, labels)
+
+def observe_query(name, duration, error=None):
+    """Hook aus app/utils/query_stats.py für jede abgeschlossene Abfrage"""
+    _start_flusher()
+    key_calls = ('scandy_db_queries_total', (('query', name),))
+    key_seconds = ('scandy_db_query_seconds_total', (('query', name),))
+    with _lock:
+        _counters[key_calls] = _counters.get(key_calls, 0) + 1
+        _counters[key_seconds] = _counters.get(key_seconds, 0) + duration
+    observe('scandy_db_query_duration_seconds', duration)
+    if error is not None:
+        message = str(error).lower()
+        kind = 'locked' if ('locked' in message or 'busy' in message) else 'other'
+        inc('scandy_db_errors_total', {'kind': kind})
+
+def cache_access(cache, hit):
+    inc('scandy_cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+# Dateien pro Prozess
+
+def _directory():
+    from app.models.database import Database
+
+    return Database.get_setting('METRICS_DIR')
+
+def _snapshot():
+    """Momentaufnahme dieses Prozesses als JSON-taugliches Dictionary"""
+    from app.models import db_pool
+
+    pool = db_pool.pool_stats()
+    with _lock:
+        counters = dict(_counters)
+        counters[('scandy_db_connections_opened_total', ())] = pool['opened']
+        counters[('scandy_db_connections_reused_total', ())] = pool['reused']
+        gauges = dict(_gauges)
+        gauges[('scandy_db_pool_idle_connections', ())] = pool['idle']
+        return {
+            'pid': os.getpid(),
+            'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+            'histograms': [[name, list(labels), list(entry)] for (name, labels), entry in _histograms.items()],
+            'gauges': [[name, list(labels), value] for (name, labels), value in gauges.items()],
+        }
+
+def _write_json(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+def flush():
+    """Schreibt die Momentaufnahme dieses Prozesses nach METRICS_DIR/<pid>.json"""
+    directory = _directory()
+    os.makedirs(directory, exist_ok=True)
+    _write_json(os.path.join(directory, f'{os.getpid()}.json'), _snapshot())
+
+def _start_flusher():
+    """Startet den Schreib-Thread (einmal pro Prozess, auch nach fork)"""
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        if _flusher_pid is not None:
+            # Nach fork: die geerbten Werte gehören dem Elternprozess
+            _counters.clear()
+            _histograms.clear()
+            _gauges.clear()
+        _flusher_pid = os.getpid()
+
+    from app.models.database import Database
+
+    interval = Database.get_setting('METRICS_FLUSH_INTERVAL')
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                flush()
+            except OSError:
+                # Nächster Versuch im nächsten Intervall
+                pass
+
+    threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+    atexit.register(_flush_quietly)
+
+def _flush_quietly():
+    try:
+        flush()
+    except Exception:
+        pass
+
+def clear_directory(directory=None):
+    """Entfernt die Dateien eines früheren Laufs (vor dem Start der Worker)"""
+    directory = directory or _directory()
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+
+def reset():
+    """Setzt die Werte dieses Prozesses zurück (Tests, Benchmarks)"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _gauges.clear()
+
+# Zusammenführen und Ausgabe
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    if os.name != 'posix':
+        # os.kill(pid, 0) würde unter Windows den Prozess beenden
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # Gerade ersetzt oder unvollständig: beim nächsten Abruf wieder dabei
+        return None
+
+def _merge(target, snapshot, with_gauges):
+    counters, histograms, gauges = target
+    for name, labels, value in snapshot.get('counters', []):
+        key = (name, tuple(tuple(pair) for pair in labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, entry in snapshot.get('histograms', []):
+        key = (name, tuple(tuple(pair) for pair in labels))
+        current = histograms.get(key)
+        histograms[key] = entry if current is None else [a + b for a, b in zip(current, entry)]
+    if with_gauges:
+        for name, labels, value in snapshot.get('gauges', []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            gauges[key] = gauges.get(key, 0) + value
+
+@contextlib.contextmanager
+def _archive_lock(directory):
+    """Sperrt archive.json gegen gleichzeitiges Zusammenführen durch andere Worker"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, 'archive.lock'), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _archive_dead(directory, snapshots):
+    """Führt Dateien beendeter Worker in archive.json zusammen (unter _archive_lock)"""
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    merged = ({}, {}, {})
+    _merge(merged, _read_json(archive_path) or {}, False)
+    for path, snapshot in snapshots:
+        _merge(merged, snapshot, False)
+    counters, histograms, _ = merged
+    _write_json(archive_path, {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), entry] for (name, labels), entry in histograms.items()],
+    })
+    for path, snapshot in snapshots:
+        os.remove(path)
+
+def collect():
+    """Summiert die Momentaufnahmen aller Worker: (Zähler, Histogramme, Gauges)"""
+    flush()
+    directory = _directory()
+    merged = ({}, {}, {})
+    workers = 0
+    # Gesperrt, damit kein anderer Worker gleichzeitig Dateien ins Archiv verschiebt
+    with _archive_lock(directory):
+        dead = []
+        for path in glob.glob(os.path.join(directory, '*.json')):
+            snapshot = _read_json(path)
+            if snapshot is None:
+                continue
+            if os.path.basename(path) == ARCHIVE_FILE:
+                _merge(merged, snapshot, False)
+                continue
+            alive = _alive(snapshot.get('pid'))
+            workers += alive
+            _merge(merged, snapshot, alive)
+            if not alive:
+                dead.append((path, snapshot))
+        if dead:
+            try:
+                _archive_dead(directory, dead)
+            except OSError:
+                pass
+
+    counters, histograms, gauges = merged
+    gauges[('scandy_workers', ())] = workers
+    for labels, ratio in cache_ratios(counters).items():
+        gauges[('scandy_cache_hit_ratio', labels)] = ratio
+    return merged
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+def render(counters, histograms, gauges):
+    """Prometheus-Textformat (Version 0.0.4)"""
+    # Name -> [(Labels, Zeilen)], Buckets bleiben in aufsteigender Reihenfolge
+    series = {}
+    for (name, labels), value in list(counters.items()) + list(gauges.items()):
+        series.setdefault(name, []).append((labels, [f'{name}{_labels(labels)} {_number(value)}']))
+    for (name, labels), entry in histograms.items():
+        buckets = METRICS[name][2]
+        lines = []
+        cumulative = 0
+        for bound, count in zip(buckets, entry):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(labels, [("le", repr(float(bound)))])} {cumulative}')
+        cumulative += entry[len(buckets)]
+        lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {cumulative}')
+        lines.append(f'{name}_sum{_labels(labels)} {_number(entry[-1])}')
+        lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        series.setdefault(name, []).append((labels, lines))
+
+    output = []
+    for name in sorted(series):
+        kind, help_text = METRICS.get(name, ('untyped', ''))[:2]
+        output.append(f'# HELP {name} {help_text}')
+        output.append(f'# TYPE {name} {kind}')
+        for labels, lines in sorted(series[name], key=lambda item: item[0]):
+            output.extend(lines)
+    return '\n'.join(output) + '\n'
+
+def cache_ratios(counters):
+    """Trefferquote je Cache aus den summierten Zugriffszählern"""
+    totals = {}
+    for (name, labels), value in counters.items():
+        if name != 'scandy_cache_requests_total':
+            continue
+        labels = dict(labels)
+        hits, total = totals.get(labels['cache'], (0, 0))
+        totals[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    return {(('cache', cache),): hits / total for cache, (hits, total) in totals.items() if total}
@@ -0,0 +1,160 @@
+import base64
+import json
+from flask import jsonify, make_response, render_template
+from app.models.database import Database
+from app.models.queries import named
+
+# Keyset-Paginierung für die Listenansichten. Der Cursor enthält die
+# Sortierwerte und den Barcode der letzten Zeile einer Seite; die nächste
+# Seite setzt per Zeilenwertvergleich direkt dahinter an. Anders als bei
+# OFFSET kostet jede Seite gleich viel, und neue oder gelöschte Zeilen
+# verschieben beim Weiterblättern nichts.
+
+class ListSpec:
+    """Beschreibt eine paginierbare Liste
+
+    sorts:   Name -> Tupel von SQL-Ausdrücken (dürfen nicht NULL sein)
+    filters: Name des URL-Parameters -> Bedingung mit genau einem ?
+    search:  Spalten, die von der Freitextsuche (q) durchsucht werden
+    name:    Name der Abfrage in der Abfragestatistik (app/utils/query_stats.py)
+    """
+
+    def __init__(self, columns, source, where, key, sorts, default_sort,
+                 filters=None, search=None, name=None):
+        self.columns = columns
+        self.source = source
+        self.where = where
+        self.key = key
+        self.sorts = sorts
+        self.default_sort = default_sort
+        self.filters = filters or {}
+        self.search = search or []
+        self.name = name
+
+def encode_cursor(sort, direction, values):
+    """Kodiert Sortierung und Schlüsselwerte als URL-tauglichen Cursor"""
+    raw = json.dumps([sort, direction, list(values)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort, direction, count):
+    """Dekodiert einen Cursor und prüft, ob er zur Sortierung passt"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, cursor_direction, values = json.loads(
+            base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        )
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Ungültiger Cursor')
+    if cursor_sort != sort or cursor_direction != direction:
+        raise ValueError('Cursor passt nicht zur Sortierung')
+    if not isinstance(values, list) or len(values) != count:
+        raise ValueError('Ungültiger Cursor')
+    return values
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def paginate(conn, spec, args, params=()):
+    """Liefert eine Seite der Liste als Dictionary
+
+    args sind die URL-Parameter (sort, dir, limit, cursor, q und die Filter),
+    params die Parameter für Platzhalter in spec.columns.
+    Wirft ValueError bei ungültigem Cursor.
+    """
+    sort = args.get('sort') or spec.default_sort
+    if sort not in spec.sorts:
+        sort = spec.default_sort
+    direction = 'desc' if (args.get('dir') or '').lower() == 'desc' else 'asc'
+
+    max_limit = Database.get_setting('LIST_MAX_PAGE_SIZE')
+    try:
+        limit = int(args.get('limit') or Database.get_setting('LIST_PAGE_SIZE'))
+    except ValueError:
+        limit = Database.get_setting('LIST_PAGE_SIZE')
+    limit = max(1, min(limit, max_limit))
+
+    order = spec.sorts[sort] + (spec.key,)
+    conditions = [spec.where]
+    values = list(params)
+
+    for name, condition in spec.filters.items():
+        value = args.get(name)
+        if value:
+            conditions.append(condition)
+            values.append(value)
+
+    search = (args.get('q') or '').strip()
+    if search and spec.search:
+        pattern = f'%{_escape_like(search)}%'
+        conditions.append('(' + ' OR '.join(
+            f"{column} LIKE ? ESCAPE '\\'" for column in spec.search
+        ) + ')')
+        values.extend([pattern] * len(spec.search))
+
+    cursor = args.get('cursor')
+    if cursor:
+        cursor_values = decode_cursor(cursor, sort, direction, len(order))
+        operator = '<' if direction == 'desc' else '>'
+        placeholders = ', '.join('?' * len(order))
+        conditions.append(f"({', '.join(order)}) {operator} ({placeholders})")
+        values.extend(cursor_values)
+
+    order_columns = ', '.join(f'{expr} AS _order_{i}' for i, expr in enumerate(order))
+    sql = f"""
+        SELECT {spec.columns}, {order_columns}
+        FROM {spec.source}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {', '.join(f'{expr} {direction.upper()}' for expr in order)}
+        LIMIT ?
+    """
+    if spec.name:
+        sql = named(spec.name, sql)
+    # Eine Zeile mehr holen, um zu wissen, ob es weitergeht
+    rows = conn.execute(sql, values + [limit + 1]).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            sort, direction, [last[f'_order_{i}'] for i in range(len(order))]
+        )
+
+    items = [{k: row[k] for k in row.keys() if not k.startswith('_order_')}
+             for row in rows]
+    return {
+        'items': items,
+        'next_cursor': next_cursor,
+        'sort': sort,
+        'dir': direction,
+        'limit': limit
+    }
+
+def rows_response(rows_template, page, **context):
+    """Nur die <tr>-Zeilen einer Seite, der Cursor der nächsten Seite steht im Header X-Next-Cursor"""
+    response = make_response(render_template(rows_template, **context))
+    response.headers['X-Next-Cursor'] = page['next_cursor'] or ''
+    return response
+
+def list_response(spec, args, template, rows_template, items_name, params=(), load_context=None):
+    """Antwortet je nach ?format= mit Seite (HTML), Tabellenzeilen oder JSON
+
+    format=rows liefert nur die <tr>-Zeilen für das Nachladen in der Tabelle,
+    der Cursor der nächsten Seite steht im Header X-Next-Cursor.
+    load_context() liefert zusätzliche Template-Variablen (z.B. Filterwerte)
+    und wird nur für die vollständige Seite aufgerufen.
+    """
+    try:
+        with Database.get_db() as conn:
+            page = paginate(conn, spec, args, params)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    output = args.get('format')
+    if output == 'json':
+        return jsonify(page)
+    if output == 'rows':
+        return rows_response(rows_template, page, **{items_name: page['items']})
+    context = load_context() if load_context else {}
+    return render_template(template, page=page, **{items_name: page['items']}, **context)
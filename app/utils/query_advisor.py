@@ -0,0 +1,75 @@
+import ast
+import inspect
+import re
+import sqlite3
+import sys
+
+SQL_START = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+# Kleine Tabellen, bei denen ein Scan unkritisch ist
+SMALL_TABLES = {'settings', 'admin', 'users', 'sqlite_master'}
+
+def collect_sql_strings(module):
+    """Sammelt alle SELECT-Strings eines Moduls samt Zeilennummer"""
+    try:
+        source = inspect.getsource(module)
+    except (OSError, TypeError):
+        return []
+
+    tree = ast.parse(source)
+    # f-Strings (JoinedStr) sind dynamisch, ihre Teilstücke werden übersprungen
+    fstring_parts = {id(part) for node in ast.walk(tree)
+                     if isinstance(node, ast.JoinedStr) for part in node.values}
+
+    queries = []
+    for node in ast.walk(tree):
+        if id(node) in fstring_parts:
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            if SQL_START.match(node.value):
+                queries.append((node.lineno, node.value.strip()))
+    return queries
+
+def get_query_modules(app):
+    """Module aller registrierten Blueprints plus die Modelle"""
+    names = {bp.import_name for bp in app.blueprints.values()}
+    names.update(name for name in sys.modules
+                 if name.startswith('app.models.') or name == 'app.utils.color_settings')
+    return [sys.modules[name] for name in sorted(names) if name in sys.modules]
+
+def explain(conn, sql):
+    """Führt EXPLAIN QUERY PLAN mit NULL-Parametern aus"""
+    params = [None] * sql.count('?')
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+def is_problematic(detail):
+    """Erkennt Full-Table-Scans und temporäre Sortierungen"""
+    if detail.startswith('SCAN '):
+        # Scans über einen (Teil-)Index gelten als unkritisch
+        if ' INDEX ' in detail or detail.startswith('SCAN CONSTANT'):
+            return False
+        return detail.split()[1] not in SMALL_TABLES
+    return 'USE TEMP B-TREE' in detail
+
+def analyze_queries(conn, modules):
+    """Prüft die Abfragepläne aller gefundenen SQL-Strings
+
+    Gibt eine Liste von Dicts mit Ort, SQL, Plan, Befunden und ggf. Fehler zurück.
+    """
+    results = []
+    for module in modules:
+        for lineno, sql in collect_sql_strings(module):
+            result = {
+                'location': f"{module.__name__}:{lineno}",
+                'sql': sql,
+                'plan': [],
+                'findings': [],
+                'error': None
+            }
+            try:
+                result['plan'] = explain(conn, sql)
+                result['findings'] = [d for d in result['plan'] if is_problematic(d)]
+            except sqlite3.Error as e:
+                result['error'] = str(e)
+            results.append(result)
+    return results
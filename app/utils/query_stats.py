@@ -0,0 +1,255 @@
+import collections
+import functools
+import os
+import sqlite3
+import sys
+import threading
+import time
+from app.utils import metrics
+from app.utils.logger import loggers
+
+# Laufzeitstatistik pro Abfrage. Die Verbindungen des Pools werden mit
+# instrumentierten Connection-/Cursor-Klassen geöffnet, dadurch läuft jede
+# Abfrage hier durch (auch Inline-SQL in Routen und Modellen). Gemessen wird
+# mit perf_counter von execute() bis zur letzten gelesenen Zeile, denn SQLite
+# arbeitet SELECTs erst beim Holen der Zeilen ab. Der Name einer Abfrage
+# stammt aus dem Registry-Kommentar (/* tools.details */, siehe
+# app/models/queries.py), sonst aus der Aufrufstelle (Modul.Funktion:Zeile).
+# Die Werte gelten pro Prozess; langsame Abfragen landen samt Parametern in
+# logs/slow_queries.log.
+
+# Funktionen, die SQL nur weiterreichen: benannt wird nach ihrem Aufrufer
+PASSTHROUGH = {
+    ('app.models.database', 'query'),
+}
+
+# Längere Parameterlisten werden im Slow-Log gekürzt
+MAX_LOGGED_PARAMS = 500
+
+# RLock: __del__ eines Cursors kann während record() im selben Thread laufen
+_lock = threading.RLock()
+_stats = {}
+_site_names = {}
+_started = time.time()
+_own_globals = globals()
+
+class QueryStat:
+    """Zähler einer Abfrage (Zeiten in Sekunden)"""
+
+    __slots__ = ('name', 'sql', 'calls', 'errors', 'rows', 'total', 'max', 'samples')
+
+    def __init__(self, name, sql, samples):
+        self.name = name
+        self.sql = sql
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        # Letzte Laufzeiten für das p95
+        self.samples = collections.deque(maxlen=samples)
+
+    def as_dict(self):
+        ordered = sorted(self.samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0.0
+        return {
+            'name': self.name,
+            'sql': self.sql,
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total * 1000 / self.calls, 3) if self.calls else 0.0,
+            'p95_ms': round(p95 * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+def query_name(sql):
+    """Name aus dem Registry-Kommentar am Anfang des SQL, sonst None"""
+    if sql.startswith('/* '):
+        end = sql.find(' */', 3)
+        if end > 0:
+            return sql[3:end]
+    return None
+
+def _call_site():
+    """Modul.Funktion:Zeile des ersten Aufrufers außerhalb der Weiterreicher"""
+    frame = sys._getframe(3)
+    # Eigene Frames (Cursor/Connection) ohne Nachschlagen überspringen
+    while frame is not None and frame.f_globals is _own_globals:
+        frame = frame.f_back
+    while frame is not None:
+        code = frame.f_code
+        key = (id(code), frame.f_lineno)
+        name = _site_names.get(key)
+        if name is not None:
+            return name
+        module = frame.f_globals.get('__name__', '?')
+        if (module, code.co_name) not in PASSTHROUGH:
+            name = f'{module}.{code.co_name}:{frame.f_lineno}'
+            _site_names[key] = name
+            return name
+        frame = frame.f_back
+    return '?'
+
+def record(name, sql, elapsed, rows, params, error, slow_ms, samples):
+    """Verbucht eine abgeschlossene Abfrage (error ist die Exception oder None)"""
+    metrics.observe_query(name, elapsed, error)
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = QueryStat(name, ' '.join(sql.split()), samples)
+        stat.calls += 1
+        stat.rows += rows
+        stat.total += elapsed
+        stat.samples.append(elapsed)
+        if elapsed > stat.max:
+            stat.max = elapsed
+        if error is not None:
+            stat.errors += 1
+
+    if slow_ms and elapsed * 1000 >= slow_ms:
+        logged = repr(params)
+        if len(logged) > MAX_LOGGED_PARAMS:
+            logged = logged[:MAX_LOGGED_PARAMS] + '...'
+        loggers['slow_queries'].warning(
+            f"{name} - {elapsed * 1000:.1f} ms - Zeilen: {rows} - "
+            f"SQL: {' '.join(sql.split())} - Parameter: {logged}"
+        )
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor, der Laufzeit und Zeilen der laufenden Abfrage mitschreibt"""
+
+    _name = None
+    _sql = None
+    _params = None
+    _elapsed = 0.0
+    _rows = 0
+
+    def _begin(self, sql, params):
+        self._finish()
+        self._name = query_name(sql) or _call_site()
+        self._sql = sql
+        self._params = params
+        self._elapsed = 0.0
+        self._rows = 0
+
+    def _finish(self, error=None):
+        if self._name is None:
+            return
+        settings = self.connection.stats_settings
+        record(self._name, self._sql, self._elapsed, self._rows, self._params,
+               error, *settings)
+        self._name = None
+        self._params = None
+
+    def _run(self, method, sql, params):
+        self._begin(sql, params)
+        start = time.perf_counter()
+        try:
+            method(sql, params)
+        except Exception as e:
+            self._elapsed += time.perf_counter() - start
+            self._finish(error=e)
+            raise
+        self._elapsed += time.perf_counter() - start
+        if self.rowcount >= 0:
+            # INSERT/UPDATE/DELETE: fertig, Zeilen = betroffene Zeilen
+            self._rows = self.rowcount
+            self._finish()
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._elapsed += time.perf_counter() - start
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._elapsed += time.perf_counter() - start
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._elapsed += time.perf_counter() - start
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._elapsed += time.perf_counter() - start
+            self._finish()
+            raise
+        self._elapsed += time.perf_counter() - start
+        self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # Abfragen, deren Ergebnis nicht vollständig gelesen wurde (fetchone)
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Verbindung, deren Cursor Abfragen in die Statistik schreiben"""
+
+    # (Schwelle für das Slow-Log in ms, Anzahl Laufzeiten für das p95)
+    stats_settings = (0, 1000)
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute ruft den Cursor intern direkt auf, daher hier umleiten
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+@functools.lru_cache(maxsize=None)
+def connection_factory(slow_ms, samples):
+    """Connection-Klasse mit den gegebenen Einstellungen (gleiche Klasse für gleiche Werte)"""
+    return type('InstrumentedConnection', (InstrumentedConnection,),
+                {'stats_settings': (slow_ms, samples)})
+
+def snapshot(sort='total_ms', limit=None):
+    """Statistik aller Abfragen als Liste von Dicts, absteigend sortiert"""
+    with _lock:
+        entries = [stat.as_dict() for stat in _stats.values()]
+    entries.sort(key=lambda entry: entry.get(sort, 0), reverse=True)
+    return entries[:limit] if limit else entries
+
+def reset():
+    """Setzt die Statistik dieses Prozesses zurück"""
+    global _started
+    with _lock:
+        _stats.clear()
+        _started = time.time()
+
+def info():
+    return {'pid': os.getpid(), 'since': _started}
@@ -0,0 +1,73 @@
+import threading
+import time
+from app.models.database import Database
+from app.utils import metrics
+
+# Prozesslokaler Cache für Einstellungen und Zähler, die in jedem Template
+# gebraucht werden. Schreibpfade rufen invalidate() in ihrer Transaktion und
+# nach dem Commit clear() auf (vorher könnte ein paralleler Request den alten
+# Stand erneut cachen); andere Gunicorn-Worker erkennen die Änderung am
+# Versionsstempel 'cache_version' in der settings-Tabelle.
+
+_lock = threading.Lock()
+_values = {}
+_version = None
+_generation = 0
+_checked_at = None
+
+def _check_version():
+    """Verwirft den Cache, wenn ein anderer Worker ihn invalidiert hat"""
+    global _version, _generation, _checked_at
+    now = time.monotonic()
+    interval = Database.get_setting('CACHE_VERSION_CHECK_INTERVAL')
+    if _checked_at is not None and now - _checked_at < interval:
+        return
+
+    row = Database.get_db().execute(
+        "SELECT value FROM settings WHERE key = 'cache_version'"
+    ).fetchone()
+    version = row[0] if row else '0'
+
+    with _lock:
+        if version != _version:
+            _values.clear()
+            _generation += 1
+            _version = version
+        _checked_at = now
+
+def get(key, loader):
+    """Liefert einen gecachten Wert oder lädt ihn über loader()"""
+    _check_version()
+    with _lock:
+        if key in _values:
+            hit = True
+            value = _values[key]
+        else:
+            hit = False
+            generation = _generation
+    metrics.cache_access(f'settings.{key}', hit)
+    if hit:
+        return value
+
+    value = loader()
+
+    with _lock:
+        # Während des Ladens invalidiert? Dann den alten Wert nicht merken
+        if generation == _generation:
+            _values[key] = value
+    return value
+
+def clear():
+    """Leert den Cache dieses Prozesses"""
+    global _generation, _checked_at
+    with _lock:
+        _values.clear()
+        _generation += 1
+        _checked_at = None
+
+def invalidate(conn):
+    """Erhöht den Versionsstempel (ohne Commit), danach committen und clear() aufrufen"""
+    conn.execute("""
+        INSERT INTO settings (key, value) VALUES ('cache_version', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+    """)
@@ -0,0 +1,201 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+# Server-Sessions in einer eigenen SQLite-Datei (WAL) statt als Einzeldateien
+# in flask_session/. Eine Anfrage kostet einen Zugriff über den Primärschlüssel;
+# geschrieben wird nur, wenn sich die Session geändert hat oder ihre Laufzeit
+# zur Hälfte abgelaufen ist. Leere Sessions (nicht angemeldet) landen gar
+# nicht in der Datenbank. Abgelaufene Einträge entfernt ein Hintergrund-Thread
+# pro Prozess, zusätzlich "flask sweep-sessions".
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        expires_at INTEGER NOT NULL
+    ) WITHOUT ROWID
+'''
+
+CREATE_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)
+'''
+
+class SqliteSession(CallbackDict, SessionMixin):
+    """Session-Daten mit Änderungsverfolgung"""
+
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.modified = False
+
+class SqliteSessionStore:
+    """Zugriff auf die Session-Tabelle (eine Verbindung pro Thread)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._pid = None
+        self._sweeper = None
+        self._lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute(CREATE_TABLE_SQL)
+            conn.execute(CREATE_INDEX_SQL)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def load(self, sid, now):
+        row = self.connection().execute(
+            'SELECT data, expires_at FROM sessions WHERE id = ? AND expires_at > ?',
+            (sid, now)
+        ).fetchone()
+        return row
+
+    def save(self, sid, data, expires_at):
+        self.connection().execute('''
+            INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at
+        ''', (sid, data, expires_at))
+
+    def count(self, now=None):
+        """Anzahl nicht abgelaufener Sessions"""
+        return self.connection().execute(
+            'SELECT COUNT(*) FROM sessions WHERE expires_at > ?', (int(now or time.time()),)
+        ).fetchone()[0]
+
+    def delete(self, sid):
+        self.connection().execute('DELETE FROM sessions WHERE id = ?', (sid,))
+
+    def sweep(self, now=None, batch_size=1000):
+        """Löscht abgelaufene Sessions in kleinen Blöcken, liefert die Anzahl"""
+        now = int(now or time.time())
+        conn = self.connection()
+        removed = 0
+        while True:
+            cursor = conn.execute('''
+                DELETE FROM sessions WHERE id IN (
+                    SELECT id FROM sessions WHERE expires_at <= ? LIMIT ?
+                )
+            ''', (now, batch_size))
+            removed += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return removed
+
+    def start_sweeper(self, interval):
+        """Startet den Aufräum-Thread (einmal pro Prozess, auch nach fork)"""
+        if self._pid == os.getpid() or not interval:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+
+            def run():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.sweep()
+                    except sqlite3.Error:
+                        # Nächster Versuch im nächsten Intervall
+                        pass
+
+            self._sweeper = threading.Thread(target=run, name='session-sweeper', daemon=True)
+            self._sweeper.start()
+            self._pid = os.getpid()
+
+class SqliteSessionInterface(SessionInterface):
+    """Flask-SessionInterface für SqliteSessionStore"""
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, sweep_interval=300):
+        self.store = store
+        self.sweep_interval = sweep_interval
+
+    def _lifetime(self, app):
+        return int(app.permanent_session_lifetime.total_seconds())
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self.store.load(sid, int(time.time()))
+            if row:
+                return SqliteSession(self.serializer.loads(row[0]), sid=sid, expires_at=row[1])
+        return SqliteSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.sid and session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = int(time.time())
+        lifetime = self._lifetime(app)
+        # Laufzeit nur verlängern, wenn mehr als die Hälfte verstrichen ist
+        refresh = session.expires_at is None or session.expires_at - now < lifetime // 2
+        if not session.modified and not refresh:
+            return
+
+        if not session.sid:
+            session.sid = secrets.token_urlsafe(32)
+        session.expires_at = now + lifetime
+        self.store.save(session.sid, self.serializer.dumps(dict(session)), session.expires_at)
+        self.store.start_sweeper(self.sweep_interval)
+
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+def sessions_path(app):
+    """Pfad der Session-Datenbank (Standard: neben inventory.db)"""
+    from app.models.database import Database
+
+    return app.config.get('SESSION_DB_PATH') or os.path.join(
+        os.path.dirname(Database.get_database_path()), 'sessions.db'
+    )
+
+def init_app(app):
+    """Wählt das Session-Backend nach SESSION_BACKEND (sqlite, cookie, filesystem)"""
+    from app.models.database import Database
+
+    backend = app.config.get('SESSION_BACKEND') or Database.get_setting('SESSION_BACKEND')
+    if backend == 'sqlite':
+        store = SqliteSessionStore(sessions_path(app))
+        app.session_interface = SqliteSessionInterface(
+            store, app.config.get('SESSION_SWEEP_INTERVAL', Database.get_setting('SESSION_SWEEP_INTERVAL'))
+        )
+    elif backend == 'filesystem':
+        # Früheres Verhalten (Flask-Session, eine Datei pro Session)
+        from flask_session import Session
+
+        app.config['SESSION_TYPE'] = 'filesystem'
+        Session(app)
+    elif backend != 'cookie':
+        raise ValueError(f'Unbekanntes Session-Backend: {backend}')
+    # 'cookie': Flask-Standard (signiertes Cookie, nichts auf dem Server)
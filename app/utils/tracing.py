@@ -0,0 +1,144 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import g, request
+from app.models.database import Database
+
+# Optionales Request-Tracing für Blueprints (ersetzt die früheren print-Dumps
+# in app/routes/api.py). Ob und wie oft getraced wird, steuern die
+# TRACING_*-Einstellungen in app/config.py. Die Einträge gehen als JSON-Zeilen
+# über eine Queue an einen Hintergrund-Thread, der Request wartet also nie
+# auf die Festplatte. Ist die Queue voll, werden Einträge verworfen.
+
+# Header, deren Inhalt nie im Trace landen darf
+REDACTED_HEADERS = {'cookie', 'authorization', 'set-cookie'}
+
+logger = logging.getLogger('scandy.trace')
+logger.propagate = False
+
+_lock = threading.Lock()
+_handler = None
+_listener = None
+_pid = None
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler, der bei voller Queue verwirft statt zu blockieren"""
+
+    def __init__(self, queue_):
+        super().__init__(queue_)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Nachricht ist bereits fertiges JSON, kein Formatieren nötig
+        return record
+
+def _start_listener():
+    """Startet den Schreib-Thread (einmal pro Prozess, auch nach fork)"""
+    if _pid == os.getpid():
+        return
+    with _lock:
+        if _pid == os.getpid():
+            return
+        _create_listener()
+
+def _create_listener():
+    global _handler, _listener, _pid
+    if _handler is not None:
+        logger.removeHandler(_handler)
+
+    log_file = Database.get_setting('TRACING_LOG_FILE')
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+    file_handler = RotatingFileHandler(log_file, maxBytes=5 * 1024 * 1024,
+                                       backupCount=3, delay=True)
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+
+    _handler = DroppingQueueHandler(queue.Queue(Database.get_setting('TRACING_QUEUE_SIZE')))
+    _listener = QueueListener(_handler.queue, file_handler)
+    _listener.start()
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    _pid = os.getpid()
+    atexit.register(stop)
+
+def stop():
+    """Schreibt ausstehende Einträge und beendet den Schreib-Thread"""
+    global _listener, _pid
+    if _listener is not None and _pid == os.getpid():
+        _listener.stop()
+    _listener = None
+    _pid = None
+
+def dropped_count():
+    return _handler.dropped if _handler else 0
+
+def _sample_rate(endpoint):
+    rates = Database.get_setting('TRACING_ENDPOINT_SAMPLE_RATES')
+    return rates.get(endpoint, Database.get_setting('TRACING_SAMPLE_RATE'))
+
+def _headers(headers):
+    return {key: ('***' if key.lower() in REDACTED_HEADERS else value)
+            for key, value in headers.items()}
+
+def _capped_body(length, read):
+    """Liest einen Body nur, wenn er unter der Größengrenze liegt"""
+    limit = Database.get_setting('TRACING_MAX_BODY_BYTES')
+    if not length:
+        return None
+    if length > limit:
+        return f'<{length} Bytes, nicht aufgezeichnet>'
+    return read()[:limit].decode('utf-8', errors='replace')
+
+def before_request():
+    """Entscheidet pro Request, ob er aufgezeichnet wird"""
+    if not Database.get_setting('TRACING_ENABLED'):
+        return
+    if random.random() < _sample_rate(request.endpoint):
+        g.trace_started = time.perf_counter()
+
+def after_request(response):
+    """Schreibt den Trace eines ausgewählten Requests in die Queue"""
+    started = g.pop('trace_started', None)
+    if started is None:
+        return response
+
+    # Gestreamte Antworten nicht anfassen, sonst würden sie hier materialisiert
+    if response.is_streamed or response.direct_passthrough:
+        response_body = '<Stream>'
+    else:
+        response_body = _capped_body(response.content_length, response.get_data)
+
+    entry = {
+        'ts': datetime.now().isoformat(timespec='milliseconds'),
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'url': request.full_path.rstrip('?'),
+        'status': response.status_code,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        'request_headers': _headers(request.headers),
+        'request_body': _capped_body(request.content_length,
+                                     lambda: request.get_data(cache=True)),
+        'response_headers': _headers(response.headers),
+        'response_body': response_body,
+    }
+
+    _start_listener()
+    logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+    return response
+
+def init_blueprint(bp):
+    """Hängt das Tracing an alle Requests eines Blueprints"""
+    bp.before_request(before_request)
+    bp.after_request(after_request)
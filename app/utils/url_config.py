@@ -9,9 +9,9 @@ def get_urls():
         'dashboard': 'admin.dashboard',
         
         # Inventory URLs
-        'workers': 'inventory.workers',
+        'workers': 'workers.index',
         'tools': 'inventory.tools',
-        'consumables': 'inventory.consumables',
+        'consumables': 'consumables.index',
         'worker_details': 'inventory.worker_details',
         'tool_details': 'inventory.tool_details',
         'consumable_details': 'inventory.consumable_details',
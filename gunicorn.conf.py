@@ -1,4 +1,14 @@
 wsgi_app = 'wsgi:application'
 workers = 4
-threads = 2
-timeout = 120 
\ No newline at end of file
+# Live-Streams (/api/events) belegen je einen Thread, siehe SSE_MAX_STREAMS
+threads = 8
+timeout = 120
+
+# App einmal im Master laden, Worker entstehen per fork (schneller Start und
+# Neustart). Datenbank- und Session-Verbindungen sind prozesslokal.
+preload_app = True
+
+def on_starting(server):
+    # Metrik-Dateien eines früheren Laufs verwerfen (Zähler beginnen bei 0)
+    from app.utils import metrics
+    metrics.clear_directory()
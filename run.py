@@ -1,8 +1,5 @@
-from flask import Flask, redirect, url_for
-from app.models.database import Database, init_db
-from app.utils.structure_viewer import print_database_structure, print_app_structure
-from app.utils.context_processors import register_context_processors
-from app.utils.db_schema import SchemaManager
+from app.models.database import Database
+import argparse
 import logging
 import os
 from datetime import timedelta
@@ -16,6 +13,11 @@ logger.setLevel(logging.INFO)
 app = create_app()  # Nutze die create_app Funktion aus __init__.py
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scandy Entwicklungsserver')
+    parser.add_argument('--structure', action='store_true',
+                        help='Datenbank- und App-Struktur beim Start ausgeben')
+    args = parser.parse_args()
+
     # Logging-Handler hinzufügen
     handler = logging.StreamHandler()
     handler.setLevel(logging.INFO)
@@ -37,12 +39,15 @@ if __name__ == "__main__":
             from app.create_test_data import create_test_data
             create_test_data()
         
-        # Debug-Informationen immer ausgeben
-        logger.info("Drucke Datenbank-Struktur...")
-        print_database_structure()
-        
-        logger.info("Drucke App-Struktur...")
-        print_app_structure()
+        # Debug-Informationen nur auf Wunsch (zählt jede Tabelle)
+        if args.structure:
+            from app.utils.structure_viewer import print_database_structure, print_app_structure
+
+            logger.info("Drucke Datenbank-Struktur...")
+            print_database_structure()
+
+            logger.info("Drucke App-Struktur...")
+            print_app_structure()
     
     logger.info("Starte Entwicklungsserver...")
     app.run(debug=False, host='127.0.0.1', port=5000)
@@ -0,0 +1,142 @@
+"""Lasttest für den Datenbank-Verbindungspool
+
+Feuert parallel GET /tools/ und POST /admin/process_lending (+ Rückgabe)
+gegen eine Wegwerf-Datenbank und gibt p50/p99 pro Endpunkt aus – einmal
+im alten Modus (Verbindung pro Anfrage, Rollback-Journal) und einmal mit
+Pool und WAL-Profil.
+
+Aufruf:
+    python scripts/benchmark_db_pool.py [--threads 8] [--requests 200] [--lendings 50000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+def seed_database(tools=2000, workers=200, lendings=50000):
+    """Legt eine frische Datenbank mit realistischer Historie an"""
+    from app.models.database import Database
+    from app.models import current_lending
+
+    Database.init_db()
+    conn = Database.get_db_connection()
+    conn.executemany('''
+        INSERT INTO workers (barcode, firstname, lastname, department)
+        VALUES (?, ?, ?, ?)
+    ''', [(f'W{i:06d}', f'Vorname{i}', f'Nachname{i}', 'Technik') for i in range(workers)])
+    conn.executemany('''
+        INSERT INTO tools (barcode, name, status, location, category)
+        VALUES (?, ?, 'Verfügbar', ?, ?)
+    ''', [(f'T{i:06d}', f'Werkzeug {i}', f'Lager {i % 10}', 'Handwerkzeug') for i in range(tools)])
+    conn.executemany('''
+        INSERT INTO lendings (tool_barcode, worker_barcode, lent_at, returned_at)
+        VALUES (?, ?, datetime('now', ?), datetime('now', ?))
+    ''', [(f'T{random.randrange(tools):06d}', f'W{random.randrange(workers):06d}',
+           f'-{i + 2} hours', f'-{i + 1} hours') for i in range(lendings)])
+    conn.commit()
+    current_lending.rebuild(conn)
+    conn.close()
+
+def percentile(values, pct):
+    """Einfaches Perzentil (nearest rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+def run(app, threads, requests_per_thread):
+    """Startet Leser- und Schreiber-Threads und sammelt Latenzen in ms"""
+    timings = {'GET /tools/': [], 'POST /admin/process_lending': []}
+    lock = threading.Lock()
+    errors = []
+
+    def reader():
+        client = app.test_client()
+        local = []
+        for _ in range(requests_per_thread):
+            start = time.perf_counter()
+            response = client.get('/tools/')
+            local.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors.append(f'/tools/ -> {response.status_code}')
+        with lock:
+            timings['GET /tools/'].extend(local)
+
+    def writer(offset):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['is_admin'] = True
+        local = []
+        for i in range(requests_per_thread):
+            barcode = f'T{offset * requests_per_thread + i:06d}'
+            start = time.perf_counter()
+            response = client.post('/admin/process_lending', json={
+                'item_type': 'tool',
+                'item_barcode': barcode,
+                'worker_barcode': 'W000001'
+            })
+            local.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors.append(f'process_lending {barcode} -> {response.status_code}')
+            client.post('/admin/process_return', json={'item_barcode': barcode})
+        with lock:
+            timings['POST /admin/process_lending'].extend(local)
+
+    workers = []
+    for i in range(threads):
+        if i % 2:
+            workers.append(threading.Thread(target=writer, args=(i // 2,)))
+        else:
+            workers.append(threading.Thread(target=reader))
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return timings, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--lendings', type=int, default=50000)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='scandy-bench-')
+    os.environ['SCANDY_DB_PATH'] = os.path.join(tmpdir, 'inventory.db')
+
+    from app import create_app
+    from app.models.db_pool import reset_pool
+
+    writers = args.threads // 2 or 1
+    modes = [
+        ('vorher (ohne Pool, legacy)', {'DB_POOL_SIZE': 0, 'DB_PRAGMA_PROFILE': 'legacy'}),
+        ('nachher (Pool, WAL)', {'DB_POOL_SIZE': 4, 'DB_PRAGMA_PROFILE': 'wal'}),
+    ]
+    for label, overrides in modes:
+        reset_pool()
+        app = create_app({'TESTING': True, **overrides})
+        # Im App-Kontext anlegen, damit das Journal-Profil des Modus gilt
+        with app.app_context():
+            seed_database(tools=max(2000, writers * args.requests), lendings=args.lendings)
+        timings, errors = run(app, args.threads, args.requests)
+
+        print(f"\n{label}")
+        print('-' * len(label))
+        for endpoint, values in timings.items():
+            print(f"{endpoint:32s} n={len(values):5d}  "
+                  f"p50={percentile(values, 50):8.2f} ms  "
+                  f"p99={percentile(values, 99):8.2f} ms  "
+                  f"mean={statistics.mean(values) if values else 0:8.2f} ms")
+        if errors:
+            print(f"Fehler: {len(errors)} (z.B. {errors[0]})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Vergleich der Session-Backends
+
+Ruft GET /tools/ als angemeldeter Admin wiederholt auf (mehrere Threads) und
+gibt p50/p99 pro Backend aus: Dateisystem (Flask-Session, früheres
+Verhalten), SQLite (app/utils/sqlite_session.py) und signiertes Cookie.
+Zusätzlich wird die Anzahl der Session-Dateien bzw. -Zeilen nach dem Lauf
+ausgegeben (anonyme Anfragen dürfen beim SQLite-Backend nichts anlegen).
+
+Aufruf:
+    python scripts/benchmark_sessions.py [--threads 4] [--requests 300] [--anonymous 200]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+def seed_database(tools=500):
+    """Legt eine frische Datenbank mit einigen Werkzeugen an"""
+    from app.models.database import Database
+
+    Database.init_db()
+    conn = Database.get_db_connection()
+    conn.executemany('''
+        INSERT INTO tools (barcode, name, status, location, category)
+        VALUES (?, ?, 'Verfügbar', ?, ?)
+    ''', [(f'T{i:06d}', f'Werkzeug {i}', f'Lager {i % 10}', 'Handwerkzeug') for i in range(tools)])
+    conn.commit()
+    conn.close()
+
+def percentile(values, pct):
+    """Einfaches Perzentil (nearest rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+def run(app, threads, requests_per_thread, anonymous):
+    """Angemeldete Threads plus anonyme Aufrufe, liefert Latenzen in ms"""
+    timings = []
+    errors = []
+    lock = threading.Lock()
+
+    def client_thread():
+        client = app.test_client()
+        # Anmeldung wie /auth/login (Session wird dabei gespeichert)
+        with client.session_transaction() as sess:
+            sess['is_admin'] = True
+            sess['user_id'] = 'admin'
+        local = []
+        for _ in range(requests_per_thread):
+            start = time.perf_counter()
+            response = client.get('/tools/')
+            local.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        with lock:
+            timings.extend(local)
+
+    workers = [threading.Thread(target=client_thread) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+    # Anonyme Aufrufe (z.B. Scanner ohne Login) mit jeweils neuem Client
+    for _ in range(anonymous):
+        app.test_client().get('/tools/')
+    return timings, errors
+
+def stored_sessions(backend, session_dir, sessions_db):
+    if backend == 'filesystem':
+        return len(os.listdir(session_dir)) if os.path.isdir(session_dir) else 0
+    if backend == 'sqlite':
+        conn = sqlite3.connect(sessions_db)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        finally:
+            conn.close()
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--anonymous', type=int, default=200)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='scandy-sessions-')
+    os.environ['SCANDY_DB_PATH'] = os.path.join(tmpdir, 'inventory.db')
+
+    from app import create_app
+    from app.models.db_pool import reset_pool
+
+    for backend in ('filesystem', 'sqlite', 'cookie'):
+        session_dir = os.path.join(tmpdir, f'flask_session_{backend}')
+        sessions_db = os.path.join(tmpdir, f'sessions_{backend}.db')
+        reset_pool()
+        try:
+            app = create_app({
+                'TESTING': True,
+                'SESSION_BACKEND': backend,
+                'SESSION_FILE_DIR': session_dir,
+                'SESSION_DB_PATH': sessions_db,
+            })
+        except ImportError as e:
+            print(f"\n{backend}: übersprungen ({e})")
+            continue
+        with app.app_context():
+            seed_database()
+
+        timings, errors = run(app, args.threads, args.requests, args.anonymous)
+        print(f"\n{backend}")
+        print('-' * len(backend))
+        print(f"GET /tools/  n={len(timings):5d}  "
+              f"p50={percentile(timings, 50):8.2f} ms  "
+              f"p99={percentile(timings, 99):8.2f} ms  "
+              f"mean={statistics.mean(timings) if timings else 0:8.2f} ms")
+        print(f"Gespeicherte Sessions: {stored_sessions(backend, session_dir, sessions_db)}")
+        if errors:
+            print(f"Fehler: {len(errors)} (z.B. Status {errors[0]})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Startzeit der App messen (Import und create_app)
+
+Startet für jede Messung einen frischen Python-Prozess, der wie ein
+Gunicorn-Worker "from app import create_app; create_app()" ausführt, und
+gibt Median/Maximum aus. Mit --importtime wird zusätzlich ein Lauf mit
+"python -X importtime" ausgewertet (teuerste Module nach kumulierter und
+eigener Zeit), mit --output landet der Rohbericht in einer Datei.
+
+Budget-Prüfung: mit --budget-ms endet das Skript mit Exit-Code 1, wenn der
+Median darüber liegt oder beim Start eine der schweren Bibliotheken
+(pandas, numpy, PIL, reportlab, openpyxl, python-barcode) geladen wurde.
+Diese dürfen erst in der Funktion importiert werden, die sie braucht.
+
+Referenzmessung zum Vergleich: benchmarks/startup_baseline.txt, Rohbericht
+benchmarks/startup_importtime.txt (mit den dort genannten Parametern erzeugt).
+
+Aufruf:
+    python scripts/benchmark_startup.py [--runs 10] [--importtime] [--top 25]
+                                        [--output importtime.txt] [--budget-ms 1000]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Werden nur von Export, Import, Etiketten und Farbanalyse gebraucht
+HEAVY_MODULES = ('pandas', 'numpy', 'PIL', 'reportlab', 'openpyxl', 'barcode')
+
+# Läuft im Kindprozess, liefert die Messwerte als JSON
+CHILD_CODE = '''
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+created = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'total_ms': (created - started) * 1000,
+    'heavy': sorted(m for m in %r if m in sys.modules),
+}))
+''' % (HEAVY_MODULES,)
+
+def child_env(tmpdir):
+    env = dict(os.environ)
+    env['SCANDY_DB_PATH'] = os.path.join(tmpdir, 'inventory.db')
+    env['PYTHONPATH'] = project_root + os.pathsep + env.get('PYTHONPATH', '')
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    return env
+
+def measure(env):
+    """Ein frischer Prozess, Messwerte in ms"""
+    result = subprocess.run([sys.executable, '-c', CHILD_CODE], cwd=project_root, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def importtime_report(env):
+    """Rohbericht von -X importtime (stderr des Kindprozesses)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD_CODE],
+                            cwd=project_root, env=env, capture_output=True, text=True, check=True)
+    return result.stderr
+
+def parse_importtime(report):
+    """Zeilen 'import time: self | cumulative | name' als (self, cumulative, name) in ms"""
+    entries = []
+    for line in report.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        entries.append((int(self_us) / 1000, int(cumulative_us) / 1000, name.rstrip()))
+    return entries
+
+def print_top(entries, top):
+    # Nur Pakete der obersten Ebene bei der kumulierten Zeit (sonst doppelt gezählt)
+    roots = [e for e in entries if not e[2].startswith('  ')]
+    print(f"\nTeuerste Importe (kumuliert, oberste Ebene, Top {top})")
+    for self_ms, cumulative_ms, name in sorted(roots, key=lambda e: -e[1])[:top]:
+        print(f"  {cumulative_ms:9.1f} ms  {name.strip()}")
+    print(f"\nTeuerste Module (eigene Zeit, Top {top})")
+    for self_ms, cumulative_ms, name in sorted(entries, key=lambda e: -e[0])[:top]:
+        print(f"  {self_ms:9.1f} ms  {name.strip()}")
+    print(f"\nSumme eigene Importzeit: {sum(e[0] for e in entries):.1f} ms "
+          f"({len(entries)} Module)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--importtime', action='store_true', help='-X importtime auswerten')
+    parser.add_argument('--top', type=int, default=25)
+    parser.add_argument('--output', help='Rohbericht von -X importtime speichern')
+    parser.add_argument('--budget-ms', type=float, help='Obergrenze für den Median')
+    args = parser.parse_args()
+
+    env = child_env(tempfile.mkdtemp(prefix='scandy-startup-'))
+
+    # Erster Lauf schreibt die .pyc-Dateien und zählt nicht mit
+    measure(env)
+    runs = [measure(env) for _ in range(args.runs)]
+    totals = [run['total_ms'] for run in runs]
+    print(f"Start ({args.runs} Prozesse)")
+    print(f"  Import     median={statistics.median(r['import_ms'] for r in runs):8.1f} ms")
+    print(f"  create_app median={statistics.median(r['create_ms'] for r in runs):8.1f} ms")
+    print(f"  Gesamt     median={statistics.median(totals):8.1f} ms  max={max(totals):8.1f} ms")
+    heavy = sorted({m for run in runs for m in run['heavy']})
+    print(f"  Schwere Module beim Start: {', '.join(heavy) or 'keine'}")
+
+    if args.importtime or args.output:
+        report = importtime_report(env)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(report)
+            print(f"\nRohbericht gespeichert: {args.output}")
+        print_top(parse_importtime(report), args.top)
+
+    if args.budget_ms is not None:
+        failed = False
+        if statistics.median(totals) > args.budget_ms:
+            print(f"\nFEHLER: Median {statistics.median(totals):.1f} ms über dem Budget "
+                  f"von {args.budget_ms:.0f} ms")
+            failed = True
+        if heavy:
+            print(f"\nFEHLER: beim Start geladen: {', '.join(heavy)}")
+            failed = True
+        if failed:
+            sys.exit(1)
+        print(f"\nBudget eingehalten ({args.budget_ms:.0f} ms)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Stresstest für die Materialentnahme
+
+Lässt viele Threads (über POST /admin/process_lending) und optional mehrere
+Prozesse (direkt über consumable.withdraw) gleichzeitig Material desselben
+Artikels entnehmen, bis der Bestand aufgebraucht ist. Danach muss gelten:
+
+    Bestand >= 0
+    Anfangsbestand - Endbestand == Summe der Entnahmen in consumable_usages
+    Anzahl Entnahmen == Anzahl erfolgreicher Anfragen
+
+Aufruf:
+    python scripts/stress_consumable_stock.py [--threads 16] [--processes 4] [--requests 50] [--stock 500]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+CONSUMABLE = 'C000001'
+WORKER = 'W000001'
+
+def seed_database(stock):
+    """Legt Mitarbeiter und einen Artikel mit dem Anfangsbestand an"""
+    from app.models.database import Database
+
+    Database.init_db()
+    conn = Database.get_db_connection()
+    conn.execute('''
+        INSERT INTO workers (barcode, firstname, lastname, department)
+        VALUES (?, 'Max', 'Muster', 'Technik')
+    ''', (WORKER,))
+    conn.execute('''
+        INSERT INTO consumables (barcode, name, quantity, min_quantity, location, category)
+        VALUES (?, 'Schrauben M6', ?, 10, 'Lager 1', 'Kleinteile')
+    ''', (CONSUMABLE, stock))
+    conn.commit()
+    conn.close()
+
+def run_threads(app, threads, requests_per_thread, amount):
+    """Entnahmen über den HTTP-Endpunkt, liefert (Erfolge, Ablehnungen, Fehler)"""
+    counts = {'ok': 0, 'rejected': 0}
+    errors = []
+    lock = threading.Lock()
+
+    def client_thread():
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['is_admin'] = True
+        ok = rejected = 0
+        for _ in range(requests_per_thread):
+            response = client.post('/admin/process_lending', json={
+                'item_type': 'consumable',
+                'item_barcode': CONSUMABLE,
+                'worker_barcode': WORKER,
+                'amount': amount
+            })
+            if response.status_code == 200:
+                ok += 1
+            elif response.status_code == 400:
+                rejected += 1
+            else:
+                errors.append(f'process_lending -> {response.status_code}: {response.get_json()}')
+        with lock:
+            counts['ok'] += ok
+            counts['rejected'] += rejected
+
+    workers = [threading.Thread(target=client_thread) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return counts['ok'], counts['rejected'], errors
+
+def process_worker(args):
+    """Entnahmen direkt über withdraw() aus einem eigenen Prozess"""
+    requests, amount = args
+    from app.models.database import Database
+    from app.models.consumable import withdraw
+
+    conn = Database.get_db_connection()
+    conn.execute('PRAGMA busy_timeout = 30000')
+    ok = rejected = 0
+    for _ in range(requests):
+        result = withdraw(conn, CONSUMABLE, WORKER, amount)
+        conn.commit()
+        if result['success']:
+            ok += 1
+        else:
+            rejected += 1
+    conn.close()
+    return ok, rejected
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--stock', type=int, default=500)
+    parser.add_argument('--amount', type=int, default=1)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='scandy-stress-')
+    os.environ['SCANDY_DB_PATH'] = os.path.join(tmpdir, 'inventory.db')
+
+    from app import create_app
+    from app.models.database import Database
+
+    app = create_app({'TESTING': True})
+    with app.app_context():
+        seed_database(args.stock)
+
+    pool = None
+    process_results = []
+    if args.processes:
+        pool = multiprocessing.Pool(args.processes)
+        process_results = pool.map_async(
+            process_worker, [(args.requests, args.amount)] * args.processes
+        )
+
+    ok, rejected, errors = run_threads(app, args.threads, args.requests, args.amount)
+    if pool:
+        for p_ok, p_rejected in process_results.get():
+            ok += p_ok
+            rejected += p_rejected
+        pool.close()
+        pool.join()
+
+    conn = Database.get_db_connection()
+    final = conn.execute('SELECT quantity FROM consumables WHERE barcode = ?',
+                         (CONSUMABLE,)).fetchone()[0]
+    ledger_rows, ledger_sum = conn.execute('''
+        SELECT COUNT(*), COALESCE(SUM(quantity), 0)
+        FROM consumable_usages WHERE consumable_barcode = ?
+    ''', (CONSUMABLE,)).fetchone()
+    conn.close()
+
+    print(f"Anfragen:    {ok + rejected + len(errors)} (ok={ok}, abgelehnt={rejected}, Fehler={len(errors)})")
+    print(f"Bestand:     {args.stock} -> {final}")
+    print(f"Protokoll:   {ledger_rows} Entnahmen, Summe {ledger_sum}")
+
+    problems = list(errors[:5])
+    if final < 0:
+        problems.append(f'Bestand negativ: {final}')
+    if args.stock - final != ledger_sum:
+        problems.append(f'Bestandsabgang {args.stock - final} != Protokollsumme {ledger_sum}')
+    if ledger_rows != ok or ledger_sum != ok * args.amount:
+        problems.append(f'{ok} erfolgreiche Anfragen, aber {ledger_rows} Protokolleinträge')
+
+    if problems:
+        print('FEHLGESCHLAGEN:')
+        for problem in problems:
+            print(f'  {problem}')
+        sys.exit(1)
+    print('OK: Bestand und Entnahmeprotokoll stimmen überein')
+
+if __name__ == '__main__':
+    main()
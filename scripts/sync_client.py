@@ -0,0 +1,257 @@
+"""Sync-Client für Scan-Stationen und den Desktop-Client
+
+Hält eine lokale SQLite-Kopie der Mitarbeiter, Werkzeuge, Verbrauchs-
+materialien und offenen Ausleihen und gleicht sie über /api/sync ab: beim
+ersten Lauf einmal vollständig, danach nur noch die Änderungen seit der
+zuletzt gespeicherten Version. Die Station startet dadurch sofort mit
+ihrer Kopie und kann Barcodes auch bei kurzen Serverausfällen auflösen.
+Nur Standardbibliothek, damit die Stationen kein Flask brauchen.
+
+Aufruf:
+    python scripts/sync_client.py --server http://scandy:5000 --token GEHEIM [--db station.db]
+    python scripts/sync_client.py --server ... --watch 30       # dauerhaft alle 30 s
+    python scripts/sync_client.py --db station.db --lookup 12345  # Barcode aus der Kopie
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+logger = logging.getLogger('sync_client')
+
+# Entitätstyp -> (Tabelle der Kopie, Schlüssel, Spaltendefinitionen)
+TABLES = {
+    'worker': ('workers', 'barcode', {
+        'barcode': 'TEXT PRIMARY KEY',
+        'firstname': 'TEXT',
+        'lastname': 'TEXT',
+        'department': 'TEXT',
+    }),
+    'tool': ('tools', 'barcode', {
+        'barcode': 'TEXT PRIMARY KEY',
+        'name': 'TEXT',
+        'status': 'TEXT',
+        'category': 'TEXT',
+        'location': 'TEXT',
+    }),
+    'consumable': ('consumables', 'barcode', {
+        'barcode': 'TEXT PRIMARY KEY',
+        'name': 'TEXT',
+        'quantity': 'INTEGER',
+        'min_quantity': 'INTEGER',
+        'category': 'TEXT',
+        'location': 'TEXT',
+    }),
+    'lending': ('lendings', 'id', {
+        'id': 'INTEGER PRIMARY KEY',
+        'tool_barcode': 'TEXT',
+        'worker_barcode': 'TEXT',
+        'lent_at': 'TIMESTAMP',
+    }),
+}
+
+class SyncError(Exception):
+    """Server nicht erreichbar oder Antwort unbrauchbar"""
+
+class SyncClient:
+    """Lokale Kopie der Stammdaten mit Delta-Abgleich gegen den Server"""
+
+    def __init__(self, db_path, server=None, token=None, timeout=10.0):
+        self.server = server.rstrip('/') if server else None
+        self.token = token
+        self.timeout = timeout
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self._create_tables()
+
+    def _create_tables(self):
+        for table, _key, columns in TABLES.values():
+            definition = ', '.join(f'{name} {kind}' for name, kind in columns.items())
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({definition})')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_lendings_tool ON lendings (tool_barcode)')
+        self.conn.commit()
+
+    # Zustand
+
+    def _get_state(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_state(self, key, value):
+        self.conn.execute('''
+            INSERT INTO sync_state (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        ''', (key, str(value)))
+
+    @property
+    def version(self):
+        """Version (seq des Änderungsjournals), bis zu der die Kopie aktuell ist"""
+        return int(self._get_state('version', 0))
+
+    @property
+    def last_sync(self):
+        """Zeitpunkt des letzten erfolgreichen Abgleichs (Unix-Zeit) oder None"""
+        value = self._get_state('last_sync')
+        return float(value) if value else None
+
+    # Abgleich
+
+    def _fetch(self, version):
+        if not self.server:
+            raise SyncError('Kein Server angegeben')
+        url = f'{self.server}/api/sync?' + urllib.parse.urlencode({'version': version})
+        request = urllib.request.Request(url, headers={'Accept': 'application/json'})
+        if self.token:
+            request.add_header('Authorization', f'Bearer {self.token}')
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            raise SyncError(f'Server antwortet mit {e.code}') from e
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            raise SyncError(f'Server nicht erreichbar: {e}') from e
+
+    def _upsert(self, entity_type, rows):
+        table, key, columns = TABLES[entity_type]
+        for row in rows:
+            # Unbekannte Spalten neuerer Server ignorieren
+            names = [name for name in columns if name in row]
+            updates = ', '.join(f'{name} = excluded.{name}' for name in names if name != key)
+            self.conn.execute(f'''
+                INSERT INTO {table} ({', '.join(names)})
+                VALUES ({', '.join('?' * len(names))})
+                ON CONFLICT({key}) DO UPDATE SET {updates}
+            ''', [row[name] for name in names])
+
+    def _apply(self, page):
+        """Schreibt eine Antwortseite samt neuer Version in einer Transaktion"""
+        try:
+            if page['full']:
+                for table, _key, _columns in TABLES.values():
+                    self.conn.execute(f'DELETE FROM {table}')
+            for entity_type, rows in page['upserts'].items():
+                if entity_type in TABLES:
+                    self._upsert(entity_type, rows)
+            for entity_type, keys in page['deletes'].items():
+                if entity_type in TABLES and keys:
+                    table, key, _columns = TABLES[entity_type]
+                    self.conn.executemany(f'DELETE FROM {table} WHERE {key} = ?',
+                                          [(value,) for value in keys])
+            self._set_state('version', page['version'])
+            self._set_state('last_sync', time.time())
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return sum(len(rows) for rows in page['upserts'].values()) + \
+            sum(len(keys) for keys in page['deletes'].values())
+
+    def sync(self):
+        """Holt alle Änderungen seit der gespeicherten Version, liefert die Anzahl"""
+        applied = 0
+        version = self.version
+        while True:
+            page = self._fetch(version)
+            if not page.get('success'):
+                raise SyncError(page.get('message', 'Unbekannter Fehler'))
+            if page['reset']:
+                # Server kann den Stand nicht fortsetzen: vollständig neu laden
+                logger.warning('Version %s nicht mehr fortsetzbar, lade vollständig neu', version)
+                version = 0
+                continue
+            applied += self._apply(page)
+            version = page['version']
+            if not page['has_more']:
+                return applied
+
+    def watch(self, interval=30.0, max_backoff=300.0):
+        """Gleicht dauerhaft ab; bei Serverausfall mit wachsender Wartezeit weiter"""
+        delay = interval
+        while True:
+            try:
+                applied = self.sync()
+                if applied:
+                    logger.info('%s Änderungen übernommen (Version %s)', applied, self.version)
+                delay = interval
+            except SyncError as e:
+                logger.warning('%s - arbeite mit lokaler Kopie (Version %s)', e, self.version)
+                delay = min(delay * 2, max_backoff)
+            time.sleep(delay)
+
+    # Lesen aus der Kopie
+
+    def lookup(self, barcode):
+        """Ordnet einen Barcode zu: {'type': ..., 'data': {...}} oder None"""
+        worker = self.conn.execute('SELECT * FROM workers WHERE barcode = ?', (barcode,)).fetchone()
+        if worker:
+            return {'type': 'worker', 'data': dict(worker)}
+        tool = self.conn.execute('SELECT * FROM tools WHERE barcode = ?', (barcode,)).fetchone()
+        if tool:
+            lending = self.conn.execute('''
+                SELECT l.worker_barcode, l.lent_at,
+                       w.firstname || ' ' || w.lastname AS worker_name
+                FROM lendings l
+                LEFT JOIN workers w ON w.barcode = l.worker_barcode
+                WHERE l.tool_barcode = ?
+            ''', (barcode,)).fetchone()
+            return {'type': 'tool', 'data': dict(tool),
+                    'lending': dict(lending) if lending else None}
+        consumable = self.conn.execute('SELECT * FROM consumables WHERE barcode = ?',
+                                       (barcode,)).fetchone()
+        if consumable:
+            return {'type': 'consumable', 'data': dict(consumable)}
+        return None
+
+    def workers(self):
+        """Alle Mitarbeiter der Kopie nach Namen sortiert"""
+        return [dict(row) for row in self.conn.execute(
+            'SELECT * FROM workers ORDER BY lastname, firstname'
+        )]
+
+    def close(self):
+        self.conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--server', help='Basis-URL des Scandy-Servers')
+    parser.add_argument('--token', help='Bearer-Token (SYNC_TOKEN des Servers)')
+    parser.add_argument('--db', default='station.db', help='Datei der lokalen Kopie (Standard: station.db)')
+    parser.add_argument('--watch', type=float, metavar='SEKUNDEN',
+                        help='Dauerhaft im angegebenen Abstand abgleichen')
+    parser.add_argument('--lookup', metavar='BARCODE', help='Barcode aus der lokalen Kopie auflösen')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    client = SyncClient(args.db, args.server, args.token)
+    try:
+        if args.lookup:
+            print(json.dumps(client.lookup(args.lookup), ensure_ascii=False, indent=2))
+            return 0
+        if args.watch:
+            client.watch(args.watch)
+        try:
+            applied = client.sync()
+        except SyncError as e:
+            print(f'Abgleich fehlgeschlagen: {e} (lokale Kopie: Version {client.version})')
+            return 1
+        print(f'{applied} Änderungen übernommen, Version {client.version}.')
+        return 0
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    sys.exit(main())